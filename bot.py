@@ -1,13 +1,33 @@
 import asyncio
+import contextvars
 import datetime
+import importlib
 import logging
+import sys
+import time
+from typing import Union
 
 import aiohttp
 import discord
-import wavelink
 from discord.ext import commands
 
-from utils import db
+from structs import ttc
+from utils import db, deadline, tracing
+from utils.admission import AdmissionController, Overloaded
+from utils.context import PhotonContext
+from utils.conversations import ConversationDispatcher
+from utils.fakegateway import FakeWeb
+from utils.guildconfig import GuildConfigCache
+from utils.help import HelpPages, PhotonHelpCommand
+from utils.interactions import InteractionServer
+from utils.logs import command_extra
+from utils.memory import resident_memory, session_size
+from utils.metrics import MetricsRegistry, MetricsServer
+from utils.outbound import OutboundDispatcher
+from utils.recorder import GatewayRecorder
+from utils.sharedconfig import SharedConfigTable
+from utils.watchdog import LagWatchdog
+from utils.workers import GATEWAY_EXTENSIONS
 
 __author__ = "Anish Jewalikar"
 __version__ = "1.13.2"
@@ -25,55 +45,371 @@ extensions = [
     "cogs.fun"
 ]
 
+# Extensions with heavy dependencies that the lazy startup mode defers,
+# mapped to the commands (and their aliases) that load them on first use.
+lazy_extensions = {
+    "cogs.music": {
+        "join": ("connect",), "play": (), "volume": ("vol",), "pause": (), "resume": (),
+        "queue": ("q",), "skip": (), "stop": ("leave",), "np": (), "repeat": (), "seek": (),
+        "eq": ("equalizer", "equaliser"), "swap": (), "shuffle": ()
+    },
+    "cogs.utilities": {
+        "covindia": (), "covid": (), "random": (), "avatar": (), "pypi": (),
+        "dictionary": ("dict",), "serverinfo": ("si",), "userinfo": ("ui",),
+        "wikipedia": ("wiki",)
+    }
+}
+
+# The cogs of the deferred extensions, listed by the help before they are loaded.
+lazy_cog_names = {"cogs.music": "Music", "cogs.utilities": "Utilities"}
+
 
 async def _get_prefix(bot, msg):
-    if msg.guild.id in bot.prefix_list:
-        return commands.when_mentioned_or(bot.prefix_list[msg.guild.id])(bot, msg)
-    else:
-        precord = await bot.database.fetch_prefix(msg.guild.id)
-        if precord is None:
-            prefix = "&"
-        else:
-            prefix = precord["prefix"]
-        bot.prefix_list[msg.guild.id] = prefix
-        return commands.when_mentioned_or(prefix)(bot, msg)
+    config = await bot.guild_config.get(msg.guild.id)
+    return bot.prefix_matcher(config)
 
 
-class Photon(commands.Bot):
+class Photon(commands.AutoShardedBot):
 
-    def __init__(self, db_helper, event_loop):
-        super().__init__(_get_prefix, loop=event_loop)
+    def __init__(self, db_helper, event_loop, tuning: dict = None,
+                 cluster=None, cluster_id: int = 0, extension_names: list = None,
+                 router=None, offline: bool = False, **options):
+        tuning = tuning or {}
+        options.update(self._cache_options(tuning))
+        super().__init__(_get_prefix, loop=event_loop, **options)
+
+        # Optional performance settings from the config file.
+        self.tuning = tuning
+
+        # Shared statistics of the cluster, if this is a cluster worker.
+        self.cluster = cluster
+        self.cluster_id = cluster_id
 
         # Statistics
         self.library_version = discord.__version__
         self.bot_version = __version__
         self.start_time = datetime.datetime.utcnow()
-        self.commands_completed = 0
-        self._comcompleted_lock = asyncio.Lock()
+        self.messages_accepted = 0
+        self.messages_rejected = 0
+        self.metrics = MetricsRegistry()
+        self.metrics_server: MetricsServer = None
+        self.interactions: InteractionServer = None
+        self._setup_metrics()
+        self.tracer = tracing.Tracer(self.tuning.get("trace_buffer", 256),
+                                     self.tuning.get("trace_sample_rate", 0.1))
 
-        # Database, Web session and prefix configurations
-        self.prefix_list = {}
+        # Database, Web session and guild configurations
         self.database: db.DatabaseHelper = db_helper
-        self.web = aiohttp.ClientSession(loop=self.loop)
+        self.shared_config: SharedConfigTable = None
+        if "shared_config" in self.tuning:
+            self.shared_config = SharedConfigTable(
+                self.tuning["shared_config"], self.tuning.get("shared_config_slots", 65536))
+        # The shared table holds every guild, so each process only keeps its hot guilds.
+        self.guild_config = GuildConfigCache(
+            db_helper, 1000 if self.shared_config is not None else 10000, self.shared_config)
+        # Benchmarks and replays run offline, they reach no outside API.
+        self.offline = offline
+        if offline:
+            self.web = FakeWeb()
+        else:
+            self.web = aiohttp.ClientSession(loop=self.loop,
+                                             trace_configs=[tracing.http_trace_config()])
 
-        # Logging setup
-        log_string = "[PHOTON] Time: %(asctime)s Message: %(message)s"
-        logging.basicConfig(format=log_string, datefmt="%d-%b-%y %H:%M:%S")
+        # Logging, the handlers are set up by the launcher through utils.logs.
         self.photon_log = logging.getLogger("Photon")
-        self.photon_log.setLevel(10)
 
-        # Loading extensions.
-        for ext in extensions:
-            try:
-                self.load_extension(ext)
-                self.photon_log.info(f"{ext} extension successfully loaded.")
-            except Exception as e:
-                self.photon_log.error(
-                    f"{ext} extension failed to load. EXCEPTION: {e.__cause__}")
+        # Commands waiting for a reply of their author.
+        self.conversations = ConversationDispatcher(
+            self.loop, self.tuning.get("conversation_timeout_max", 600.0))
+
+        # Queued sends, edits and reactions.
+        self.outbound = OutboundDispatcher(self.loop, logging.getLogger("Photon.outbound"))
+
+        # Opt-in recording of the gateway traffic for offline replays.
+        self.recorder: GatewayRecorder = None
+        if "record_gateway" in self.tuning:
+            self.recorder = GatewayRecorder(self.tuning["record_gateway"],
+                                            lambda name: name in self.all_commands)
+
+        # Forwards the gateway events to the command workers in the split mode.
+        self.router = router
+
+        # Event loop lag watchdog, started together with the loop.
+        self.watchdog = LagWatchdog(
+            self.loop, logging.getLogger("Photon.watchdog"),
+            interval=self.tuning.get("watchdog_interval", 0.25),
+            threshold=self.tuning.get("watchdog_threshold", 0.25))
+
+        # Limits of the expensive work that runs concurrently.
+        self.admission = AdmissionController(
+            self.watchdog, self.tuning.get("admission_limits"),
+            self.tuning.get("admission_max_lag", 0.5))
+
+        self.photon_log.info("Resident memory at boot: %.1fMiB.", resident_memory() / 2 ** 20)
+
+        # Help embeds, rebuilt after the extensions change. The workers of
+        # the split mode answer the help, not the gateway process.
+        self.help_pages = HelpPages(self)
+        self.help_command = PhotonHelpCommand() if router is None else None
+
+        # Loading extensions, heavy ones are deferred in the lazy startup mode.
+        self._boot_clock = time.perf_counter()
+        self._lazy_stubs = {}
+        lazy = self.tuning.get("lazy_extensions", False)
+        for ext in extension_names or extensions:
+            if lazy and ext in lazy_extensions:
+                self._add_lazy_stubs(ext)
+                self.photon_log.info("%s extension deferred until first use.", ext)
+                continue
+            self._timed_load_extension(ext)
+
+        self.photon_log.info(
+            "Extensions ready in %.1fms.", (time.perf_counter() - self._boot_clock) * 1000)
+
+    @staticmethod
+    def _cache_options(tuning: dict) -> dict:
+        """Builds the gateway intents and cache options from the tuning settings.
+
+        The lean cache mode keeps only the members that are in voice
+        channels (the music DJ logic needs them) and does not chunk
+        guilds at startup, commands that need every member of a guild
+        chunk it on demand through utils.checks.requires_members."""
+
+        options = {}
+        if tuning.get("lean_cache", False):
+            # The members intent is still required for the welcome and leave messages.
+            intents = discord.Intents.default()
+            intents.members = True
+            intents.presences = False
+
+            member_cache_flags = discord.MemberCacheFlags.none()
+            member_cache_flags.voice = True
+
+            options["intents"] = intents
+            options["member_cache_flags"] = member_cache_flags
+            options["chunk_guilds_at_startup"] = False
+
+            # Polls rely on raw reaction events, hence a small message cache is enough.
+            options["max_messages"] = 250
+
+        if "max_messages" in tuning:
+            options["max_messages"] = tuning["max_messages"]
+
+        return options
+
+    def _timed_load_extension(self, ext: str) -> None:
+        """Loads an extension and logs how long the import and the setup took."""
+
+        try:
+            start = time.perf_counter()
+            # Importing first pulls the dependencies of the extension into
+            # sys.modules, so the load below mostly measures setup().
+            importlib.import_module(ext)
+            imported = time.perf_counter()
+            # Extensions may be loaded by a command, the tasks they start must
+            # not inherit its deadline and trace, hence the empty context.
+            contextvars.Context().run(self.load_extension, ext)
+            loaded = time.perf_counter()
+            self.photon_log.info(
+                "%s extension successfully loaded. Import: %.1fms Setup: %.1fms",
+                ext, (imported - start) * 1000, (loaded - imported) * 1000)
+        except Exception as e:
+            self.photon_log.error(
+                "%s extension failed to load. EXCEPTION: %s", ext, e.__cause__ or e)
+
+    def _add_lazy_stubs(self, ext: str) -> None:
+        """Registers lightweight commands that stand in for the commands of the extension.
+
+        Photon.invoke loads the extension and swaps in the real command
+        before a stub would run, so a stub only runs if the load failed."""
+
+        async def stub(ctx, *, arguments: str = None):
+            await ctx.send("This command is unavailable right now. Please try again later.")
+
+        stubs = []
+        for name, aliases in lazy_extensions[ext].items():
+            command = commands.Command(stub, name=name, aliases=list(aliases), hidden=True)
+            self.add_command(command)
+            stubs.append(command)
+        self._lazy_stubs[ext] = stubs
+
+    def _remove_lazy_stubs(self, ext: str) -> bool:
+        stubs = self._lazy_stubs.pop(ext, None)
+        for command in stubs or ():
+            self.remove_command(command.name)
+        return stubs is not None
+
+    def _deferred_extension(self, command: commands.Command) -> Union[str, None]:
+        for ext, stubs in self._lazy_stubs.items():
+            if command in stubs:
+                return ext
+        return None
+
+    def deferred_commands(self) -> dict:
+        """Returns the names of the commands of every deferred extension by cog name."""
+        return {lazy_cog_names[ext]: [command.name for command in stubs]
+                for ext, stubs in self._lazy_stubs.items()}
+
+    def resolve_command(self, name: str) -> commands.Command:
+        """Gets a command by name or alias, loading its extension if it has been deferred."""
+
+        command = self.get_command(name)
+        ext = self._deferred_extension(command) if command is not None else None
+        if ext is not None:
+            self._timed_load_extension(ext)
+            command = self.get_command(name)
+        return command
+
+    def resolve_help(self, query: str) -> None:
+        """Loads the deferred extension of the cog or command a help query names."""
+
+        for ext in list(self._lazy_stubs):
+            if query == lazy_cog_names[ext]:
+                self._timed_load_extension(ext)
+        if query:
+            self.resolve_command(query.split(" ", 1)[0])
+
+    def load_extension(self, name):
+        had_stubs = self._remove_lazy_stubs(name)
+        self.help_pages.invalidate()
+        try:
+            super().load_extension(name)
+        except Exception:
+            # The commands of the extension stay available for another try.
+            if had_stubs:
+                self._add_lazy_stubs(name)
+            raise
+
+    def unload_extension(self, name):
+        self.help_pages.invalidate()
+        super().unload_extension(name)
+
+    def reload_extension(self, name):
+        self.help_pages.invalidate()
+        super().reload_extension(name)
+
+    def _setup_metrics(self):
+        labels = ("command", "cog")
+        self._command_invocations = self.metrics.counter(
+            "photon_command_invocations_total", "Commands invoked.", labels)
+        self._command_completions = self.metrics.counter(
+            "photon_command_completions_total", "Commands completed successfully.", labels)
+        self._command_errors = self.metrics.counter(
+            "photon_command_errors_total", "Command errors by type.", labels + ("error",))
+        self._command_latency = self.metrics.histogram(
+            "photon_command_latency_seconds", "Time taken to invoke a command.", labels)
+
+        self.metrics.gauge(
+            "photon_messages", "Guild messages by fast path result.", ("result",),
+            callback=lambda: {
+                ("accepted",): self.messages_accepted,
+                ("rejected",): self.messages_rejected
+            })
+        self.metrics.gauge(
+            "photon_guilds", "Guilds served by this process.",
+            callback=lambda: len(self.guilds))
+        self.metrics.gauge(
+            "photon_guild_config_cache", "Guild configuration cache statistics.", ("stat",),
+            callback=lambda: {
+                ("size",): len(self.guild_config),
+                ("hits",): self.guild_config.hits,
+                ("shared_hits",): self.guild_config.shared_hits,
+                ("misses",): self.guild_config.misses
+            })
+        self.metrics.gauge(
+            "photon_music_controllers", "Open music controllers.",
+            callback=self._count_music_controllers)
+        self.metrics.gauge(
+            "photon_hidden_polls", "Ongoing anonymous polls.",
+            callback=lambda: len(getattr(self.get_cog("Polls"), "hidden_polls", ())))
+        self.metrics.gauge(
+            "photon_ttt_sessions", "Ongoing Tic Tac Toe games.",
+            callback=lambda: len(set(getattr(self.get_cog("Fun"), "sessions", {}).values())))
+        self.metrics.gauge(
+            "photon_session_memory_bytes", "Memory held by ongoing sessions.", ("kind",),
+            callback=self._session_memory)
+        self.metrics.gauge(
+            "photon_conversations", "Commands waiting for a reply and replies routed.",
+            ("state",),
+            callback=lambda: {
+                ("pending",): self.conversations.pending,
+                ("routed",): self.conversations.routed
+            })
+        self.metrics.gauge(
+            "photon_pool_connections", "Database pool connections.", ("state",),
+            callback=self._pool_usage)
+        self.metrics.gauge(
+            "photon_resident_memory_bytes", "Resident set size of the process.",
+            callback=resident_memory)
+        self.metrics.gauge(
+            "photon_outbound_operations", "Outbound REST operations by state.", ("state",),
+            callback=lambda: {
+                ("queued",): self.outbound.queued,
+                ("completed",): self.outbound.completed,
+                ("failed",): self.outbound.failed,
+                ("coalesced",): self.outbound.coalesced
+            })
+        self.metrics.gauge(
+            "photon_admission_in_flight", "Admitted expensive work by class.", ("class",),
+            callback=lambda: {
+                (work_class,): count for work_class, count in self.admission.in_flight.items()
+            })
+        self.metrics.gauge(
+            "photon_admission_decisions", "Admission decisions by work class.",
+            ("class", "decision"),
+            callback=lambda: dict(self.admission.decisions))
+        self.metrics.gauge(
+            "photon_loop_lag_seconds", "Recent event loop scheduling lag.", ("quantile",),
+            callback=lambda: {
+                (str(quantile),): lag for quantile, lag in self.watchdog.percentiles().items()
+            })
+        self.metrics.gauge(
+            "photon_loop_stalls", "Event loop stalls reported by the watchdog.",
+            callback=lambda: self.watchdog.stalls)
+
+    def _count_music_controllers(self) -> int:
+        cog = self.get_cog("Music")
+        if cog is None:
+            return 0
+        return sum(1 for ctr in cog._controllers.values() if not ctr.destroyed)
+
+    def _session_memory(self) -> dict:
+        polls = getattr(self.get_cog("Polls"), "hidden_polls", {})
+        music = getattr(self.get_cog("Music"), "_controllers", {})
+        games = len(set(getattr(self.get_cog("Fun"), "sessions", {}).values()))
+        return {
+            ("poll",): sum(session_size(ctr) for ctr in polls.values()),
+            ("music",): sum(session_size(ctr) for ctr in music.values() if not ctr.destroyed),
+            # Every board has the same size.
+            ("ttt",): games * session_size(ttc.TicTacToe())
+        }
+
+    def _pool_usage(self) -> dict:
+        pool = self.database.pool
+        if pool is None:
+            return {}
+        return {
+            ("open",): pool.get_size(),
+            ("idle",): pool.get_idle_size(),
+            ("max",): pool.get_max_size()
+        }
+
+    @staticmethod
+    def _command_labels(ctx: commands.Context) -> dict:
+        return {
+            "command": ctx.command.qualified_name,
+            "cog": ctx.cog.qualified_name if ctx.cog is not None else "None"
+        }
+
+    @property
+    def commands_completed(self) -> int:
+        return int(self._command_completions.total())
 
     async def on_ready(self):
         self.photon_log.info(
-            f"Photon is now ready. Guild Count: {len(self.guilds)}.")
+            "Photon is now ready. Guild Count: %d. Startup took %.2fs. "
+            "Resident memory: %.1fMiB.", len(self.guilds),
+            time.perf_counter() - self._boot_clock, resident_memory() / 2 ** 20)
 
     async def on_message(self, message):
         if message.guild is None:
@@ -82,17 +418,168 @@ class Photon(commands.Bot):
         if message.author.bot:
             return
 
-        await self.process_commands(message)
+        # Replies to interactive commands do not start with a prefix.
+        self.conversations.route(message)
+
+        # Reject messages that can not be commands before building a context.
+        # Guilds that are not cached yet take the slow path which loads them.
+        config = self.guild_config.peek(message.guild.id)
+        if config is not None and not message.content.startswith(self.prefix_matcher(config)):
+            self.messages_rejected += 1
+            return
+
+        self.messages_accepted += 1
+        if self.router is None:
+            return await self.process_commands(message)
+
+        # The workers answer every command that does not need the voice connections.
+        ctx = await self.get_context(message)
+        if ctx.command is None:
+            return
+        module = self._deferred_extension(ctx.command) or ctx.command.module
+        if module in GATEWAY_EXTENSIONS:
+            await self.invoke(ctx)
+
+    def dispatch(self, event_name, *args, **kwargs):
+        # Raw payloads are recorded synchronously, before any parser sees them.
+        if event_name == "socket_response" and self.recorder is not None:
+            self.recorder.on_socket_response(args[0])
+        if event_name == "socket_response" and self.router is not None:
+            self.router.on_socket_response(args[0])
+        super().dispatch(event_name, *args, **kwargs)
+
+    def prefix_matcher(self, config) -> tuple:
+        """Returns the precompiled prefix tuple of a guild configuration.
+
+        The tuple holds both mention forms and the guild prefix, the
+        same prefixes that commands.when_mentioned_or would produce."""
+
+        if config.matcher is None:
+            user_id = self.user.id
+            config.matcher = (f"<@{user_id}> ", f"<@!{user_id}> ", config.prefix)
+        return config.matcher
 
     def run(self, api_token):
         super().run(api_token, reconnect=True)
 
+    @property
+    def is_primary(self) -> bool:
+        """Whether this is the process that performs the cluster wide tasks."""
+        return self.cluster_id == 0
+
+    def global_counts(self) -> tuple:
+        """Returns the guild and user count across every process of the cluster."""
+
+        if self.cluster is None:
+            return len(self.guilds), len(self.users)
+        self.cluster.publish(self.cluster_id, len(self.guilds), len(self.users))
+        return self.cluster.totals()
+
+    async def _publish_cluster_stats(self):
+        await self.wait_until_ready()
+        while not self.is_closed():
+            self.cluster.publish(self.cluster_id, len(self.guilds), len(self.users))
+            await asyncio.sleep(30.0)
+
+    async def _maintain_polls(self):
+        """Keeps the poll partitions of the coming month and drops the expired ones."""
+
+        retention = self.tuning.get("poll_retention_months", 2)
+        interval = self.tuning.get("poll_maintenance_interval", 21600.0)
+        while not self.is_closed():
+            try:
+                dropped = await self.database.maintain_polls_partitions(retention)
+            except Exception:
+                self.photon_log.error("Maintaining the poll partitions failed.", exc_info=True)
+            else:
+                if dropped:
+                    self.photon_log.info("Dropped the expired poll partitions %s.",
+                                         ", ".join(dropped))
+            await asyncio.sleep(interval)
+
+    async def start(self, *args, **kwargs):
+        await self.prepare()
+        await super().start(*args, **kwargs)
+
+    async def prepare(self):
+        """Loads the state Photon needs before it connects to Discord."""
+
+        self.watchdog.start()
+
+        loaded = await self.guild_config.warm_up()
+        await self.guild_config.listen()
+        self.photon_log.info("Loaded the configuration of %d guilds.", loaded)
+
+        if "metrics_port" in self.tuning:
+            self.metrics_server = MetricsServer(
+                self.metrics,
+                self.tuning.get("metrics_host", "127.0.0.1"),
+                self.tuning["metrics_port"])
+            await self.metrics_server.start()
+            self.photon_log.info("Serving metrics on port %d.", self.metrics_server.port)
+
+        if "interactions_port" in self.tuning:
+            self.interactions = InteractionServer(
+                self,
+                self.tuning["interactions_public_key"],
+                self.tuning.get("interactions_host", "127.0.0.1"),
+                self.tuning["interactions_port"])
+            await self.interactions.start()
+            self.photon_log.info("Serving interactions on port %d.", self.interactions.port)
+
+        if self.cluster is not None:
+            self.loop.create_task(self._publish_cluster_stats())
+        self.loop.create_task(self._maintain_polls())
+
+    async def get_context(self, message, *, cls=PhotonContext):
+        return await super().get_context(message, cls=cls)
+
+    async def invoke(self, ctx: commands.Context):
+        if ctx.command is None:
+            return await super().invoke(ctx)
+
+        # A deferred extension is loaded before the first of its commands runs.
+        if self._lazy_stubs and self._deferred_extension(ctx.command) is not None:
+            ctx.command = self.resolve_command(ctx.invoked_with)
+
+        labels = self._command_labels(ctx)
+        self._command_invocations.inc(**labels)
+        trace = self.tracer.begin(labels["command"], ctx.guild.id if ctx.guild else None)
+        budget = deadline.start(self.tuning.get("command_deadline", 10.0))
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        except Exception as e:
+            # discord.py only reports the errors of the callback and the checks,
+            # an error of a hook or converter would otherwise escape every handler.
+            self.dispatch("command_error", ctx, commands.CommandInvokeError(e))
+        finally:
+            deadline.reset(budget)
+            latency = time.perf_counter() - start
+            self._command_latency.observe(latency, **labels)
+            self.tracer.finish(trace)
+            self.photon_log.info(
+                "Command %s finished in %.1fms.", labels["command"], latency * 1000,
+                extra=command_extra(ctx, event="command", latency=round(latency, 4)))
+
     async def close(self):
         self.photon_log.info("Shutdown attempt started.")
         try:
             await super().close()
+            self.watchdog.stop()
+            self.outbound.close()
+            if self.recorder is not None:
+                self.recorder.close()
+            if self.router is not None:
+                self.router.close()
             await self.web.close()
+            if self.metrics_server is not None:
+                await self.metrics_server.close()
+            if self.interactions is not None:
+                await self.interactions.close()
             await self.database.close_database_pool()
+            if self.shared_config is not None:
+                self.shared_config.close()
             self.photon_log.info(
                 "Shutdown attempt successful. Photon has been closed.")
         except Exception:
@@ -102,7 +589,17 @@ class Photon(commands.Bot):
     async def on_command_error(self, ctx: commands.Context, error):
         """Photon error handler."""
 
-        if isinstance(error, commands.CommandOnCooldown):
+        original = getattr(error, "original", error)
+        if ctx.command is not None:
+            self._command_errors.inc(error=type(original).__name__, **self._command_labels(ctx))
+
+        if isinstance(original, Overloaded):
+            return await ctx.send(
+                "Photon is very busy right now. Please try again in a few moments.")
+        elif isinstance(original, (deadline.DeadlineExceeded, asyncio.TimeoutError)):
+            return await ctx.send(
+                "The command took too long to complete. Please try again later.")
+        elif isinstance(error, commands.CommandOnCooldown):
             is_owner_sync = await self.is_owner(ctx.author)
             if is_owner_sync:
                 return await ctx.reinvoke()
@@ -114,14 +611,16 @@ class Photon(commands.Bot):
                 f"**{(ctx.command.name).title()}** command can only be used in NFSW channels."
             )
         elif isinstance(error, commands.CommandInvokeError):
-            if isinstance(error.original, wavelink.ZeroConnectedNodes):
+            # wavelink is only imported once the music extension is loaded.
+            wavelink = sys.modules.get("wavelink")
+            if wavelink is not None and isinstance(error.original, wavelink.ZeroConnectedNodes):
                 return await ctx.send("No Lavalink nodes are currently online. Please try again.")
             else:
                 self.photon_log.error(
-                    f"[ERROR] Command: {ctx.command.name} Exception: {error}")
+                    "[ERROR] Command: %s Exception: %s", ctx.command.name, error,
+                    extra=command_extra(ctx))
 
     async def on_command_completion(self, ctx: commands.Context):
         """Event handler that gets called when a command is successfully invoked."""
 
-        async with self._comcompleted_lock:
-            self.commands_completed += 1
+        self._command_completions.inc(**self._command_labels(ctx))
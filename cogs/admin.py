@@ -6,6 +6,7 @@ import traceback
 from discord.ext import commands
 
 from bot import Photon
+from utils.logs import command_extra
 
 
 class Admin(commands.Cog):
@@ -31,7 +32,8 @@ class Admin(commands.Cog):
             return await ctx.send(f"Please specify the **{error.param.name}** parameter.")
         else:
             self.bot.photon_log.error(
-                f"[ERROR] Command: {ctx.command.name}, Exception: {error}.")
+                "[ERROR] Command: %s, Exception: %s.", ctx.command.name, error,
+                extra=command_extra(ctx))
 
     @commands.command(name="reload", aliases=["re"])
     async def _reload(self, ctx, *, name: str):
@@ -42,10 +44,10 @@ class Admin(commands.Cog):
 
         try:
             self.bot.reload_extension(name)
-            self.bot.photon_log.info(f"Reloaded extension {name}")
+            self.bot.photon_log.info("Reloaded extension %s", name)
             await ctx.send("Reloaded the specified extension successfully.")
         except Exception as e:
-            self.bot.photon_log.error(f"Failed to reload extension {name}")
+            self.bot.photon_log.error("Failed to reload extension %s", name)
             await ctx.send(f"Failed to reload the specified extension. Exception: {e}")
 
     @commands.command(name="load", aliases=["lo"])
@@ -57,10 +59,10 @@ class Admin(commands.Cog):
 
         try:
             self.bot.load_extension(name)
-            self.bot.photon_log.info(f"Loaded extension {name}")
+            self.bot.photon_log.info("Loaded extension %s", name)
             await ctx.send("Loaded the specified extension successfully.")
         except Exception as e:
-            self.bot.photon_log.error(f"Failed to load extension {name}")
+            self.bot.photon_log.error("Failed to load extension %s", name)
             await ctx.send(f"Failed to load the specified extension. Exception: {e}")
 
     @commands.command(name="unload", aliases=["un"])
@@ -72,10 +74,10 @@ class Admin(commands.Cog):
 
         try:
             self.bot.unload_extension(name)
-            self.bot.photon_log.info(f"Unloaded extension {name}")
+            self.bot.photon_log.info("Unloaded extension %s", name)
             await ctx.send("Unloaded the specified extension successfully.")
         except Exception as e:
-            self.bot.photon_log.error(f"Failed to unload extension {name}")
+            self.bot.photon_log.error("Failed to unload extension %s", name)
             await ctx.send(f"Failed to unload the specified extension. Exception: {e}")
 
     @commands.command(name="exit", aliases=["shutdown", "quit"])
@@ -92,6 +94,29 @@ class Admin(commands.Cog):
         await self.bot.database.create_guild_entry(ctx.guild)
         await ctx.send("Regenerated database entry successfully.")
 
+    @commands.command(name="trace")
+    async def _trace(self, ctx, count: int = 5):
+        """Shows the slowest recently traced commands with their span breakdown.
+
+        Every span is shown with its offset from the start of the
+        invocation and its duration."""
+
+        traces = self.bot.tracer.slowest(count)
+        if not traces:
+            return await ctx.send("No command invocations were traced yet.")
+
+        lines = []
+        for trace in traces:
+            lines.append(
+                f"{trace.command} {trace.duration * 1000:.1f}ms (Guild: {trace.guild_id})")
+            for name, offset, duration in trace.spans:
+                lines.append(f"  +{offset * 1000:8.1f}ms {duration * 1000:8.1f}ms {name}")
+
+        output = "\n".join(lines)
+        if len(output) > 1980:
+            output = output[:1980] + "\n..."
+        await ctx.send(f"```\n{output}\n```")
+
     # Taken from Rapptz/RoboDanny.
     @commands.command(name="eval")
     async def _eval(self, ctx, *, code: str):
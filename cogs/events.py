@@ -5,8 +5,6 @@ import discord
 from discord.ext import commands
 
 from bot import Photon
-# pylint: disable=import-error
-from utils import canvas
 
 
 class Events(commands.Cog):
@@ -19,23 +17,33 @@ class Events(commands.Cog):
     async def on_member_join(self, member: discord.Member):
         """Welcome/Leave message handler."""
 
-        # Fetch the welcome channel id from the database.
-        welcome_status = await self.bot.database.get_welcome_channel(member.guild)
-        if welcome_status is None:
+        # Fetch the welcome channel id from the guild configuration.
+        config = await self.bot.guild_config.get(member.guild.id)
+        if config.welcome is None:
             return
 
         # Get channel and check if it is None.
-        channel = self.bot.get_channel(int(welcome_status))
+        channel = self.bot.get_channel(int(config.welcome))
         if channel is None:
             return
 
-        # Fetch avatar
-        avatar = await (member.avatar_url_as(size=256)).read()
+        # Images are skipped when Photon is overloaded, for example during raids.
+        if not self.bot.admission.admit("image", fallback="text"):
+            return await channel.send(f"Welcome to **{member.guild.name}**, {member.mention}!")
 
-        # With lock make image.
-        async with self.lock:
-            func = functools.partial(canvas.welcome_leave_image, avatar, member, True)
-            image = await self.bot.loop.run_in_executor(None, func)
+        try:
+            # Fetch avatar
+            avatar = await (member.avatar_url_as(size=256)).read()
+
+            # The canvas pulls in Pillow, hence it is imported on first use.
+            from utils import canvas
+
+            # With lock make image.
+            async with self.lock:
+                func = functools.partial(canvas.welcome_leave_image, avatar, member, True)
+                image = await self.bot.loop.run_in_executor(None, func)
+        finally:
+            self.bot.admission.release("image")
         file_buffer = discord.File(image, "welcome.png")
         await channel.send(file=file_buffer)
 
@@ -43,23 +51,33 @@ class Events(commands.Cog):
     async def on_member_remove(self, member: discord.Member):
         """Welcome/Leave message handler."""
 
-        # Fetch the welcome channel id from the database.
-        welcome_status = await self.bot.database.get_welcome_channel(member.guild)
-        if welcome_status is None:
+        # Fetch the welcome channel id from the guild configuration.
+        config = await self.bot.guild_config.get(member.guild.id)
+        if config.welcome is None:
             return
 
         # Get channel and check if it is None.
-        channel = self.bot.get_channel(int(welcome_status))
+        channel = self.bot.get_channel(int(config.welcome))
         if channel is None:
             return
 
-        # Fetch avatar
-        avatar = await (member.avatar_url_as(size=256)).read()
+        # Images are skipped when Photon is overloaded, for example during raids.
+        if not self.bot.admission.admit("image", fallback="text"):
+            return await channel.send(f"**{member}** has left the server.")
+
+        try:
+            # Fetch avatar
+            avatar = await (member.avatar_url_as(size=256)).read()
+
+            # The canvas pulls in Pillow, hence it is imported on first use.
+            from utils import canvas
 
-        # With lock make image.
-        async with self.lock:
-            func = functools.partial(canvas.welcome_leave_image, avatar, member, False)
-            image = await self.bot.loop.run_in_executor(None, func)
+            # With lock make image.
+            async with self.lock:
+                func = functools.partial(canvas.welcome_leave_image, avatar, member, False)
+                image = await self.bot.loop.run_in_executor(None, func)
+        finally:
+            self.bot.admission.release("image")
         file_buffer = discord.File(image, "goodbye.png")
         await channel.send(file=file_buffer)
 
@@ -6,6 +6,7 @@ from discord.ext import commands
 from bot import Photon
 # pylint: disable=import-error
 from structs import ttc
+from utils.logs import command_extra
 
 
 class Fun(commands.Cog):
@@ -13,7 +14,8 @@ class Fun(commands.Cog):
 
     def __init__(self, bot: Photon):
         self.bot = bot
-        self.sessions = set()
+        # Maps the channel and player of every ongoing game to the message that started it.
+        self.sessions = {}
 
     async def cog_command_error(self, ctx, error):
         """A mini error handler for this cog."""
@@ -25,15 +27,52 @@ class Fun(commands.Cog):
                 f"Please specify the **{error.param.name}** parameter.")
         else:
             self.bot.photon_log.error(
-                f"[ERROR] Command: {ctx.command.name}, Exception: {error}.")
+                "[ERROR] Command: %s, Exception: %s.", ctx.command.name, error,
+                extra=command_extra(ctx))
+
+    async def _show_board(self, board_msg: discord.Message, embed: discord.Embed,
+                          board: ttc.TicTacToe):
+        """Queues an edit of the board message and returns the state of the game.
+
+        The edit is only awaited once the game is over, so that the result
+        is announced after the final board. The move of the player and the
+        reply of the computer are coalesced into a single edit."""
+
+        embed.description = board.render_board()
+        update = self.bot.outbound.edit(board_msg, embed=embed.copy())
+        game_over = board.check_game_over()
+        if game_over is not None:
+            await update
+        return game_over
+
+    @staticmethod
+    def _is_move(m: discord.Message) -> bool:
+        """Checks if a message is a cell number."""
+        try:
+            num = int(m.content)
+        except ValueError:
+            return False
+        return num <= 9 and num >= 0
+
+    def _wait_for_move(self, ctx: commands.Context, player: discord.Member):
+        return self.bot.conversations.wait_for_message(
+            ctx.channel.id, player.id, check=self._is_move, timeout=30.0)
+
+    def _start_session(self, ctx: commands.Context, *players: discord.Member) -> None:
+        for player in players:
+            self.sessions[(ctx.channel.id, player.id)] = ctx.message.id
 
     @commands.command(name="ttc", aliases=["tictactoe"])
     async def _tictactoe(self, ctx, opponent: discord.Member = None):
-        """Play a game of Tic-Tac-toe with your friend."""
+        """Play a game of Tic-Tac-toe with your friend.
 
-        if ctx.channel.id in self.sessions:
+        Several games can be played in the same channel at once,
+        as long as every player is only in one of them."""
+
+        players = (ctx.author, opponent) if opponent is not None else (ctx.author,)
+        if any((ctx.channel.id, player.id) in self.sessions for player in players):
             return await ctx.send(
-                "There is already a game in progress in this channel.")
+                "One of the players is already in a game in this channel.")
 
         if opponent is not None:
 
@@ -41,24 +80,7 @@ class Fun(commands.Cog):
                 return
 
             def check(m):
-                cond = m.content.startswith("accept")
-                return m.channel == ctx.channel and m.author == opponent and cond
-
-            def check_first_player(m):
-                try:
-                    num = int(m.content)
-                except ValueError:
-                    return False
-                cond = True if num <= 9 and num >= 0 else False
-                return m.channel == ctx.channel and m.author == ctx.author and cond
-
-            def check_second_player(m):
-                try:
-                    num = int(m.content)
-                except ValueError:
-                    return False
-                cond = True if num <= 9 and num >= 0 else False
-                return m.channel == ctx.channel and m.author == opponent and cond
+                return m.content.startswith("accept")
 
             fmt = f"{opponent.mention}, **{ctx.author.name}** has " \
                 "invited you to a game of Tic Tac Toe, \n" \
@@ -66,11 +88,12 @@ class Fun(commands.Cog):
 
             await ctx.send(fmt)
             try:
-                msg = await self.bot.wait_for("message", check=check, timeout=60.0)
+                msg = await self.bot.conversations.wait_for_message(
+                    ctx.channel.id, opponent.id, check=check, timeout=60.0)
             except asyncio.TimeoutError:
                 return await ctx.send(
                     "The opponent did not respond. The game will not start.")
-            self.sessions.add(ctx.channel.id)
+            self._start_session(ctx, ctx.author, opponent)
             board = ttc.TicTacToe()
             embed = discord.Embed(title=f"{ctx.author.name} v. {opponent.name}",
                                   description=board.render_board(),
@@ -78,8 +101,7 @@ class Fun(commands.Cog):
             board_msg = await ctx.send(embed=embed)
             while True:
                 try:
-                    msg = await self.bot.wait_for(
-                        "message", check=check_first_player, timeout=30.0)
+                    msg = await self._wait_for_move(ctx, ctx.author)
                 except asyncio.TimeoutError:
                     return await ctx.send(
                         "The challenger was inactive for thirty seconds.\n"
@@ -88,10 +110,8 @@ class Fun(commands.Cog):
                 is_legal = board.make_move(int(msg.content), ttc.Player.FIRST)
                 if not is_legal:
                     return await ctx.send("Illegal Move! Stopping the game.")
-                await msg.delete()
-                embed.description = board.render_board()
-                await board_msg.edit(embed=embed)
-                game_over = board.check_game_over()
+                self.bot.outbound.delete(msg)
+                game_over = await self._show_board(board_msg, embed, board)
 
                 if game_over == ttc.Player.NONE:
                     return await ctx.send("Its a draw!")
@@ -99,8 +119,7 @@ class Fun(commands.Cog):
                     return await ctx.send(f"{ctx.author.mention} won!")
 
                 try:
-                    msg = await self.bot.wait_for(
-                        "message", check=check_second_player, timeout=30.0)
+                    msg = await self._wait_for_move(ctx, opponent)
                 except asyncio.TimeoutError:
                     return await ctx.send(
                         "The challenger was inactive for thirty seconds.\n"
@@ -109,10 +128,8 @@ class Fun(commands.Cog):
                 is_legal = board.make_move(int(msg.content), ttc.Player.SECOND)
                 if not is_legal:
                     return await ctx.send("Illegal move! Stopping the game.")
-                await msg.delete()
-                embed.description = board.render_board()
-                await board_msg.edit(embed=embed)
-                game_over = board.check_game_over()
+                self.bot.outbound.delete(msg)
+                game_over = await self._show_board(board_msg, embed, board)
 
                 if game_over == ttc.Player.NONE:
                     return await ctx.send("Its a draw!")
@@ -120,24 +137,15 @@ class Fun(commands.Cog):
                     return await ctx.send(f"{opponent.mention} won!")
         else:
 
-            def check_author(m):
-                try:
-                    num = int(m.content)
-                except ValueError:
-                    return False
-                cond = True if num <= 9 and num >= 0 else False
-                return m.channel == ctx.channel and m.author == ctx.author and cond
-
             board = ttc.TicTacToe()
             embed = discord.Embed(title=f"{ctx.author.name} v. Computer",
                                   description=board.render_board(),
                                   colour=discord.Colour.dark_teal())
             board_msg = await ctx.send(embed=embed)
-            self.sessions.add(ctx.channel.id)
+            self._start_session(ctx, ctx.author)
             while True:
                 try:
-                    msg = await self.bot.wait_for(
-                        "message", check=check_author, timeout=30.0)
+                    msg = await self._wait_for_move(ctx, ctx.author)
                 except asyncio.TimeoutError:
                     return await ctx.send(
                         "You were inactive for thirty seconds.\n"
@@ -147,10 +155,8 @@ class Fun(commands.Cog):
                 if not is_legal:
                     return await ctx.send("Illegal Move! Stopping the game.")
 
-                await msg.delete()
-                embed.description = board.render_board()
-                await board_msg.edit(embed=embed)
-                game_over = board.check_game_over()
+                self.bot.outbound.delete(msg)
+                game_over = await self._show_board(board_msg, embed, board)
 
                 if game_over == ttc.Player.NONE:
                     return await ctx.send("Its a draw!")
@@ -161,9 +167,7 @@ class Fun(commands.Cog):
                     return await ctx.send("You won!")
 
                 board.make_move_AI()
-                embed.description = board.render_board()
-                await board_msg.edit(embed=embed)
-                game_over = board.check_game_over()
+                game_over = await self._show_board(board_msg, embed, board)
 
                 if game_over == ttc.Player.NONE:
                     return await ctx.send("Its a draw!")
@@ -172,9 +176,10 @@ class Fun(commands.Cog):
 
     @_tictactoe.after_invoke
     async def _cleanup_session_set(self, ctx):
-        """Cleans up the session set after the game is done."""
-        if ctx.channel.id in self.sessions:
-            self.sessions.remove(ctx.channel.id)
+        """Cleans up the sessions of the game after it is done."""
+        for key, message_id in list(self.sessions.items()):
+            if message_id == ctx.message.id:
+                del self.sessions[key]
 
 
 def setup(bot: Photon):
@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 
 from bot import Photon
+from utils.logs import command_extra
 
 
 class Moderation(commands.Cog):
@@ -20,7 +21,9 @@ class Moderation(commands.Cog):
             else:
                 return await ctx.send("Please provide a valid amount of messages to delete.")
         else:
-            self.bot.photon_log.error(f"[ERROR] Command: {ctx.command.name}, Exception: {error}.")
+            self.bot.photon_log.error(
+                "[ERROR] Command: %s, Exception: %s.", ctx.command.name, error,
+                extra=command_extra(ctx))
 
     @commands.command(name="prune", aliases=["purge"])
     @commands.has_guild_permissions(manage_messages=True, read_message_history=True)
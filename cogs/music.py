@@ -12,11 +12,18 @@ from discord.ext import commands
 
 import config
 from bot import Photon
+from utils import deadline
+from utils.admission import Overloaded
+from utils.logs import command_extra
+from utils.tracing import span
 
 RURL = re.compile(r"https?:\/\/(?:www\.)?.+")
 RSEEK = re.compile(
     r"^((?:(2[0-3]|[01]?[0-9]):)?(?:([0-5]?[0-9]):)?([0-5]?[0-9]))$")
 
+# How long a command waits for the music nodes to come online, in seconds.
+NODES_WAIT = 5.0
+
 
 class VoiceStateError(commands.CommandError):
     """Raised when a user's voice state is invalid."""
@@ -42,13 +49,25 @@ class NoControllerError(commands.CommandError):
     pass
 
 
+class NodesOfflineError(commands.CommandError):
+    """Raised when the music nodes did not come online in time."""
+    pass
+
+
 class PhotonMusicController:
+    """The music session of a guild.
+
+    Sessions last as long as music is played, hence the session channel
+    and the DJ are kept as IDs instead of the objects of the context."""
+
+    __slots__ = ("bot", "guild_id", "channel_id", "dj_id", "player", "queue", "next", "repeat",
+                 "prev_song", "_controller_task", "destroyed")
 
     def __init__(self, ctx: commands.Context):
         self.bot: Photon = ctx.bot
         self.guild_id = ctx.guild.id
-        self.channel = ctx.channel
-        self.dj = ctx.author
+        self.channel_id = ctx.channel.id
+        self.dj_id = ctx.author.id
         self.player: wavelink.Player = self.bot.wavelink.get_player(
             self.guild_id)
 
@@ -58,9 +77,14 @@ class PhotonMusicController:
         self.prev_song = None
 
         self._controller_task: asyncio.Task = self.bot.loop.create_task(
-            self._controller())
+            deadline.detached(self._controller()))
         self.destroyed = False  # Signals if the teardown has occured.
 
+    @property
+    def channel(self) -> discord.TextChannel:
+        """The session channel."""
+        return self.bot.get_channel(self.channel_id)
+
     async def _controller(self) -> None:
         await self.bot.wait_until_ready()
         await self.player.set_volume(40)
@@ -88,11 +112,11 @@ class PhotonMusicController:
 
     def has_authority(self, user) -> bool:
         """Checks if the user has authority to execute commands."""
-        return user == self.dj or user.guild_permissions.ban_members
+        return user.id == self.dj_id or user.guild_permissions.ban_members
 
     def is_session_channel(self, channel) -> bool:
         """Checks if the user has executed the command in the session channel."""
-        return channel == self.channel
+        return channel.id == self.channel_id
 
 
 class Music(commands.Cog):
@@ -100,7 +124,7 @@ class Music(commands.Cog):
     def __init__(self, bot: Photon):
         self.bot = bot
         self._controllers = {}
-        self.node_online = False
+        self.nodes_ready = asyncio.Event()
 
         if not hasattr(bot, "wavelink"):
             self.bot.wavelink = wavelink.Client(bot=self.bot)
@@ -120,7 +144,7 @@ class Music(commands.Cog):
         for settings in config.nodes.values():
             node = await self.bot.wavelink.initiate_node(**settings)
             node.set_hook(self.on_event_hook)
-        self.node_online = True
+        self.nodes_ready.set()
 
     async def on_event_hook(self, event):
         if isinstance(event, (wavelink.TrackEnd, wavelink.TrackException)):
@@ -153,9 +177,12 @@ class Music(commands.Cog):
     async def cog_before_invoke(self, ctx):
         """Checks it the user is connected to a voice channel or not."""
 
-        if not self.node_online:
-            return await ctx.send(
-                "Please wait for a second and allow the music nodes to come online.")
+        # The nodes start with the cog, which a lazy startup loads for the first music command.
+        if not self.nodes_ready.is_set():
+            try:
+                await deadline.bounded(asyncio.wait_for(self.nodes_ready.wait(), NODES_WAIT))
+            except (asyncio.TimeoutError, deadline.DeadlineExceeded):
+                raise NodesOfflineError() from None
 
         exempted_commands = ("np", "queue")
         if ctx.author.voice is None and ctx.command.name not in exempted_commands:
@@ -164,7 +191,10 @@ class Music(commands.Cog):
     async def cog_command_error(self, ctx, error):
         """A error handler for the cog."""
 
-        if isinstance(error, VoiceStateError):
+        if isinstance(error, NodesOfflineError):
+            return await ctx.send(
+                "Please wait for a second and allow the music nodes to come online.")
+        elif isinstance(error, VoiceStateError):
             return await ctx.send(
                 f"{ctx.author.mention}, connect to a voice channel before using the command.")
         elif isinstance(error, NotPrivilegedError):
@@ -184,8 +214,13 @@ class Music(commands.Cog):
                 return await ctx.send("Please provide a valid integer to change the volume to.")
             else:
                 return await ctx.send("Could not find that user.")
+        elif isinstance(getattr(error, "original", error), Overloaded):
+            # The busy reply is sent by the global error handler.
+            return
         else:
-            self.bot.photon_log.error(f"[ERROR] Command: {ctx.command.name}, Exception: {error}.")
+            self.bot.photon_log.error(
+                "[ERROR] Command: %s, Exception: %s.", ctx.command.name, error,
+                extra=command_extra(ctx))
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
@@ -197,7 +232,7 @@ class Music(commands.Cog):
         if ctr is None or ctr.destroyed:
             return
 
-        if not ctr.dj == member or member.bot:
+        if not ctr.dj_id == member.id or member.bot:
             return
 
         # Swap the DJ is the DJ has left.
@@ -208,9 +243,9 @@ class Music(commands.Cog):
                 if m.bot:
                     pass
                 else:
-                    ctr.dj = m
+                    ctr.dj_id = m.id
                     return await ctr.channel.send(
-                        f"{ctr.dj.mention}, is now the new DJ for the session.")
+                        f"{m.mention}, is now the new DJ for the session.")
 
             # Teardown as no one is in the voice channel.
             await ctr.teardown()
@@ -235,7 +270,8 @@ class Music(commands.Cog):
         if not ctr.has_authority(ctx.author):
             raise NotPrivilegedError()
 
-        await ctr.player.connect(channel.id)
+        with span("lavalink.connect"):
+            await deadline.bounded(ctr.player.connect(channel.id))
         await ctx.send(f"⚓ Connected to {channel.mention} and bound to {ctx.channel.mention}.")
 
     @commands.command(name="play")
@@ -261,7 +297,9 @@ class Music(commands.Cog):
         # Check if the query is URL or not, and get tracks.
         if not RURL.match(query):
             query = f"ytsearch:{query}"
-        tracks = await self.bot.wavelink.get_tracks(query)
+        # Searches are shed when too many of them are running at once.
+        with self.bot.admission.slot("lavalink"), span("lavalink.get_tracks"):
+            tracks = await deadline.bounded(self.bot.wavelink.get_tracks(query))
 
         # If no results came up, abort.
         if not tracks:
@@ -608,14 +646,14 @@ class Music(commands.Cog):
             return await ctx.send("The member is not in the current voice channel.")
 
         # Check if the user is attempting to assign DJ status to himself.
-        if user == ctr.dj:
+        if user.id == ctr.dj_id:
             return await ctx.send("You are already the DJ.")
 
         # Check if the user is assigning DJ status to a bot or Photon itself.
         if len(members) <= 2 or user.bot:
             return await ctx.send("You cannot assign the DJ role to a bot or Photon itself.")
 
-        ctr.dj = user
+        ctr.dj_id = user.id
         await ctx.send(f"{user.mention} is now the new DJ.")
 
     @commands.command(name="shuffle")
@@ -1,9 +1,20 @@
 import asyncio
+import collections
 import io
+import time
 
 import discord
 from discord.ext import commands
 from bot import Photon
+from utils.logs import command_extra
+from utils.paginator import KeysetPages, ReactionPaginator
+
+NOTES_PER_PAGE = 10
+
+# The amount of users whose rendered note pages are kept, and for how
+# long, since the notes may change in another process.
+MAX_CACHED_USERS = 512
+PAGES_TTL = 300.0
 
 
 class Notes(commands.Cog):
@@ -15,6 +26,37 @@ class Notes(commands.Cog):
 
     def __init__(self, bot: Photon):
         self.bot = bot
+        self._pages = collections.OrderedDict()
+
+    def _invalidate_pages(self, user_id: int) -> None:
+        self._pages.pop(user_id, None)
+
+    def _note_pages(self, user: discord.abc.User) -> KeysetPages:
+        """Returns the note pages of the user, rendered pages are kept until the notes change."""
+
+        # The cache holds plain values only, never the user object and what it references.
+        user_id, name, avatar = user.id, user.name, str(user.avatar_url)
+        now = time.monotonic()
+        cached = self._pages.get(user_id)
+        if cached is None or cached[0] < now:
+            def fetch(after_id: int, limit: int):
+                return self.bot.database.fetch_notes_page(user_id, after_id, limit)
+
+            def render(notes: list, index: int) -> discord.Embed:
+                body = "\n".join(f"• **[{note['note_id']}]** {note['title']}" for note in notes)
+                embed = discord.Embed(title=f"Notes of {name} (Page No. {index + 1})",
+                                      description=body,
+                                      colour=discord.Colour.dark_teal())
+                embed.set_footer(text=f"Requested by {name}.", icon_url=avatar)
+                return embed
+
+            cached = self._pages[user_id] = (
+                now + PAGES_TTL, KeysetPages(fetch, render, "note_id", 0, NOTES_PER_PAGE))
+
+        self._pages.move_to_end(user_id)
+        if len(self._pages) > MAX_CACHED_USERS:
+            self._pages.popitem(last=False)
+        return cached[1]
 
     async def cog_command_error(self, ctx, error):
         """Mini error handler for this cog."""
@@ -27,7 +69,9 @@ class Notes(commands.Cog):
             else:
                 return await ctx.send("Please provide a valid Note ID.")
         else:
-            self.bot.photon_log.error(f"[ERROR] Command: {ctx.command.name}, Exception: {error}.")
+            self.bot.photon_log.error(
+                "[ERROR] Command: %s, Exception: %s.", ctx.command.name, error,
+                extra=command_extra(ctx))
 
     @commands.command(name="add")
     @commands.cooldown(1, 15.0, commands.BucketType.user)
@@ -45,17 +89,19 @@ class Notes(commands.Cog):
         await ctx.send("**Time Limit: 10 minutes, Character Limit: 2000 chars.**")
         await ctx.send("Enter content of the note below this message:")
 
-        def check_add(m):
-            return m.author == ctx.author
-
         try:
-            msg = await self.bot.wait_for(
-                "message", check=check_add, timeout=600.0)
+            msg = await self.bot.conversations.wait_for_message(
+                ctx.channel.id, ctx.author.id, timeout=600.0)
         except asyncio.TimeoutError:
             return await ctx.send("Time limit of 10 minutes reached. Please try again.")
 
         content = str(msg.content)
-        await self.bot.database.insert_note(title, content, ctx.author.id)
+        note_id = await self.bot.database.insert_note(title, content, ctx.author.id, False)
+
+        # Another note may have been added while this one was being written.
+        if note_id is None:
+            return await ctx.send("Users can only create **50** notes.")
+        self._invalidate_pages(ctx.author.id)
         await ctx.send("Note successfully added.")
 
     @commands.command(name="list")
@@ -63,31 +109,16 @@ class Notes(commands.Cog):
     async def _nlist(self, ctx, page: int = 1):
         """Lists the notes of the user invoking the command.
 
-        Specify a page number to open that page."""
-
-        notes = await self.bot.database.fetch_notes(ctx.author.id)
-        if len(notes) == 0:
-            return await ctx.send("You have not created any notes.")
-        page_trigger = 4000
-        pages = []
-        while True:
-            body = ""
-            for _ in range(len(notes)):
-                body += f"• **[{notes[0]['note_id']}]** {notes[0]['title']}\n"
-                notes.pop(0)
-                if (len(body) > page_trigger) or (len(body) < page_trigger and len(notes) == 0):
-                    embed = discord.Embed(title=f"Notes of {ctx.author.name} (Page No. {page})",
-                                          description=body,
-                                          colour=discord.Colour.dark_teal())
-                    embed.set_footer(text=f"Requested by {ctx.author.name}.",
-                                     icon_url=ctx.author.avatar_url)
-                    pages.append(embed)
-                    break
-            if len(notes) == 0:
-                break
-        if len(pages) < page:
+        Specify a page number to open that page, react to turn the pages."""
+
+        if page < 1:
             return await ctx.send(f"Page {page} does not exist.")
-        await ctx.send(embed=pages[page - 1])
+
+        paginator = ReactionPaginator(ctx, self._note_pages(ctx.author).get)
+        if not await paginator.start(page - 1):
+            if page == 1:
+                return await ctx.send("You have not created any notes.")
+            await ctx.send(f"Page {page} does not exist.")
 
     @commands.command(name="delete")
     @commands.cooldown(1, 15.0, commands.BucketType.user)
@@ -98,6 +129,7 @@ class Notes(commands.Cog):
         if title is None:
             return await ctx.send(
                 "No note with the specified note ID was found. Please try again.")
+        self._invalidate_pages(ctx.author.id)
         await ctx.send(
             f"Note with **Title:** `{title}` and **ID:** `{note_id}` was removed.")
 
@@ -1,13 +1,14 @@
 import datetime
+import math
 import textwrap
 
 import discord
 import humanize
-import psutil
 from discord.ext import commands, tasks
 
 import config
 from bot import Photon
+from utils.logs import command_extra
 
 
 class PhotonCog(commands.Cog, name="Photon"):
@@ -15,10 +16,13 @@ class PhotonCog(commands.Cog, name="Photon"):
 
     def __init__(self, bot: Photon):
         self.bot = bot
-        self.process = psutil.Process()
-        self.discord_bot_list.start()
+        self.process = None
         self.iterations = 0
 
+        # The statistics of a benchmark or replay are not posted.
+        if not bot.offline:
+            self.discord_bot_list.start()
+
     def cog_unload(self):
         self.discord_bot_list.cancel()
 
@@ -29,12 +33,18 @@ class PhotonCog(commands.Cog, name="Photon"):
             return await ctx.send("Please provide a valid prefix string.")
         else:
             self.bot.photon_log.error(
-                f"[ERROR] Command: {ctx.command.name}, Exception: {error}.")
+                "[ERROR] Command: %s, Exception: %s.", ctx.command.name, error,
+                extra=command_extra(ctx))
 
     @commands.command(name="about")
     async def _about(self, ctx):
         """Get information about Photon."""
 
+        # psutil is only imported when the command is first used.
+        import psutil
+        if self.process is None:
+            self.process = psutil.Process()
+
         # Retrieve the memory usage, dividing by 1024^2 to convert bytes to
         # mebibytes.
         memory_usage = humanize.naturalsize(
@@ -42,8 +52,7 @@ class PhotonCog(commands.Cog, name="Photon"):
         # Retrieve the CPU usage
         cpu_usage = self.process.cpu_percent() / psutil.cpu_count()
         # Get the total server and users that photon serves
-        guilds = len(self.bot.guilds)
-        unique_users = len(self.bot.users)
+        guilds, unique_users = self.bot.global_counts()
 
         # As a prerequisite for building the embed.
         desc = """Photon is a multipurpose Discord bot that aims to be user friendly and fast.
@@ -82,7 +91,8 @@ class PhotonCog(commands.Cog, name="Photon"):
         show the channel in which they are enabled and if they are disabled it
         will show that they are disabled."""
         if ctx.invoked_subcommand is None and ctx.subcommand_passed is None:
-            channel_id = await self.bot.database.get_welcome_channel(ctx.guild)
+            config = await self.bot.guild_config.get(ctx.guild.id)
+            channel_id = config.welcome
             if channel_id is None:
                 return await ctx.send("Welcome and Leave messages are disabled in this server.")
 
@@ -101,7 +111,7 @@ class PhotonCog(commands.Cog, name="Photon"):
     async def _welcome_set(self, ctx: commands.Context):
         """Set the current channel as the welcome/leave channel."""
 
-        await self.bot.database.update_welcome_channel(ctx.guild.id, ctx.channel.id)
+        await self.bot.guild_config.set_welcome(ctx.guild.id, ctx.channel.id)
         await ctx.send("The current channel was set as the welcome/leave channel.")
 
     @_welcome.command(name="disable")
@@ -110,7 +120,7 @@ class PhotonCog(commands.Cog, name="Photon"):
     async def _welcome_disable(self, ctx: commands.Context):
         """Disables the welcome and leave messages."""
 
-        await self.bot.database.update_welcome_channel(ctx.guild.id, None)
+        await self.bot.guild_config.set_welcome(ctx.guild.id, None)
         await ctx.send("Welcome and Leave messages are now disabled.")
 
     @commands.command(name="prefix")
@@ -123,10 +133,8 @@ class PhotonCog(commands.Cog, name="Photon"):
         if len(prefix) > 5:
             return await ctx.send("The prefix can only be five characters long.")
 
-        # Update the prefix
-        await self.bot.database.update_prefix(ctx.guild.id, prefix)
-
-        self.bot.prefix_list[ctx.guild.id] = prefix
+        # Update the prefix, this also updates the cached guild configuration.
+        await self.bot.guild_config.set_prefix(ctx.guild.id, prefix)
         await ctx.send(f"The prefix was successfully changed to **`{prefix}`**.")
 
     @commands.command(name="ping")
@@ -137,7 +145,9 @@ class PhotonCog(commands.Cog, name="Photon"):
         if the bot is having network problems.
         """
 
+        # Without a gateway connection, as for slash commands, there is no heartbeat.
         latency = self.bot.latency * 1000
+        heartbeat = "N/A" if math.isnan(latency) else f"{latency:.2f}ms"
 
         # Calculate the time
         message = await ctx.send("Calculating ping...")
@@ -145,7 +155,7 @@ class PhotonCog(commands.Cog, name="Photon"):
         delta = (message.created_at -
                  ctx.message.created_at).microseconds / 1000
 
-        fmt = f"\U0001F493 **{latency:.2f}ms**\n" \
+        fmt = f"\U0001F493 **{heartbeat}**\n" \
               f"\U00002194\U0000FE0F **{delta}ms**\n\n" \
               f"These values are only suggestive in nature."
 
@@ -191,6 +201,11 @@ class PhotonCog(commands.Cog, name="Photon"):
         """Posts the bot statistics to DBL fifteen minutes."""
 
         await self.bot.wait_until_ready()
+
+        # Only one process of a cluster posts the statistics of the cluster.
+        if not self.bot.is_primary:
+            return
+
         self.bot.photon_log.info("Trying to post statistics to DBL.")
 
         try:
@@ -202,9 +217,10 @@ class PhotonCog(commands.Cog, name="Photon"):
         client_id = app_info.id
         api_url = f"https://discordbotlist.com/api/v1/bots/{client_id}/stats"
 
+        guilds, users = self.bot.global_counts()
         payload = {
-            "users": len(self.bot.users),
-            "guilds": len(self.bot.guilds)
+            "users": users,
+            "guilds": guilds
         }
 
         headers = {
@@ -9,10 +9,16 @@ from discord.ext import commands
 
 from bot import Photon
 from structs import hiddenpoll
+from utils import deadline
+from utils.db import LAST_POLL_ID
+from utils.logs import command_extra
+from utils.paginator import KeysetPages, ReactionPaginator
 
 RTIME: re.Pattern = re.compile(
     r"^((?:(2[0-3]|[01]?[0-9]):)?(?:([0-5]?[0-9])))$")
 
+POLLS_PER_PAGE = 10
+
 
 class Polls(commands.Cog):
     """Create polls in Discord."""
@@ -34,7 +40,8 @@ class Polls(commands.Cog):
                 return await ctx.send("The argument provided is of an invalid type.")
         else:
             self.bot.photon_log.error(
-                f"[ERROR] Command: {ctx.command.name}, Exception: {error}.")
+                "[ERROR] Command: %s, Exception: %s.", ctx.command.name, error,
+                extra=command_extra(ctx))
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
@@ -57,6 +64,11 @@ class Polls(commands.Cog):
         self.hidden_polls.pop(poll_id)
         await self.bot.database.insert_poll(datetime.datetime.utcnow(), ctr)
 
+    def start_timeout(self, poll_id: int, time_limit: int) -> None:
+        """Ends the poll after the time limit, outside of the deadline of the command."""
+        self.tasks[poll_id] = self.bot.loop.create_task(
+            deadline.detached(self.poll_timeout(poll_id, time_limit)))
+
     @commands.command(name="poll")
     @commands.has_guild_permissions(ban_members=True)
     @commands.cooldown(1, 60.0, commands.BucketType.guild)
@@ -74,19 +86,18 @@ class Polls(commands.Cog):
         # Options of the poll.
         options = []
 
-        # A check for the message event.
-        # It checks if a message is written by the invoker of the command or not.
+        # A check for the replies of the invoker of the command.
         def check(m: discord.Message):
-            return m.author == ctx.author and m.channel == ctx.channel and len(m.content) < 80
+            return len(m.content) < 80
 
+        prompt = "You can specify a option or use `<publish>` to publish the poll."
         for i in range(5):
-            info2 = await ctx.send(
-                "You can specify a option or use `<publish>` to publish the poll.")
+            info2 = await ctx.send(prompt)
 
             # Wait for a message that satisfies the above check.
             try:
-                option: discord.Message = await self.bot.wait_for(
-                    event='message', check=check, timeout=60.0)
+                option: discord.Message = await self.bot.conversations.wait_for_message(
+                    ctx.channel.id, ctx.author.id, check=check, timeout=60.0)
             except asyncio.TimeoutError:
 
                 # If options is empty, we can't publish the poll, hence we abort the process.
@@ -102,8 +113,11 @@ class Polls(commands.Cog):
                 break
 
             options.append((chr(0x1f1e6 + i), option.clean_content))
-            opt_add = await ctx.send("Option added.")
-            messages.extend((opt_add, option, info2))
+            messages.extend((option, info2))
+
+            # The confirmation is folded into the next prompt to save a message.
+            prompt = ("Option added. You can specify another option "
+                      "or use `<publish>` to publish the poll.")
 
         # Try to delete the messages sent by the user to construct the poll.
         try:
@@ -123,9 +137,10 @@ class Polls(commands.Cog):
         # Send the embed in the channel requested by the user.
         poll_msg: discord.Message = await channel.send(embed=poll_embed)
 
-        # Add the reactions to the message.
-        for emoji, _ in options:
-            await poll_msg.add_reaction(emoji)
+        # Add the reactions to the message, they are queued in order.
+        await asyncio.gather(*[
+            self.bot.outbound.add_reaction(poll_msg, emoji) for emoji, _ in options
+        ])
 
         await ctx.send("Poll successfully created.", delete_after=5.0)
 
@@ -138,14 +153,14 @@ class Polls(commands.Cog):
 
         if ctx.invoked_subcommand is None and ctx.subcommand_passed is None:
             ongoing_apolls = [poll for poll in self.hidden_polls.values(
-            ) if poll.ctx.guild.id == ctx.guild.id]
+            ) if poll.guild_id == ctx.guild.id]
             if not ongoing_apolls:
                 return await ctx.send("There are no ongoing anonymous polls, "
                                       "you can create one through "
                                       f"`{ctx.prefix}apoll new`.")
 
             fmt = [
-                f"**[{ongoing.message.id}]** `{ongoing.question}`" for ongoing in ongoing_apolls]
+                f"**[{ongoing.message_id}]** `{ongoing.question}`" for ongoing in ongoing_apolls]
             fmt = "\n".join(fmt)
 
             embed = discord.Embed(title="Ongoing Anonymous Polls",
@@ -192,19 +207,18 @@ class Polls(commands.Cog):
         # Options of the poll.
         options = []
 
-        # A check for the message event.
-        # It checks if a message is written by the invoker of the command or not.
+        # A check for the replies of the invoker of the command.
         def check(m: discord.Message):
-            return m.author == ctx.author and m.channel == ctx.channel and len(m.content) < 80
+            return len(m.content) < 80
 
+        prompt = "You can specify a option or use `<publish>` to publish the poll."
         for i in range(5):
-            info2 = await ctx.send(
-                "You can specify a option or use `<publish>` to publish the poll.")
+            info2 = await ctx.send(prompt)
 
             # Wait for a message that satisfies the above check.
             try:
-                option: discord.Message = await self.bot.wait_for(
-                    event='message', check=check, timeout=60.0)
+                option: discord.Message = await self.bot.conversations.wait_for_message(
+                    ctx.channel.id, ctx.author.id, check=check, timeout=60.0)
             except asyncio.TimeoutError:
 
                 # If options is empty, we can't publish the poll, hence we abort the process.
@@ -220,8 +234,11 @@ class Polls(commands.Cog):
                 break
 
             options.append((chr(0x1f1e6 + i), option.clean_content))
-            opt_add = await ctx.send("Option added.")
-            messages.extend((opt_add, option, info2))
+            messages.extend((option, info2))
+
+            # The confirmation is folded into the next prompt to save a message.
+            prompt = ("Option added. You can specify another option "
+                      "or use `<publish>` to publish the poll.")
 
         # Try to delete the messages sent by the user to construct the poll.
         try:
@@ -231,8 +248,7 @@ class Polls(commands.Cog):
         poll_ctr = hiddenpoll.PollController(question, options, ctx)
         message_id = await poll_ctr.publish(channel, total_seconds)
         self.hidden_polls[message_id] = poll_ctr
-        self.tasks[message_id] = self.bot.loop.create_task(
-            self.poll_timeout(message_id, total_seconds))
+        self.start_timeout(message_id, total_seconds)
         await ctx.send("Poll successfully created.", delete_after=5.0)
 
     @_apoll.command(name="view")
@@ -249,7 +265,7 @@ class Polls(commands.Cog):
 
         poll_ctr: hiddenpoll.PollController = self.hidden_polls[poll_id]
 
-        if poll_ctr.ctx.guild.id != ctx.guild.id:
+        if poll_ctr.guild_id != ctx.guild.id:
             return
 
         result_embed = poll_ctr.construct_result_embed()
@@ -269,7 +285,7 @@ class Polls(commands.Cog):
 
         poll_ctr: hiddenpoll.PollController = self.hidden_polls[poll_id]
 
-        if poll_ctr.ctx.guild.id != ctx.guild.id:
+        if poll_ctr.guild_id != ctx.guild.id:
             return
         await poll_ctr.finish_poll()
         await poll_ctr.message.clear_reactions()
@@ -292,25 +308,26 @@ class Polls(commands.Cog):
         results of the poll with that specific poll ID
         are fetched.
 
-        In a future update, polls older than 2 months will
-        be automatically be deleted from the database."""
+        Polls are deleted from the database about two
+        months after they ended."""
 
         if poll_id is None:
-            past_polls = await self.bot.database.fetch_polls(ctx.guild.id)
+            guild_id = ctx.guild.id
 
-            if not past_polls:
-                return await ctx.send(
-                    "There seem to be **no** past anonymous polls in this server.")
+            def fetch(before_id: int, limit: int):
+                return self.bot.database.fetch_polls_page(guild_id, before_id, limit)
 
-            fmt = []
-            for poll in past_polls:
-                fmt.append(f"**[{poll['poll_id']}]** `{poll['question']}`")
-            fmt = "\n".join(fmt)
-            embed = discord.Embed(title="Past Anonymous Polls",
-                                  description=fmt,
-                                  colour=discord.Colour.dark_teal())
+            def render(polls: list, index: int) -> discord.Embed:
+                fmt = "\n".join(f"**[{poll['poll_id']}]** `{poll['question']}`" for poll in polls)
+                return discord.Embed(title=f"Past Anonymous Polls (Page No. {index + 1})",
+                                     description=fmt,
+                                     colour=discord.Colour.dark_teal())
 
-            return await ctx.send(embed=embed)
+            pages = KeysetPages(fetch, render, "poll_id", LAST_POLL_ID, POLLS_PER_PAGE)
+            if not await ReactionPaginator(ctx, pages.get).start():
+                return await ctx.send(
+                    "There seem to be **no** past anonymous polls in this server.")
+            return
 
         past_poll = await self.bot.database.fetch_poll(poll_id, ctx.guild.id)
 
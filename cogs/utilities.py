@@ -1,4 +1,5 @@
 import asyncio
+import collections
 import datetime
 import random
 import re
@@ -11,6 +12,10 @@ from discord.ext import commands, tasks
 
 import config
 from bot import Photon
+from utils import deadline
+from utils.admission import Overloaded
+from utils.checks import requires_members
+from utils.logs import command_extra
 
 RHTML = re.compile(r"<.*?>")
 
@@ -33,17 +38,57 @@ class Utilities(commands.Cog):
         self.last_fetched = None
         self.data_ready = asyncio.Event()
 
-        # pylint: disable=no-member
-        self._fetch_data.start()
+        # Recent answers of the upstream APIs, served while Photon is overloaded.
+        self._answers = collections.OrderedDict()
+
+        # The data is not fetched in a benchmark or replay, covindia then runs out of time.
+        if not bot.offline:
+            # pylint: disable=no-member
+            self._fetch_data.start()
 
     async def cog_command_error(self, ctx, error):
         """A mini error handler for this cog."""
 
         if isinstance(error, commands.MissingRequiredArgument):
             return await ctx.send(f"Please specify the **{error.param.name}** parameter.")
+        elif isinstance(getattr(error, "original", error), Overloaded):
+            # The busy reply is sent by the global error handler.
+            return
         else:
             self.bot.photon_log.error(
-                f"[ERROR] Command: {ctx.command.name}, Exception: {error}.")
+                "[ERROR] Command: %s, Exception: %s.", ctx.command.name, error,
+                extra=command_extra(ctx))
+
+    async def _admit_upstream(self, ctx, key: tuple) -> bool:
+        """Admits a command that calls an upstream API.
+
+        When Photon is overloaded the last answer to the same query is
+        sent instead and False is returned, if there is no such answer
+        the command is shed."""
+
+        stale = self._answers.get(key)
+        if self.bot.admission.admit("http", fallback="stale" if stale else "shed"):
+            ctx.admitted = "http"
+            return True
+        if stale is None:
+            raise Overloaded("http")
+
+        embed = stale.copy()
+        embed.set_footer(text="Photon is busy, this answer may be out of date.")
+        await ctx.send(embed=embed)
+        return False
+
+    def _remember(self, key: tuple, embed: discord.Embed) -> None:
+        self._answers[key] = embed
+        self._answers.move_to_end(key)
+        if len(self._answers) > 256:
+            self._answers.popitem(last=False)
+
+    async def cog_after_invoke(self, ctx):
+        """Releases the admission of the commands that called an upstream API."""
+        if getattr(ctx, "admitted", None) is not None:
+            self.bot.admission.release(ctx.admitted)
+            ctx.admitted = None
 
     # Done so as to not overwhelm the API.
     @tasks.loop(minutes=15.0)
@@ -117,7 +162,7 @@ class Utilities(commands.Cog):
     @_covindia.before_invoke
     async def _data_check(self, ctx):
         """Blocks the execution of the covindia command until data is ready."""
-        await self.data_ready.wait()
+        await deadline.bounded(self.data_ready.wait())
 
     @commands.command(name="covid")
     @commands.cooldown(1, 15.0, commands.BucketType.user)
@@ -135,7 +180,11 @@ class Utilities(commands.Cog):
         else:
             url = f"https://covid19.mathdro.id/api/countries/{country.lower()}"
             area = f"{country.upper()}"
-        async with self.bot.web.get(url) as req:
+
+        key = ("covid", country.lower())
+        if not await self._admit_upstream(ctx, key):
+            return
+        async with self.bot.web.get(url, timeout=deadline.client_timeout()) as req:
             if req.status == 404:
                 return await ctx.send("Country not found or the country doesn't have any cases.")
             data = await req.json()
@@ -159,6 +208,7 @@ class Utilities(commands.Cog):
 
         footer = f"Requested by {ctx.author.name}. Data fetched from https://covid19.mathdro.id/"
         embed.set_footer(text=footer, icon_url=ctx.author.avatar_url)
+        self._remember(key, embed)
         await ctx.send(embed=embed)
 
     @commands.command(name="random")
@@ -196,7 +246,7 @@ class Utilities(commands.Cog):
         ico = "https://raw.githubusercontent.com/nlhkabu/warehouse-ui/gh-pages/img/pypi-sml.png"
 
         # Make the GET request.
-        async with self.bot.web.get(api_url) as resp:
+        async with self.bot.web.get(api_url, timeout=deadline.client_timeout()) as resp:
 
             # If the status is non-200 tell the user to check the package name
             if resp.status != 200:
@@ -249,12 +299,17 @@ class Utilities(commands.Cog):
         The bot uses an API which has less examples documented.
         In the future there will be a switch of APIs."""
 
+        key = ("dictionary", word.lower())
+        if not await self._admit_upstream(ctx, key):
+            return
+
         req_url = f"https://owlbot.info/api/v4/dictionary/{word}"
         headers = {
             "Authorization": f"Token {config.api_keys['owlapi']}"
         }
 
-        async with self.bot.web.get(req_url, headers=headers) as resp:
+        async with self.bot.web.get(req_url, headers=headers,
+                                    timeout=deadline.client_timeout()) as resp:
             if resp.status != 200:
                 return await ctx.send("Please check the entered word, and try again.")
 
@@ -294,9 +349,11 @@ class Utilities(commands.Cog):
             embed.set_thumbnail(url=image)
 
         embed.set_footer(text=footer, icon_url=ctx.author.avatar_url)
+        self._remember(key, embed)
         await ctx.send(embed=embed)
 
     @commands.command(name="serverinfo", aliases=["si"])
+    @requires_members()
     async def _serverinfo(self, ctx: commands.Context):
         """Gives information about the server in which it is invoked."""
 
@@ -408,7 +465,12 @@ class Utilities(commands.Cog):
 
         url = "https://en.wikipedia.org/w/api.php"
 
-        async with self.bot.web.get(url, params=params_search) as resp:
+        key = ("wikipedia", query.lower())
+        if not await self._admit_upstream(ctx, key):
+            return
+
+        async with self.bot.web.get(url, params=params_search,
+                                    timeout=deadline.client_timeout()) as resp:
             search_data = await resp.json()
 
         if not search_data["query"]["search"]:
@@ -430,7 +492,8 @@ class Utilities(commands.Cog):
             "titles": title
         }
 
-        async with self.bot.web.get(url, params=params_get) as resp:
+        async with self.bot.web.get(url, params=params_get,
+                                    timeout=deadline.client_timeout()) as resp:
             get_data = await resp.json()
 
         page = get_data["query"]["pages"][0]
@@ -465,6 +528,7 @@ class Utilities(commands.Cog):
         embed.set_footer(text=f"Requested by {ctx.author.name}. Powered by Wikipedia API",
                          icon_url=ctx.author.avatar_url)
 
+        self._remember(key, embed)
         await ctx.send(embed=embed)
 
 
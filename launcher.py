@@ -1,10 +1,25 @@
+import argparse
 import asyncio
+import logging
+import multiprocessing
+import time
 
+import aiohttp
 import asyncpg
 
 import config
 from bot import Photon
-from utils import db
+from bot import extensions as bot_extensions
+from utils import db, migrations
+from utils.cluster import ClusterStats, partition_shards, pool_size_for
+from utils.dbbench import DatabaseBenchmark
+from utils.fakegateway import FakeGateway, FakeREST, make_guild, snowflake
+from utils.interactions import InteractionServer, InteractionSigner, register_commands
+from utils.loadgen import DEFAULT_MIX, LoadGenerator, install_fake_wavelink, parse_mix
+from utils.logs import setup_logging
+from utils.memorydb import MemoryDatabaseHelper
+from utils.replay import Replayer
+from utils.workers import GATEWAY_EXTENSIONS, EventRouter, WorkerFeed
 
 try:
     import uvloop
@@ -12,22 +27,434 @@ try:
 except ImportError:
     uvloop_present = False
 
+log = logging.getLogger("Photon.launcher")
 
-async def fetch_database_helper(event_loop):
-    pool = await asyncpg.create_pool(dsn=config.core["postgres_dsn"], loop=event_loop)
-    helper = db.DatabaseHelper(pool)
-    await helper.ensure_tables()
-    return helper
 
+async def fetch_database_helper(event_loop, pool_size: int = None):
+    options = {}
+    if pool_size is not None:
+        options = {"min_size": min(2, pool_size), "max_size": pool_size}
+    auto_migrate = getattr(config, "tuning", {}).get("auto_migrate", False)
+    dsn = config.core["postgres_dsn"]
+    pool = await db.create_pool(dsn, auto_migrate, loop=event_loop, **options)
+    return db.DatabaseHelper(pool, dsn)
 
-def main():
+
+async def fetch_recommended_shards(token: str) -> int:
+    """Ask Discord for the recommended amount of shards."""
+
+    headers = {"Authorization": f"Bot {token}"}
+    async with aiohttp.ClientSession() as session:
+        async with session.get("https://discord.com/api/v8/gateway/bot", headers=headers) as resp:
+            data = await resp.json()
+    return data["shards"]
+
+
+def fake_guilds(shard_ids: list, shard_count: int, per_shard: int, members: int) -> list:
+    """Builds synthetic guilds for the fake gateway."""
+
+    guilds = []
+    for shard_id in shard_ids:
+        for _ in range(per_shard):
+            guilds.append(make_guild(snowflake(shard_id, shard_count), snowflake(),
+                                     [snowflake()], [snowflake() for _ in range(members)]))
+    return guilds
+
+
+def get_event_loop():
     if uvloop_present:
         asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
-    loop = asyncio.get_event_loop()
+    return asyncio.get_event_loop()
+
+
+def run_worker(cluster_id: int, shard_ids: list, shard_count: int, stats: ClusterStats,
+               pool_size: int, fake_per_shard: int):
+    """Entry point of a cluster worker process."""
+
+    listener = setup_logging(getattr(config, "tuning", {}))
+    loop = get_event_loop()
+    helper = loop.run_until_complete(fetch_database_helper(loop, pool_size))
+    bot = Photon(helper, loop, getattr(config, "tuning", {}), cluster=stats,
+                 cluster_id=cluster_id, shard_ids=shard_ids, shard_count=shard_count,
+                 offline=bool(fake_per_shard))
+
+    if not fake_per_shard:
+        try:
+            return bot.run(config.core["token"])
+        finally:
+            listener.stop()
+
+    gateway = FakeGateway(bot, shard_ids=shard_ids, shard_count=shard_count)
+    guilds = fake_guilds(shard_ids, shard_count, fake_per_shard, 10)
+    try:
+        loop.run_until_complete(gateway.start(guilds))
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(bot.close())
+        listener.stop()
+
+
+def run_cluster(args):
+    """Start a worker process for every range of shards and watch over them."""
+
+    shard_count = args.shards
+    if shard_count is None and args.fake_gateway:
+        shard_count = args.workers
+    elif shard_count is None:
+        shard_count = asyncio.run(fetch_recommended_shards(config.core["token"]))
+
+    ranges = partition_shards(shard_count, args.workers)
+    stats = ClusterStats(len(ranges))
+    pool_size = pool_size_for(getattr(config, "tuning", {}).get("pool_size", 10), len(ranges))
+
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for cluster_id, shard_ids in enumerate(ranges):
+        process = context.Process(
+            target=run_worker,
+            args=(cluster_id, shard_ids, shard_count, stats, pool_size, args.fake_gateway),
+            name=f"photon-worker-{cluster_id}")
+        process.start()
+        processes.append(process)
+        log.info("Started worker %d with shards %d-%d.", cluster_id, shard_ids[0], shard_ids[-1])
+
+    interval = 5.0 if args.fake_gateway else 60.0
+    try:
+        while any(process.is_alive() for process in processes):
+            time.sleep(interval)
+            guilds, users = stats.totals()
+            log.info("Cluster totals. Guilds: %d Users: %d", guilds, users)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.join()
+
+
+def run_command_worker(worker_id: int, queue, shard_count: int, pool_size: int):
+    """Entry point of a command worker process of the split mode."""
+
+    listener = setup_logging(getattr(config, "tuning", {}))
+    loop = get_event_loop()
+    helper = loop.run_until_complete(fetch_database_helper(loop, pool_size))
+    names = [ext for ext in bot_extensions if ext not in GATEWAY_EXTENSIONS]
+    bot = Photon(helper, loop, getattr(config, "tuning", {}), cluster_id=worker_id,
+                 extension_names=names, shard_count=shard_count)
+
+    feed = WorkerFeed(bot, queue, shard_count)
+    try:
+        loop.run_until_complete(feed.run(config.core["token"]))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(bot.close())
+        listener.stop()
+
+
+def run_split(args):
+    """Run a thin gateway process that forwards events to command worker processes."""
+
+    shard_count = args.shards
+    if shard_count is None:
+        shard_count = asyncio.run(fetch_recommended_shards(config.core["token"]))
+
+    # The gateway process takes a share of the pool like every worker.
+    pool_size = pool_size_for(getattr(config, "tuning", {}).get("pool_size", 10),
+                              args.workers + 1)
+
+    context = multiprocessing.get_context("spawn")
+    queues = [context.Queue() for _ in range(args.workers)]
+    processes = []
+    for worker_id, queue in enumerate(queues):
+        process = context.Process(
+            target=run_command_worker, args=(worker_id, queue, shard_count, pool_size),
+            name=f"photon-commands-{worker_id}")
+        process.start()
+        processes.append(process)
+    log.info("Started %d command workers.", len(processes))
+
+    loop = get_event_loop()
+    try:
+        helper = loop.run_until_complete(fetch_database_helper(loop, pool_size))
+        bot = Photon(helper, loop, getattr(config, "tuning", {}),
+                     extension_names=list(GATEWAY_EXTENSIONS), router=EventRouter(queues),
+                     shard_count=shard_count)
+        bot.run(config.core["token"])
+    finally:
+        for process in processes:
+            process.join()
+
+
+def run_single(args):
+    loop = get_event_loop()
     helper = loop.run_until_complete(fetch_database_helper(loop))
-    bot = Photon(helper, loop)
+    bot = Photon(helper, loop, getattr(config, "tuning", {}))
     bot.run(config.core["token"])
 
 
+def run_bench(args):
+    """Drive a Photon instance with synthetic commands and report the throughput."""
+
+    loop = get_event_loop()
+    if args.postgres:
+        helper = loop.run_until_complete(fetch_database_helper(loop))
+    else:
+        helper = MemoryDatabaseHelper()
+
+    bot = Photon(helper, loop, getattr(config, "tuning", {}), offline=True)
+    install_fake_wavelink(bot)
+    gateway = FakeGateway(bot, rest=FakeREST(latency=args.rest_latency))
+    generator = LoadGenerator(bot, gateway, args.guilds, args.members, parse_mix(args.mix))
+
+    try:
+        report = loop.run_until_complete(generator.run(args.rate, args.duration))
+    finally:
+        loop.run_until_complete(bot.close())
+
+    log.info(
+        "Sent: %d Completed: %d Failed: %d Unfinished: %d", report["sent"],
+        report["completed"], report["failed"], report["unfinished"])
+    for error, count in sorted(report["errors"].items(), key=lambda item: -item[1]):
+        log.info("Failed with %s: %d", error, count)
+    log.info(
+        "Commands/sec: %.1f p50: %.2fms p99: %.2fms Drain: %.1fs",
+        report["commands_per_second"], report["p50_ms"], report["p99_ms"], report["drain_s"])
+    log.info(
+        "Memory growth: %.1fMiB REST calls: %d", report["memory_growth_mib"],
+        report["rest_calls"])
+
+
+def run_replay(args):
+    """Replay a gateway capture against local stand-ins and report the timings."""
+
+    loop = get_event_loop()
+    if args.postgres:
+        helper = loop.run_until_complete(fetch_database_helper(loop))
+    else:
+        helper = MemoryDatabaseHelper()
+
+    # The replay must not record itself.
+    tuning = dict(getattr(config, "tuning", {}))
+    tuning.pop("record_gateway", None)
+
+    bot = Photon(helper, loop, tuning, offline=True)
+    install_fake_wavelink(bot)
+    replayer = Replayer(bot, args.capture, args.speed, FakeREST(latency=args.rest_latency))
+
+    try:
+        report = loop.run_until_complete(replayer.run())
+    finally:
+        loop.run_until_complete(bot.close())
+
+    log.info("Replayed %d events in %.2fs, %d events skipped.",
+             report["events"], report["elapsed"], report["skipped"])
+    for kind in ("listeners", "commands"):
+        timings = sorted(report[kind].items(), key=lambda item: item[1]["p99_ms"], reverse=True)
+        for name, timing in timings:
+            log.info("%s %s: count %d mean %.2fms p99 %.2fms", kind[:-1].title(), name,
+                     timing["count"], timing["mean_ms"], timing["p99_ms"])
+
+
+async def serve_interactions(bot, register: bool) -> None:
+    """Serve interactions without connecting to the gateway."""
+
+    await bot.http.static_login(config.core["token"], bot=True)
+    await bot.prepare()
+    if register:
+        log.info("Registered %d slash commands.", await register_commands(bot))
+    await asyncio.Event().wait()
+
+
+async def send_local_interactions(bot, host: str, port: int, lines: list) -> None:
+    """Serve interactions signed by a local stand-in for Discord and send some."""
+
+    signer = InteractionSigner()
+    guild_id, channel_id, user_id = snowflake(), snowflake(), snowflake()
+    gateway = FakeGateway(bot, rest=FakeREST())
+    await gateway.start([make_guild(guild_id, snowflake(), [channel_id], [user_id])])
+
+    server = InteractionServer(bot, signer.public_key, host, port,
+                               api_base=f"http://{host}:{port}/_local", local=True)
+    await server.start()
+    try:
+        async with aiohttp.ClientSession() as session:
+            for line in lines:
+                name, _, arguments = line.partition(" ")
+                interaction = signer.interaction(name, arguments, guild_id, channel_id, user_id)
+                response = await signer.send(session, f"http://{host}:{port}/interactions",
+                                             interaction)
+                log.info("Interaction %s answered with type %d.", name, response["type"])
+
+        # Wait for the deferred commands to send their replies.
+        while server.completed < server.handled:
+            await asyncio.sleep(0.05)
+    finally:
+        await server.close()
+
+
+def run_interactions(args):
+    """Serve Discord interactions from a webhook server, without a gateway connection."""
+
+    loop = get_event_loop()
+    if args.local:
+        bot = Photon(MemoryDatabaseHelper(), loop, getattr(config, "tuning", {}), offline=True)
+        install_fake_wavelink(bot)
+        try:
+            loop.run_until_complete(
+                send_local_interactions(bot, args.host, args.port, args.send))
+        finally:
+            loop.run_until_complete(bot.close())
+        return
+
+    tuning = dict(getattr(config, "tuning", {}))
+    tuning["interactions_port"] = args.port
+    tuning["interactions_host"] = args.host
+    helper = loop.run_until_complete(fetch_database_helper(loop))
+    bot = Photon(helper, loop, tuning)
+    try:
+        loop.run_until_complete(serve_interactions(bot, args.register))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(bot.close())
+
+
+def run_dbbench(args):
+    """Measure the latency of every database read against the configured Postgres."""
+
+    loop = get_event_loop()
+    helper = loop.run_until_complete(fetch_database_helper(loop))
+    try:
+        report = loop.run_until_complete(DatabaseBenchmark(helper, args.iterations).run())
+    finally:
+        loop.run_until_complete(helper.close_database_pool())
+
+    for name, timing in report.items():
+        log.info("%s: transaction %.3fms prepared %.3fms saved %.3fms", name,
+                 timing["legacy_ms"], timing["current_ms"], timing["saved_ms"])
+
+
+async def apply_migrations(status: bool) -> None:
+    """Apply the pending migrations over a connection of their own."""
+
+    con = await asyncpg.connect(dsn=config.core["postgres_dsn"])
+    try:
+        if status:
+            applied = await migrations.applied_versions(con)
+            for migration in migrations.load_migrations():
+                state = "applied" if migration.version in applied else "pending"
+                log.info("%s: %s", migration.filename, state)
+            return
+
+        applied = await migrations.migrate(con)
+        for migration in applied:
+            log.info("Applied %s.", migration.filename)
+        log.info("The database is up to date, %d migrations applied.", len(applied))
+    finally:
+        await con.close()
+
+
+def run_migrate(args):
+    """Apply the pending database migrations, or show which are pending."""
+    asyncio.run(apply_migrations(args.status))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Launches Photon.")
+    parser.set_defaults(func=run_single)
+    subparsers = parser.add_subparsers(title="modes")
+
+    run_parser = subparsers.add_parser("run", help="Run a single Photon process (default).")
+    run_parser.set_defaults(func=run_single)
+
+    cluster_parser = subparsers.add_parser(
+        "cluster", help="Run Photon as several processes over ranges of shards.")
+    cluster_parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                                help="The amount of worker processes.")
+    cluster_parser.add_argument(
+        "--shards", type=int, default=None,
+        help="The total amount of shards, as recommended by Discord if omitted.")
+    cluster_parser.add_argument(
+        "--fake-gateway", type=int, default=0, metavar="GUILDS",
+        help="Connect to a local fake gateway with GUILDS guilds per shard.")
+    cluster_parser.set_defaults(func=run_cluster)
+
+    split_parser = subparsers.add_parser(
+        "split", help="Run the gateway and the commands in separate processes.")
+    split_parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                              help="The amount of command worker processes.")
+    split_parser.add_argument(
+        "--shards", type=int, default=None,
+        help="The total amount of shards, as recommended by Discord if omitted.")
+    split_parser.set_defaults(func=run_split)
+
+    bench_parser = subparsers.add_parser(
+        "bench", help="Measure command throughput against a fake gateway.")
+    bench_parser.add_argument("--guilds", type=int, default=100,
+                              help="The amount of synthetic guilds.")
+    bench_parser.add_argument("--members", type=int, default=20,
+                              help="The amount of members of every guild.")
+    bench_parser.add_argument("--rate", type=float, default=1000.0,
+                              help="The amount of messages sent every second.")
+    bench_parser.add_argument("--duration", type=float, default=30.0,
+                              help="How long messages are sent in seconds.")
+    bench_parser.add_argument(
+        "--mix", default=",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()),
+        help="The relative weights of the commands, for example ping=4,list=2.")
+    bench_parser.add_argument("--rest-latency", type=float, default=0.0,
+                              help="The simulated latency of the REST API in seconds.")
+    bench_parser.add_argument("--postgres", action="store_true",
+                              help="Use the configured Postgres instead of in-memory storage.")
+    bench_parser.set_defaults(func=run_bench)
+
+    replay_parser = subparsers.add_parser(
+        "replay", help="Replay a gateway capture and report listener and command timings.")
+    replay_parser.add_argument("capture", help="The capture file written by record_gateway.")
+    replay_parser.add_argument("--speed", type=float, default=1.0,
+                               help="The replay speed, 10 replays ten times as fast.")
+    replay_parser.add_argument("--rest-latency", type=float, default=0.0,
+                               help="The simulated latency of the REST API in seconds.")
+    replay_parser.add_argument("--postgres", action="store_true",
+                               help="Use the configured Postgres instead of in-memory storage.")
+    replay_parser.set_defaults(func=run_replay)
+
+    migrate_parser = subparsers.add_parser(
+        "migrate", help="Apply the pending database migrations.")
+    migrate_parser.add_argument("--status", action="store_true",
+                                help="Only show which migrations are applied and pending.")
+    migrate_parser.set_defaults(func=run_migrate)
+
+    dbbench_parser = subparsers.add_parser(
+        "dbbench", help="Compare the database reads with their previous transaction path.")
+    dbbench_parser.add_argument("--iterations", type=int, default=500,
+                                help="How often every read is run.")
+    dbbench_parser.set_defaults(func=run_dbbench)
+
+    interactions_parser = subparsers.add_parser(
+        "interactions", help="Serve slash commands from a webhook server, without a gateway.")
+    interactions_parser.add_argument("--host", default="127.0.0.1",
+                                     help="The address the webhook server binds to.")
+    interactions_parser.add_argument("--port", type=int, default=8080,
+                                     help="The port the webhook server listens on.")
+    interactions_parser.add_argument("--register", action="store_true",
+                                     help="Register the slash commands with Discord first.")
+    interactions_parser.add_argument(
+        "--local", action="store_true",
+        help="Sign interactions locally and log the replies instead of contacting Discord.")
+    interactions_parser.add_argument(
+        "--send", nargs="*", default=["ping", "serverinfo", "list"], metavar="COMMAND",
+        help="The commands sent in the local mode, for example \"list 2\".")
+    interactions_parser.set_defaults(func=run_interactions)
+
+    args = parser.parse_args()
+    listener = setup_logging(getattr(config, "tuning", {}))
+    try:
+        args.func(args)
+    finally:
+        listener.stop()
+
+
 if __name__ == "__main__":
     main()
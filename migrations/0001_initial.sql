@@ -0,0 +1,24 @@
+-- The tables that used to be created on every startup, existing databases already have them.
+
+CREATE TABLE IF NOT EXISTS guild(
+    guild_id bigint PRIMARY KEY,
+    prefix varchar(5) DEFAULT '&',
+    welcome bigint
+);
+
+CREATE TABLE IF NOT EXISTS polls(
+    poll_id bigint PRIMARY KEY,
+    guild_id bigint,
+    question varchar(2000),
+    start_time timestamp with time zone,
+    end_time timestamp with time zone,
+    votes integer[],
+    options varchar(2000)[]
+);
+
+CREATE TABLE IF NOT EXISTS notes(
+    note_id bigserial PRIMARY KEY,
+    user_id bigint,
+    title varchar(40),
+    content varchar(2000)
+);
@@ -0,0 +1,10 @@
+-- The amount of notes of every user, which enforces the note quota.
+
+CREATE TABLE IF NOT EXISTS note_counts(
+    user_id bigint PRIMARY KEY,
+    count integer NOT NULL DEFAULT 0
+);
+
+INSERT INTO note_counts
+    SELECT user_id, count(*) FROM notes GROUP BY user_id
+    ON CONFLICT (user_id) DO NOTHING;
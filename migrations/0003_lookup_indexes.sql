@@ -0,0 +1,6 @@
+-- fetch_notes and fetch_note filter on the user, the title is included so that
+-- listing the notes of a user is an index only scan.
+CREATE INDEX IF NOT EXISTS notes_user_id_note_id ON notes (user_id, note_id) INCLUDE (title);
+
+-- fetch_polls and fetch_poll filter on the guild.
+CREATE INDEX IF NOT EXISTS polls_guild_id_poll_id ON polls (guild_id, poll_id);
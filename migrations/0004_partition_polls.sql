@@ -0,0 +1,76 @@
+-- Polls are partitioned by the UTC month they ended in, polls past the
+-- retention period are removed by dropping the partition of their month.
+--
+-- The primary key of a partitioned table has to include the partition
+-- key, so poll_id alone is no longer enforced to be unique. Poll IDs are
+-- the IDs of the poll messages, which Discord never reuses, and polls are
+-- looked up by guild and ID through the polls_guild_id_poll_id index.
+
+-- Every poll ends when it is inserted, a poll without an end time could
+-- not be placed in a partition, so the migration refuses to drop it.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM polls WHERE end_time IS NULL) THEN
+        RAISE EXCEPTION 'polls has rows without an end_time, set or delete them first';
+    END IF;
+END;
+$$;
+
+ALTER TABLE polls RENAME TO polls_unpartitioned;
+ALTER TABLE polls_unpartitioned RENAME CONSTRAINT polls_pkey TO polls_unpartitioned_pkey;
+
+CREATE TABLE polls(
+    poll_id bigint NOT NULL,
+    guild_id bigint,
+    question varchar(2000),
+    start_time timestamp with time zone,
+    end_time timestamp with time zone NOT NULL,
+    votes integer[],
+    options varchar(2000)[],
+    PRIMARY KEY (poll_id, end_time)
+) PARTITION BY RANGE (end_time);
+
+-- Creates the partition of the month of the UTC timestamp, if it does not exist.
+CREATE OR REPLACE FUNCTION create_polls_partition(month timestamp) RETURNS void AS $$
+DECLARE
+    first timestamp := date_trunc('month', month);
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF polls FOR VALUES FROM (%L) TO (%L);',
+        'polls_' || to_char(first, 'YYYY_MM'),
+        first AT TIME ZONE 'UTC',
+        (first + interval '1 month') AT TIME ZONE 'UTC');
+END;
+$$ LANGUAGE plpgsql;
+
+-- Drops the partitions of the months that ended before the UTC timestamp and returns them.
+CREATE OR REPLACE FUNCTION drop_polls_partitions(cutoff timestamp) RETURNS SETOF text AS $$
+DECLARE
+    partition text;
+BEGIN
+    FOR partition IN
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = 'polls'::regclass
+            AND child.relname ~ '^polls_\d{4}_\d{2}$'
+            AND to_date(substring(child.relname FROM 7), 'YYYY_MM') + interval '1 month' <= cutoff
+        ORDER BY child.relname
+    LOOP
+        EXECUTE format('DROP TABLE %I;', partition);
+        RETURN NEXT partition;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_polls_partition(month) FROM generate_series(
+    date_trunc('month',
+        LEAST((SELECT min(end_time) FROM polls_unpartitioned), now()) AT TIME ZONE 'UTC'),
+    date_trunc('month', now() AT TIME ZONE 'UTC') + interval '1 month',
+    interval '1 month') AS month;
+
+INSERT INTO polls SELECT * FROM polls_unpartitioned;
+DROP TABLE polls_unpartitioned;
+
+-- The history of a guild is listed newest first from this index, the
+-- question is included so that listing it reads no poll rows.
+CREATE INDEX polls_guild_id_poll_id ON polls (guild_id, poll_id) INCLUDE (question);
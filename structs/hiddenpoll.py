@@ -1,5 +1,4 @@
 import asyncio
-import collections
 import datetime
 
 import discord
@@ -7,19 +6,23 @@ from discord.ext import commands
 
 
 class VotesCounter:
+    """The vote counts of an anonymous poll, every user votes once."""
+
+    __slots__ = ("_votes", "_voters")
 
     def __init__(self, options: list):
-        self._votes = collections.Counter()
-        for option in options:
-            self._votes[option] = 0
-        self._ledger = []
+        self._votes = dict.fromkeys(options, 0)
+        self._voters = set()
 
     def increment(self, option: str, user_id: int) -> None:
         """Increment the vote count for the given option by one."""
-        if user_id in self._ledger:
+        if user_id in self._voters:
             return
         self._votes[option] += 1
-        self._ledger.append(user_id)
+        self._voters.add(user_id)
+
+    def __contains__(self, option: str) -> bool:
+        return option in self._votes
 
     def retrieve(self, option: str) -> int:
         """Retrieve the vote count for the given option."""
@@ -29,26 +32,41 @@ class VotesCounter:
 class PollController:
     """A anonymous poll controller.
 
+    Polls last up to a day, hence only the IDs and the fields needed
+    to render the poll are kept instead of the invocation context.
+
     Arguments
     ----------
     question : str
         The poll question.
     options : list
         The list of options.
+    ctx : commands.Context
+        The context of the command that created the poll.
     """
 
+    __slots__ = ("bot", "question", "options", "guild_id", "channel_id", "message_id",
+                 "author_name", "author_avatar", "votes", "start")
+
     def __init__(self, question: str, options: list, ctx: commands.Context):
+        self.bot = ctx.bot
         self.question = question
-        self.options = options
-        self.exempted = [emoji for emoji, _ in options]
-        self.ctx = ctx
-        self.embed: discord.Embed = None
-        self.votes = VotesCounter(self.exempted)
-        self._lock = asyncio.Lock()
-        self.message: discord.Message = None
+        self.options = tuple(options)
+        self.guild_id = ctx.guild.id
+        self.channel_id: int = None
+        self.message_id: int = None
+        self.author_name = ctx.author.name
+        self.author_avatar = str(ctx.author.avatar_url)
+        self.votes = VotesCounter([emoji for emoji, _ in options])
         self.start: datetime.datetime = None
 
-    def construct_embed(self, time_limit) -> None:
+    @property
+    def message(self) -> discord.PartialMessage:
+        """The published poll message, built from the IDs on every use."""
+        channel = self.bot.get_channel(self.channel_id)
+        return channel.get_partial_message(self.message_id)
+
+    def construct_embed(self, time_limit) -> discord.Embed:
         """Method that constructs the embed."""
 
         description = "\n\n".join(
@@ -58,8 +76,8 @@ class PollController:
                                    description=description,
                                    colour=discord.Colour.dark_green())
 
-        temp_embed.set_footer(text=f"Asked by {self.ctx.author.name}.",
-                              icon_url=self.ctx.author.avatar_url)
+        temp_embed.set_footer(text=f"Asked by {self.author_name}.",
+                              icon_url=self.author_avatar)
 
         temp_embed.add_field(name="**Status**", value="Ongoing")
 
@@ -67,7 +85,7 @@ class PollController:
         etime = self.start + datetime.timedelta(seconds=time_limit)
         fmt_time = etime.strftime("%d/%m/%Y %H:%M:%S")
         temp_embed.add_field(name="**Ending at**", value=fmt_time + " UTC")
-        self.embed = temp_embed
+        return temp_embed
 
     def construct_result_embed(self) -> discord.Embed:
         """Method that constructs the result embed."""
@@ -82,30 +100,29 @@ class PollController:
                               description=fmt,
                               colour=discord.Colour.dark_teal())
 
-        embed.set_author(name=f"Poll ID: {self.message.id}")
+        embed.set_author(name=f"Poll ID: {self.message_id}")
 
-        embed.set_footer(text=f"Asked by {self.ctx.author.name}.",
-                         icon_url=self.ctx.author.avatar_url)
+        embed.set_footer(text=f"Asked by {self.author_name}.",
+                         icon_url=self.author_avatar)
 
         return embed
 
     async def finish_poll(self) -> None:
         """Updates the poll embed on finish."""
 
-        result = self.construct_result_embed()
-        self.embed = result
-        await self.message.edit(embed=self.embed)
+        await self.bot.outbound.edit(self.message, embed=self.construct_result_embed())
 
     async def publish(self, channel: discord.TextChannel, time_limit: int) -> int:
         """Publish the poll to the given channel."""
 
-        if self.embed is None:
-            self.construct_embed(time_limit)
-        message: discord.Message = await channel.send(embed=self.embed)
-        for emoji, _ in self.options:
-            await message.add_reaction(emoji)
+        message: discord.Message = await channel.send(embed=self.construct_embed(time_limit))
+        outbound = self.bot.outbound
+        await asyncio.gather(*[
+            outbound.add_reaction(message, emoji) for emoji, _ in self.options
+        ])
 
-        self.message = message
+        self.channel_id = channel.id
+        self.message_id = message.id
         return message.id
 
     async def event_hook(self, payload: discord.RawReactionActionEvent):
@@ -113,8 +130,9 @@ class PollController:
 
         if payload.emoji.is_custom_emoji():
             return await self.message.clear_reaction(payload.emoji)
-        elif payload.emoji.name not in self.exempted:
+        elif payload.emoji.name not in self.votes:
             return await self.message.clear_reaction(payload.emoji)
-        async with self._lock:
-            self.votes.increment(payload.emoji.name, payload.member.id)
-        await self.message.remove_reaction(payload.emoji, payload.member)
+        self.votes.increment(payload.emoji.name, payload.member.id)
+
+        # Removing the vote reaction is not urgent, it is queued behind other operations.
+        self.bot.outbound.remove_reaction(self.message, payload.emoji, payload.member)
@@ -0,0 +1,50 @@
+import asyncio
+import types
+
+import pytest
+
+polls = pytest.importorskip("cogs.polls")
+from utils import deadline  # noqa: E402
+
+
+class _Message:
+    async def clear_reactions(self):
+        pass
+
+
+class _Controller:
+    message = _Message()
+
+    async def finish_poll(self):
+        pass
+
+
+class _Database:
+    def __init__(self):
+        self.polls = []
+
+    @deadline.with_deadline
+    async def insert_poll(self, end, ctr):
+        self.polls.append(ctr)
+
+
+def test_poll_timeout_stores_poll_after_command_deadline():
+    loop = asyncio.new_event_loop()
+    bot = types.SimpleNamespace(loop=loop, database=_Database())
+    cog = polls.Polls(bot)
+    controller = _Controller()
+
+    async def command():
+        # The poll is created by a command whose budget runs out long before the poll ends.
+        deadline.start(0.01)
+        cog.hidden_polls[1] = controller
+        cog.start_timeout(1, 0.05)
+        await cog.tasks[1]
+
+    try:
+        loop.run_until_complete(command())
+    finally:
+        loop.close()
+
+    assert bot.database.polls == [controller]
+    assert cog.hidden_polls == {} and cog.tasks == {}
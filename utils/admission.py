@@ -0,0 +1,77 @@
+import collections
+import contextlib
+
+from discord.ext import commands
+
+__all__ = ["AdmissionController", "Overloaded", "DEFAULT_LIMITS"]
+
+# The default amount of concurrent operations of every class of expensive work.
+DEFAULT_LIMITS = {
+    "image": 4,
+    "http": 16,
+    "lavalink": 8
+}
+
+
+class Overloaded(commands.CommandError):
+    """Raised when a command is shed because Photon is overloaded."""
+
+    def __init__(self, work_class: str):
+        self.work_class = work_class
+        super().__init__(f"Photon is overloaded, {work_class} work is being shed.")
+
+
+class AdmissionController:
+    """Limits the expensive work that runs concurrently.
+
+    Work is admitted as long as its class is below its in-flight limit
+    and the event loop lag is below the maximum. Otherwise the caller
+    degrades, and the way it degrades is recorded as the decision.
+
+    Arguments
+    ----------
+    watchdog : LagWatchdog
+        The watchdog that measures the event loop lag.
+    limits : dict
+        The in-flight limits of the work classes, merged with DEFAULT_LIMITS.
+    max_lag : float
+        The event loop lag in seconds above which no work is admitted.
+    """
+
+    def __init__(self, watchdog, limits: dict = None, max_lag: float = 0.5):
+        self.watchdog = watchdog
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.max_lag = max_lag
+        self.in_flight = collections.Counter()
+        self.decisions = collections.Counter()
+
+    def admit(self, work_class: str, fallback: str = "shed") -> bool:
+        """Tries to admit work, the fallback is recorded when it is not admitted.
+
+        Admitted work has to be released with release."""
+
+        overloaded = (
+            self.in_flight[work_class] >= self.limits.get(work_class, float("inf"))
+            or self.watchdog.current_lag() > self.max_lag
+        )
+        if overloaded:
+            self.decisions[(work_class, fallback)] += 1
+            return False
+
+        self.in_flight[work_class] += 1
+        self.decisions[(work_class, "admitted")] += 1
+        return True
+
+    def release(self, work_class: str) -> None:
+        self.in_flight[work_class] -= 1
+
+    @contextlib.contextmanager
+    def slot(self, work_class: str):
+        """Runs the block as admitted work, raising Overloaded if it is not admitted."""
+
+        if not self.admit(work_class):
+            raise Overloaded(work_class)
+        try:
+            yield
+        finally:
+            self.release(work_class)
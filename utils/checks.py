@@ -0,0 +1,20 @@
+from discord.ext import commands
+
+__all__ = ["requires_members"]
+
+
+async def _chunk_guild(_cog: commands.Cog, ctx: commands.Context) -> None:
+    # Hooks of commands that belong to a cog are called with the cog first.
+    guild = ctx.guild
+    if guild is not None and not guild.chunked:
+        await guild.chunk(cache=True)
+
+
+def requires_members():
+    """Chunks the guild before the command is invoked if its member cache is incomplete.
+
+    Photon does not chunk guilds at startup in the lean cache mode, so
+    commands that look at every member of a guild have to ask for them.
+    Only commands of a cog can use it."""
+
+    return commands.before_invoke(_chunk_guild)
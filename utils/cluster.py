@@ -0,0 +1,49 @@
+import math
+import multiprocessing
+
+__all__ = ["ClusterStats", "partition_shards", "pool_size_for"]
+
+
+def partition_shards(shard_count: int, workers: int) -> list:
+    """Split the shard ids into contiguous ranges, one for every worker."""
+
+    per_worker = math.ceil(shard_count / workers)
+    ranges = []
+    for start in range(0, shard_count, per_worker):
+        ranges.append(list(range(start, min(start + per_worker, shard_count))))
+    return ranges
+
+
+def pool_size_for(total_size: int, workers: int) -> int:
+    """The pool size of a single worker so that the cluster stays within the total."""
+    return max(2, total_size // workers)
+
+
+class ClusterStats:
+    """Guild and user counts of every worker of a cluster.
+
+    The counts live in shared memory, every worker writes its own slots
+    and reads the sum of all of them, so no locks are necessary.
+
+    Arguments
+    ----------
+    workers : int
+        The amount of worker processes in the cluster.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._counts = multiprocessing.Array("q", workers * 2, lock=False)
+
+    def publish(self, worker_id: int, guilds: int, users: int) -> None:
+        """Publish the counts of a worker."""
+        self._counts[worker_id * 2] = guilds
+        self._counts[worker_id * 2 + 1] = users
+
+    def totals(self) -> tuple:
+        """Returns the guild and user count of the whole cluster.
+
+        Users are counted per worker, hence users that share guilds
+        served by different workers are counted more than once."""
+        counts = self._counts[:]
+        return sum(counts[0::2]), sum(counts[1::2])
@@ -0,0 +1,13 @@
+from discord.ext import commands
+
+from utils import tracing
+
+__all__ = ["PhotonContext"]
+
+
+class PhotonContext(commands.Context):
+    """The invocation context used by Photon."""
+
+    async def send(self, *args, **kwargs):
+        with tracing.span("discord.send"):
+            return await super().send(*args, **kwargs)
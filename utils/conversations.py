@@ -0,0 +1,72 @@
+import asyncio
+
+import discord
+
+from utils import deadline
+
+__all__ = ["ConversationDispatcher"]
+
+
+class ConversationDispatcher:
+    """Routes messages to the commands that wait for a reply.
+
+    Waiters are indexed by channel and author, so every message is
+    matched against the waiters of its own channel and author only,
+    instead of against every pending check like Client.wait_for does.
+
+    Arguments
+    ----------
+    loop : asyncio.AbstractEventLoop
+        The loop the waiters are created on.
+    max_timeout : float
+        The upper bound of the timeout of every waiter in seconds.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_timeout: float = 600.0):
+        self.loop = loop
+        self.max_timeout = max_timeout
+        self.routed = 0
+        self._waiters = {}
+
+    @property
+    def pending(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def wait_for_message(self, channel_id: int, author_id: int, check=None,
+                               timeout: float = 60.0) -> discord.Message:
+        """Waits for a message of the author in the channel that passes the check.
+
+        Raises asyncio.TimeoutError like Client.wait_for if no such message
+        arrives in time, the timeout is capped at max_timeout. The deadline
+        of the command restarts once the reply arrives."""
+
+        key = (channel_id, author_id)
+        waiter = (self.loop.create_future(), check)
+        self._waiters.setdefault(key, []).append(waiter)
+        try:
+            message = await asyncio.wait_for(waiter[0], min(timeout, self.max_timeout))
+            deadline.renew()
+            return message
+        finally:
+            waiters = self._waiters.get(key)
+            if waiters is not None:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._waiters[key]
+
+    def route(self, message: discord.Message) -> None:
+        """Resolves the waiters of the channel and author of the message."""
+
+        waiters = self._waiters.get((message.channel.id, message.author.id))
+        if not waiters:
+            return
+
+        for future, check in waiters:
+            if future.done():
+                continue
+            try:
+                if check is None or check(message):
+                    self.routed += 1
+                    future.set_result(message)
+            except Exception as e:
+                future.set_exception(e)
@@ -1,3 +1,6 @@
+import asyncio
+import contextlib
+import logging
 from datetime import datetime
 from typing import Union
 
@@ -5,71 +8,269 @@ import asyncpg
 import discord
 
 from structs.hiddenpoll import PollController
+from utils import migrations
+from utils.deadline import with_deadline
+from utils.tracing import span, traced
+
+__all__ = [
+    "QUERIES", "PhotonConnection", "create_pool", "note_limit", "DatabaseHelper"
+]
+
+# The channel on which guild configuration changes are announced.
+GUILD_CHANNEL = "photon_guild_config"
+
+# How often the listener connection is checked, and how long a check may take, in seconds.
+LISTENER_CHECK_INTERVAL = 15.0
+LISTENER_CHECK_TIMEOUT = 5.0
+
+log = logging.getLogger("Photon.db")
+
+# The amount of notes a user may keep.
+NOTE_LIMIT = 50
+PREMIUM_NOTE_LIMIT = 150
+
+# The cursor of fetch_polls_page before the newest poll of a guild.
+LAST_POLL_ID = 2 ** 63 - 1
+
+# Held while the poll partitions are maintained, so that one process does it at a time.
+POLLS_LOCK_KEY = 0x504f4c4c53
+
+# Every statement of the helper, prepared once on every pooled connection.
+QUERIES = {
+    "notify_guild_change": "SELECT pg_notify($1, $2);",
+    "create_guild_entry": "INSERT INTO guild VALUES ($1, $2, $3);",
+    "delete_guild_entry": "DELETE FROM guild WHERE guild_id = $1;",
+    "fetch_guild_configs": "SELECT guild_id, prefix, welcome FROM guild LIMIT $1;",
+    "fetch_guild_config": "SELECT guild_id, prefix, welcome FROM guild WHERE guild_id = $1;",
+    "get_welcome_channel": "SELECT welcome FROM guild WHERE guild_id = $1;",
+    "update_welcome_channel": "UPDATE guild SET welcome = $1 WHERE guild_id = $2;",
+    "update_prefix": "UPDATE guild SET prefix = $1 WHERE guild_id = $2;",
+    "is_allowed_notes": "SELECT count FROM note_counts WHERE user_id = $1;",
+    # The counter of the user is only incremented below the limit, and the
+    # note is only inserted if it was, so the quota holds under concurrency.
+    "insert_note": """
+        WITH counter AS (
+            INSERT INTO note_counts AS c (user_id, count) VALUES ($1, 1)
+            ON CONFLICT (user_id) DO UPDATE SET count = c.count + 1 WHERE c.count < $4
+            RETURNING user_id
+        )
+        INSERT INTO notes (user_id, title, content)
+            SELECT user_id, $2, $3 FROM counter
+        RETURNING note_id;""",
+    "fetch_notes": "SELECT note_id, title FROM notes WHERE user_id = $1;",
+    # Served from the (user_id, note_id) INCLUDE (title) index, a page costs
+    # the same however deep into the notes of the user it is.
+    "fetch_notes_page": """
+        SELECT note_id, title FROM notes WHERE user_id = $1 AND note_id > $2
+        ORDER BY note_id LIMIT $3;""",
+    "delete_note": """
+        WITH deleted AS (
+            DELETE FROM notes WHERE user_id = $1 AND note_id = $2 RETURNING user_id, title
+        ), counter AS (
+            UPDATE note_counts SET count = count - 1
+            WHERE user_id IN (SELECT user_id FROM deleted)
+        )
+        SELECT title FROM deleted;""",
+    "fetch_note": "SELECT content, title FROM notes WHERE user_id = $1 AND note_id = $2;",
+    "insert_poll": "INSERT INTO polls VALUES ($1, $2, $3, $4, $5, $6, $7);",
+    # Newest first from the (guild_id, poll_id) INCLUDE (question) index.
+    "fetch_polls_page": """
+        SELECT poll_id, question FROM polls WHERE guild_id = $1 AND poll_id < $2
+        ORDER BY poll_id DESC LIMIT $3;""",
+    "fetch_poll": "SELECT * FROM polls WHERE poll_id = $1 AND guild_id = $2;",
+    "lock_polls_partitions": """
+        SELECT pg_try_advisory_xact_lock($1), set_config('lock_timeout', '5s', true);""",
+    "create_polls_partitions": """
+        SELECT create_polls_partition(month) FROM generate_series(
+            date_trunc('month', now() AT TIME ZONE 'UTC'),
+            date_trunc('month', now() AT TIME ZONE 'UTC') + interval '1 month',
+            interval '1 month') AS month;""",
+    "drop_polls_partitions": """
+        SELECT drop_polls_partitions(
+            now() AT TIME ZONE 'UTC' - make_interval(months => $1)) AS name;"""
+}
+
+
+def note_limit(is_premium: bool) -> int:
+    return PREMIUM_NOTE_LIMIT if is_premium else NOTE_LIMIT
+
+
+class PhotonConnection(asyncpg.Connection):
+    """A pooled connection with the statements of QUERIES prepared by name."""
+
+    __slots__ = ("statements",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = {}
+
+
+async def _prepare_statements(con: PhotonConnection) -> None:
+    for name, query in QUERIES.items():
+        con.statements[name] = await con.prepare(query)
+
+
+async def create_pool(dsn: str, auto_migrate: bool = False, **options) -> asyncpg.pool.Pool:
+    """Creates the connection pool of the helper.
+
+    The schema is checked first, over a connection of its own, since
+    every pooled connection prepares its statements on connect. Pending
+    migrations are applied with auto_migrate, otherwise PendingMigrations
+    is raised."""
+
+    con = await asyncpg.connect(dsn=dsn)
+    try:
+        if auto_migrate:
+            await migrations.migrate(con)
+        else:
+            missing = await migrations.pending(con)
+            if missing:
+                raise migrations.PendingMigrations(missing)
+    finally:
+        await con.close()
+
+    return await asyncpg.create_pool(
+        dsn=dsn, connection_class=PhotonConnection, init=_prepare_statements, **options)
 
 
 class DatabaseHelper:
-    def __init__(self, pool: asyncpg.pool.Pool):
-        self.pool = pool
+    """Runs the queries of Photon over a pool created by create_pool.
 
-    async def ensure_tables(self) -> None:
-        """Ensure that important tables are present.
-
-        Current Tables: guild, polls, notes."""
-
-        table_query = """
-            CREATE TABLE IF NOT EXISTS guild(
-                guild_id bigint PRIMARY KEY,
-                prefix varchar(5) DEFAULT '&',
-                welcome bigint
-            );
-
-            CREATE TABLE IF NOT EXISTS polls(
-                poll_id bigint PRIMARY KEY,
-                guild_id bigint,
-                question varchar(2000),
-                start_time timestamp with time zone,
-                end_time timestamp with time zone,
-                votes integer[],
-                options varchar(2000)[]
-            );
-
-            CREATE TABLE IF NOT EXISTS notes(
-                note_id bigserial PRIMARY KEY,
-                user_id bigint,
-                title varchar(40),
-                content varchar(2000)
-            );"""
-
-        async with self.pool.acquire() as con:
-            async with con.transaction():
-                await con.execute(table_query)
+    Statements that change a guild configuration run in a transaction
+    together with their notification, every other statement is a single
+    prepared statement that runs in autocommit.
 
-    async def create_guild_entry(self, guild: discord.Guild) -> None:
-        """Create a entry for a guild in the database."""
+    The guild configuration changes are listened to over a connection of
+    its own, opened with the dsn, so the listener never holds a pooled
+    connection. The listener reconnects when that connection is lost."""
 
-        query_stub = "INSERT INTO guild VALUES ($1, $2, $3);"
+    def __init__(self, pool: asyncpg.pool.Pool, dsn: str):
+        self.pool = pool
+        self.dsn = dsn
+        self._listener: asyncpg.Connection = None
+        self._listener_task: asyncio.Task = None
+        self._listener_lost = asyncio.Event()
+        self._on_guild_change = None
+        self._on_listener_reconnect = None
+
+    @contextlib.asynccontextmanager
+    async def _acquire(self):
+        """Acquires a pooled connection, recording the wait on the current trace."""
+
+        with span("db.acquire"):
+            con = await self.pool.acquire()
+        try:
+            yield con
+        finally:
+            await self.pool.release(con)
+
+    async def _notify_guild_change(self, con, guild_id: int, origin: str) -> None:
+        """Announce a guild configuration change to every Photon process."""
+        await con.statements["notify_guild_change"].fetch(GUILD_CHANNEL, f"{guild_id}:{origin}")
+
+    async def _fetch(self, name: str, *args) -> list:
+        """Runs a prepared statement in autocommit and returns every row."""
+
+        async with self._acquire() as con:
+            return await con.statements[name].fetch(*args)
+
+    async def _fetchrow(self, name: str, *args) -> Union[asyncpg.Record, None]:
+        """Runs a prepared statement in autocommit and returns the first row."""
+
+        async with self._acquire() as con:
+            return await con.statements[name].fetchrow(*args)
+
+    async def listen_guild_changes(self, callback, on_reconnect=None) -> None:
+        """Calls the callback with the payload of every guild configuration change.
+
+        Changes made while the listener was disconnected are missed,
+        hence on_reconnect is called once it has reconnected."""
+
+        self._on_guild_change = callback
+        self._on_listener_reconnect = on_reconnect
+        if self._listener is None:
+            await self._connect_listener()
+            self._listener_task = asyncio.get_event_loop().create_task(self._watch_listener())
+
+    async def _connect_listener(self) -> None:
+        def listener(connection, pid, channel, payload):
+            self._on_guild_change(payload)
+
+        con = await asyncpg.connect(dsn=self.dsn)
+        con.add_termination_listener(lambda connection: self._listener_lost.set())
+        await con.add_listener(GUILD_CHANNEL, listener)
+        self._listener = con
+
+    async def _watch_listener(self) -> None:
+        """Checks the listener connection regularly and reconnects it once it is lost."""
+
+        while True:
+            try:
+                await asyncio.wait_for(self._listener_lost.wait(), LISTENER_CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._listener_lost.clear()
+
+            try:
+                await asyncio.wait_for(self._listener.fetchval("SELECT 1;"),
+                                       LISTENER_CHECK_TIMEOUT)
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.warning("The guild change listener lost its connection, reconnecting.")
+
+            self._listener.terminate()
+            try:
+                await self._connect_listener()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.error("Reconnecting the guild change listener failed.", exc_info=True)
+                continue
+
+            log.info("The guild change listener has reconnected.")
+            if self._on_listener_reconnect is not None:
+                self._on_listener_reconnect()
+
+    @traced("db.create_guild_entry")
+    @with_deadline
+    async def create_guild_entry(self, guild: discord.Guild, origin: str = "") -> None:
+        """Create a entry for a guild in the database."""
 
-        async with self.pool.acquire() as con:
+        async with self._acquire() as con:
             async with con.transaction():
-                await con.execute(query_stub, guild.id, "&", None)
+                await con.statements["create_guild_entry"].fetch(guild.id, "&", None)
+                await self._notify_guild_change(con, guild.id, origin)
 
-    async def delete_guild_entry(self, guild: discord.Guild) -> None:
+    @traced("db.delete_guild_entry")
+    @with_deadline
+    async def delete_guild_entry(self, guild: discord.Guild, origin: str = "") -> None:
         """Delete a guild entry in the database."""
 
-        query_stub = "DELETE FROM guild WHERE guild_id = $1;"
-
-        async with self.pool.acquire() as con:
+        async with self._acquire() as con:
             async with con.transaction():
-                await con.execute(query_stub, guild.id)
-
+                await con.statements["delete_guild_entry"].fetch(guild.id)
+                await self._notify_guild_change(con, guild.id, origin)
+
+    @traced("db.fetch_guild_configs")
+    @with_deadline
+    async def fetch_guild_configs(self, limit: int) -> list:
+        """Fetches the configuration of every guild, up to the limit."""
+        return await self._fetch("fetch_guild_configs", limit)
+
+    @traced("db.fetch_guild_config")
+    @with_deadline
+    async def fetch_guild_config(self, guild_id: int) -> Union[asyncpg.Record, None]:
+        """Fetches the configuration of a guild."""
+        return await self._fetchrow("fetch_guild_config", guild_id)
+
+    @traced("db.get_welcome_channel")
+    @with_deadline
     async def get_welcome_channel(self, guild: discord.Guild) -> Union[int, None]:
         """Check if welcome/leave logging is enabled in the guild and return the channel id."""
 
-        query_stub = "SELECT welcome FROM guild WHERE guild_id = $1;"
-
-        async with self.pool.acquire() as con:
-            async with con.transaction():
-                row = await con.fetchrow(query_stub, guild.id)
+        row = await self._fetchrow("get_welcome_channel", guild.id)
 
         # If the guild entry is not present, silently ignore it.
         if row is None:
@@ -77,148 +278,141 @@ class DatabaseHelper:
 
         return row["welcome"]
 
-    async def update_welcome_channel(self, guild_id: int, channel_id: int) -> None:
+    @traced("db.update_welcome_channel")
+    @with_deadline
+    async def update_welcome_channel(self, guild_id: int, channel_id: int,
+                                     origin: str = "") -> None:
         """Updates the welcome channel of a guild."""
 
-        query_stub = "UPDATE guild SET welcome = $1 WHERE guild_id = $2;"
-
-        async with self.pool.acquire() as con:
+        async with self._acquire() as con:
             async with con.transaction():
-                await con.execute(query_stub, channel_id, guild_id)
+                await con.statements["update_welcome_channel"].fetch(channel_id, guild_id)
+                await self._notify_guild_change(con, guild_id, origin)
 
-    async def update_prefix(self, guild_id: int, prefix: str) -> None:
+    @traced("db.update_prefix")
+    @with_deadline
+    async def update_prefix(self, guild_id: int, prefix: str, origin: str = "") -> None:
         """Updates the prefix of a guild."""
 
-        query_stub = "UPDATE guild SET prefix = $1 WHERE guild_id = $2;"
-
-        async with self.pool.acquire() as con:
+        async with self._acquire() as con:
             async with con.transaction():
-                await con.execute(query_stub, prefix, guild_id)
-
-    async def fetch_prefix(self, guild_id: int) -> str:
-        """Fetches a prefix."""
-
-        query_stub = "SELECT prefix FROM guild WHERE guild_id = $1;"
-
-        async with self.pool.acquire() as con:
-            row = await con.fetchrow(query_stub, guild_id)
-
-        return row
+                await con.statements["update_prefix"].fetch(prefix, guild_id)
+                await self._notify_guild_change(con, guild_id, origin)
 
+    @traced("db.is_allowed_notes")
+    @with_deadline
     async def is_allowed_notes(self, user_id, is_premium) -> bool:
-        """Check if the user is allowed to create to any more notes."""
+        """Check if the user is allowed to create to any more notes.
 
-        query_stub = "SELECT note_id FROM notes WHERE user_id = $1;"
-
-        async with self.pool.acquire() as con:
-            async with con.transaction():
-                notes = await con.fetch(query_stub, user_id)
+        This only saves the user from writing a note that can not be
+        stored, the quota itself is enforced by insert_note."""
 
-        # Set note limit for the user depending upon the premium status.
-        notes_limit = 150 if is_premium else 50
+        row = await self._fetchrow("is_allowed_notes", user_id)
+        return row is None or row["count"] < note_limit(is_premium)
 
-        if len(notes) == notes_limit:
-            return False
+    @traced("db.insert_note")
+    @with_deadline
+    async def insert_note(self, title: str, content: str, user_id: int,
+                          is_premium: bool = False) -> Union[int, None]:
+        """Inserts a note into the database and returns the note id.
 
-        return True
+        Returns None without inserting if the user has reached the note limit."""
 
-    async def insert_note(self, title: str, content: str, user_id: int) -> int:
-        """Inserts a note into the database and returns the note id."""
-
-        query_stub = "INSERT INTO notes VALUES (DEFAULT, $1, $2, $3) RETURNING note_id;"
-
-        async with self.pool.acquire() as con:
-            async with con.transaction():
-                row = await con.fetchrow(query_stub, user_id, title, content)
+        row = await self._fetchrow(
+            "insert_note", user_id, title, content, note_limit(is_premium))
+        if row is None:
+            return None
 
         return row["note_id"]
 
+    @traced("db.fetch_notes")
+    @with_deadline
     async def fetch_notes(self, user_id: int) -> list:
         """Fetches the notes of a given user."""
+        return await self._fetch("fetch_notes", user_id)
 
-        query_stub = "SELECT note_id, title FROM notes WHERE user_id = $1;"
-
-        async with self.pool.acquire() as con:
-            async with con.transaction():
-                rows = await con.fetch(query_stub, user_id)
-
-        return rows
+    @traced("db.fetch_notes_page")
+    @with_deadline
+    async def fetch_notes_page(self, user_id: int, after_id: int, limit: int) -> list:
+        """Fetches up to limit notes of a user with an ID above after_id, ordered by ID."""
+        return await self._fetch("fetch_notes_page", user_id, after_id, limit)
 
+    @traced("db.delete_note")
+    @with_deadline
     async def delete_note(self, note_id: int, user_id: int) -> Union[str, None]:
         """Deletes a given note from the database."""
 
-        query_stub = (
-            "DELETE FROM notes WHERE user_id = $1 AND note_id = $2 RETURNING title;"
-        )
-
-        async with self.pool.acquire() as con:
-            async with con.transaction():
-                row = await con.fetchrow(query_stub, user_id, note_id)
-
+        row = await self._fetchrow("delete_note", user_id, note_id)
         if row is None:
             return None
 
         return row["title"]
 
+    @traced("db.fetch_note")
+    @with_deadline
     async def fetch_note(self, user_id: int, note_id: int) -> Union[list, None]:
         """Fetches a given note."""
+        return await self._fetchrow("fetch_note", user_id, note_id)
 
-        query_stub = (
-            "SELECT content, title FROM notes WHERE user_id = $1 AND note_id = $2;"
-        )
-
-        async with self.pool.acquire() as con:
-            async with con.transaction():
-                row = await con.fetchrow(query_stub, user_id, note_id)
-
-        return row
-
+    @traced("db.insert_poll")
+    @with_deadline
     async def insert_poll(self, end: datetime, ctr: PollController) -> None:
         """Export the finished poll's votes and other stats to the database."""
 
-        query_stub = "INSERT INTO polls VALUES ($1, $2, $3, $4, $5, $6, $7);"
-
         votes = []
         options = []
         for emoji, option in ctr.options:
             votes.append(ctr.votes.retrieve(emoji))
             options.append(option)
 
-        async with self.pool.acquire() as con:
-            async with con.transaction():
-                await con.execute(
-                    query_stub,
-                    ctr.message.id,
-                    ctr.ctx.guild.id,
-                    ctr.question,
-                    ctr.start,
-                    end,
-                    votes,
-                    options,
-                )
-
-    async def fetch_polls(self, guild_id: int) -> list:
-        """Fetch past polls of a guild."""
-
-        query_stub = "SELECT * FROM polls WHERE guild_id = $1;"
-
-        async with self.pool.acquire() as con:
-            async with con.transaction():
-                rows = await con.fetch(query_stub, guild_id)
+        await self._fetch(
+            "insert_poll",
+            ctr.message_id,
+            ctr.guild_id,
+            ctr.question,
+            ctr.start,
+            end,
+            votes,
+            options,
+        )
 
-        return rows
+    @traced("db.fetch_polls_page")
+    @with_deadline
+    async def fetch_polls_page(self, guild_id: int, before_id: int, limit: int) -> list:
+        """Fetches the ID and question of up to limit past polls of a guild
+        with an ID below before_id, newest first."""
+        return await self._fetch("fetch_polls_page", guild_id, before_id, limit)
 
+    @traced("db.fetch_poll")
+    @with_deadline
     async def fetch_poll(self, poll_id: int, guild_id: int) -> Union[list, None]:
         """Fetches a given poll."""
+        return await self._fetchrow("fetch_poll", poll_id, guild_id)
 
-        query_stub = "SELECT * FROM polls WHERE poll_id = $1 AND guild_id = $2;"
+    @traced("db.maintain_polls_partitions")
+    async def maintain_polls_partitions(self, retention_months: int) -> Union[list, None]:
+        """Creates the poll partitions of this and the next month and drops
+        the partitions of the months that ended retention_months ago.
 
-        async with self.pool.acquire() as con:
-            async with con.transaction():
-                row = await con.fetchrow(query_stub, poll_id, guild_id)
+        Returns the dropped partitions, or None if another process is
+        maintaining them."""
 
-        return row
+        async with self._acquire() as con:
+            async with con.transaction():
+                locked = await con.statements["lock_polls_partitions"].fetchval(POLLS_LOCK_KEY)
+                if not locked:
+                    return None
+                await con.statements["create_polls_partitions"].fetch()
+                rows = await con.statements["drop_polls_partitions"].fetch(retention_months)
+                return [row["name"] for row in rows]
 
     async def close_database_pool(self) -> None:
         """Closes the internal database pool."""
+
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            self._listener_task = None
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
         await self.pool.close()
@@ -0,0 +1,100 @@
+import datetime
+import time
+
+import discord
+
+from utils.db import LAST_POLL_ID, QUERIES
+from utils.fakegateway import snowflake
+
+__all__ = ["DatabaseBenchmark"]
+
+
+class _SamplePoll:
+    """The fields of a finished poll that DatabaseHelper.insert_poll reads."""
+
+    class _Votes:
+        def retrieve(self, emoji: str) -> int:
+            return 1
+
+    def __init__(self, guild_id: int):
+        self.message_id = snowflake()
+        self.guild_id = guild_id
+        self.question = "Benchmark"
+        self.options = (("\U0001f1e6", "Yes"), ("\U0001f1e7", "No"))
+        self.votes = self._Votes()
+        self.start = datetime.datetime.now(datetime.timezone.utc)
+
+
+class DatabaseBenchmark:
+    """Compares every read of DatabaseHelper with the query it replaced.
+
+    The previous helper opened a transaction around every query and ran
+    the query text, so each read cost a BEGIN and a COMMIT round trip on
+    top of the query. The benchmark runs both against sample rows that
+    are removed afterwards.
+
+    Arguments
+    ----------
+    helper : DatabaseHelper
+        The helper to measure, its pool must come from create_pool.
+    iterations : int
+        How often every method is called.
+    """
+
+    def __init__(self, helper, iterations: int = 500):
+        self.helper = helper
+        self.iterations = iterations
+
+    async def _legacy(self, name: str, args: tuple) -> None:
+        async with self.helper.pool.acquire() as con:
+            async with con.transaction():
+                await con.fetch(QUERIES[name], *args)
+
+    async def _time(self, call) -> float:
+        start = time.perf_counter()
+        for _ in range(self.iterations):
+            await call()
+        return (time.perf_counter() - start) / self.iterations * 1000
+
+    async def run(self) -> dict:
+        """Returns the mean milliseconds of the previous and the current path of every read."""
+
+        helper = self.helper
+        guild = discord.Object(id=snowflake())
+        user_id = snowflake()
+        poll = _SamplePoll(guild.id)
+
+        await helper.create_guild_entry(guild)
+        note_id = await helper.insert_note("Benchmark", "Benchmark", user_id)
+        await helper.insert_poll(datetime.datetime.now(datetime.timezone.utc), poll)
+
+        reads = {
+            "fetch_guild_config": ((guild.id,), lambda: helper.fetch_guild_config(guild.id)),
+            "get_welcome_channel": ((guild.id,), lambda: helper.get_welcome_channel(guild)),
+            "is_allowed_notes": ((user_id,), lambda: helper.is_allowed_notes(user_id, False)),
+            "fetch_notes": ((user_id,), lambda: helper.fetch_notes(user_id)),
+            "fetch_notes_page": ((user_id, 0, 11), lambda: helper.fetch_notes_page(user_id, 0, 11)),
+            "fetch_note": ((user_id, note_id), lambda: helper.fetch_note(user_id, note_id)),
+            "fetch_polls_page": ((guild.id, LAST_POLL_ID, 11),
+                                 lambda: helper.fetch_polls_page(guild.id, LAST_POLL_ID, 11)),
+            "fetch_poll": ((poll.message_id, guild.id),
+                           lambda: helper.fetch_poll(poll.message_id, guild.id))
+        }
+
+        report = {}
+        try:
+            for name, (args, current) in reads.items():
+                legacy_ms = await self._time(lambda: self._legacy(name, args))
+                current_ms = await self._time(current)
+                report[name] = {
+                    "legacy_ms": legacy_ms,
+                    "current_ms": current_ms,
+                    "saved_ms": legacy_ms - current_ms
+                }
+        finally:
+            await helper.delete_note(note_id, user_id)
+            await helper.delete_guild_entry(guild)
+            await helper.pool.execute("DELETE FROM polls WHERE poll_id = $1;", poll.message_id)
+            await helper.pool.execute("DELETE FROM note_counts WHERE user_id = $1;", user_id)
+
+        return report
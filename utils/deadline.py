@@ -0,0 +1,109 @@
+import asyncio
+import contextvars
+import functools
+import time
+
+import aiohttp
+from discord.ext import commands
+
+from utils import tracing
+
+__all__ = [
+    "DeadlineExceeded", "start", "reset", "renew", "clear", "remaining", "bounded",
+    "with_deadline", "detached", "client_timeout"
+]
+
+# The (deadline, budget) of the command running in the current context.
+_deadline = contextvars.ContextVar("photon_deadline", default=None)
+
+
+class DeadlineExceeded(commands.CommandError):
+    """Raised when a command runs out of its time budget."""
+
+    def __init__(self):
+        super().__init__("The command ran out of time.")
+
+
+def start(budget: float):
+    """Gives the current context a deadline budget seconds from now."""
+    return _deadline.set((time.monotonic() + budget, budget))
+
+
+def reset(token) -> None:
+    _deadline.reset(token)
+
+
+def renew() -> None:
+    """Restarts the budget of the current context, after waiting for user input."""
+
+    current = _deadline.get()
+    if current is not None:
+        _deadline.set((time.monotonic() + current[1], current[1]))
+
+
+def clear() -> None:
+    """Removes the deadline of the current context."""
+    _deadline.set(None)
+
+
+def remaining():
+    """Returns the seconds left until the deadline, or None if there is none.
+
+    Raises DeadlineExceeded if the deadline has already passed."""
+
+    current = _deadline.get()
+    if current is None:
+        return None
+    left = current[0] - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded()
+    return left
+
+
+async def bounded(awaitable):
+    """Awaits the awaitable, cancelling it when the deadline passes."""
+
+    try:
+        timeout = remaining()
+    except DeadlineExceeded:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise
+
+    if timeout is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded() from None
+
+
+def with_deadline(func):
+    """Decorator that bounds every call of a coroutine function by the deadline."""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await bounded(func(*args, **kwargs))
+    return wrapper
+
+
+async def detached(coro):
+    """Runs the coroutine without the deadline and the trace of the command that started it.
+
+    A task copies the context of the code that creates it, so a background
+    task started by a command would otherwise run out of the budget of the
+    command long after the command finished. Wrap the coroutine of every
+    such task in it."""
+
+    clear()
+    tracing.clear()
+    return await coro
+
+
+def client_timeout() -> aiohttp.ClientTimeout:
+    """Returns the aiohttp timeout of a request made in the current context."""
+
+    timeout = remaining()
+    if timeout is None:
+        return aiohttp.client.DEFAULT_TIMEOUT
+    return aiohttp.ClientTimeout(total=timeout)
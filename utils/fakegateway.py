@@ -0,0 +1,349 @@
+import asyncio
+import datetime
+import itertools
+
+import discord
+
+__all__ = [
+    "FakeREST", "FakeGateway", "FakeWeb", "make_guild", "make_member", "make_message",
+    "make_voice_state", "snowflake"
+]
+
+_counter = itertools.count()
+
+
+def snowflake(shard_id: int = 0, shard_count: int = 1) -> int:
+    """Returns a new unique snowflake.
+
+    If a shard is given the snowflake is a guild ID that belongs to that shard."""
+
+    now = discord.utils.time_snowflake(datetime.datetime.utcnow())
+    increment = next(_counter)
+    if shard_count == 1:
+        return now + (increment & 0x3FFFFF)
+
+    # The shard of a guild is (guild_id >> 22) % shard_count.
+    timestamp = (now >> 22) + increment * shard_count
+    timestamp += (shard_id - timestamp) % shard_count
+    return timestamp << 22
+
+
+def _timestamp() -> str:
+    return datetime.datetime.utcnow().isoformat() + "+00:00"
+
+
+def make_user(user_id: int, bot: bool = False) -> dict:
+    return {
+        "id": str(user_id),
+        "username": f"User{user_id % 10000}",
+        "discriminator": f"{user_id % 10000:04}",
+        "avatar": None,
+        "bot": bot
+    }
+
+
+def make_member(user_id: int, bot: bool = False) -> dict:
+    return {
+        "user": make_user(user_id, bot),
+        "roles": [],
+        "joined_at": _timestamp(),
+        "deaf": False,
+        "mute": False,
+        "nick": None
+    }
+
+
+def make_voice_state(user_id: int, channel_id: int) -> dict:
+    return {
+        "user_id": str(user_id),
+        "channel_id": str(channel_id),
+        "session_id": f"fake-{user_id}",
+        "deaf": False,
+        "mute": False,
+        "self_deaf": False,
+        "self_mute": False,
+        "self_video": False,
+        "suppress": False
+    }
+
+
+def make_guild(guild_id: int, owner_id: int, channel_ids: list, member_ids: list,
+               voice_channel_ids: list = (), voice_states: list = ()) -> dict:
+    """Builds a GUILD_CREATE payload."""
+
+    channels = [{
+        "id": str(channel_id),
+        "type": 0,
+        "name": f"channel-{position}",
+        "position": position,
+        "permission_overwrites": [],
+        "nsfw": False,
+        "parent_id": None,
+        "topic": None,
+        "rate_limit_per_user": 0
+    } for position, channel_id in enumerate(channel_ids)]
+
+    channels.extend({
+        "id": str(channel_id),
+        "type": 2,
+        "name": f"voice-{position}",
+        "position": position,
+        "permission_overwrites": [],
+        "parent_id": None,
+        "bitrate": 64000,
+        "user_limit": 0
+    } for position, channel_id in enumerate(voice_channel_ids))
+
+    return {
+        "id": str(guild_id),
+        "name": f"Guild {guild_id % 10000}",
+        "icon": None,
+        "splash": None,
+        "owner_id": str(owner_id),
+        "region": "india",
+        "afk_channel_id": None,
+        "afk_timeout": 300,
+        "verification_level": 0,
+        "default_message_notifications": 0,
+        "explicit_content_filter": 0,
+        "roles": [{
+            "id": str(guild_id),
+            "name": "@everyone",
+            "permissions": "104324673",
+            "position": 0,
+            "color": 0,
+            "hoist": False,
+            "managed": False,
+            "mentionable": False
+        }],
+        "emojis": [],
+        "features": [],
+        "mfa_level": 0,
+        "system_channel_id": None,
+        "joined_at": _timestamp(),
+        "large": False,
+        "unavailable": False,
+        "member_count": len(member_ids),
+        "voice_states": list(voice_states),
+        "members": [make_member(member_id) for member_id in member_ids],
+        "channels": channels,
+        "presences": [],
+        "premium_tier": 0,
+        "premium_subscription_count": 0
+    }
+
+
+def make_message(message_id: int, channel_id: int, guild_id: int, author_id: int,
+                 content: str, bot: bool = False) -> dict:
+    """Builds a MESSAGE_CREATE payload."""
+
+    member = make_member(author_id, bot)
+    user = member.pop("user")
+    return {
+        "id": str(message_id),
+        "channel_id": str(channel_id),
+        "guild_id": str(guild_id) if guild_id is not None else None,
+        "author": user,
+        "member": member,
+        "content": content,
+        "timestamp": _timestamp(),
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0
+    }
+
+
+class FakeREST:
+    """A stand-in for the Discord REST API.
+
+    It replaces the request method of the HTTP client of a bot, so every
+    REST call of discord.py is answered locally and recorded.
+
+    Arguments
+    ----------
+    user_id : int
+        The ID of the bot user.
+    latency : float
+        The simulated round trip time of every request in seconds.
+    """
+
+    def __init__(self, user_id: int = None, latency: float = 0.0):
+        self.user = make_user(user_id or snowflake(), bot=True)
+        self.latency = latency
+        self.calls = 0
+        self.routes = {}
+
+    def install(self, bot) -> None:
+        bot.http.request = self.request
+
+    def _message(self, message_id: int, channel_id: int, payload: dict) -> dict:
+        message = make_message(message_id, channel_id, None, int(self.user["id"]),
+                               payload.get("content") or "", bot=True)
+        message["author"] = self.user
+        if payload.get("embed"):
+            message["embeds"] = [payload["embed"]]
+        return message
+
+    async def request(self, route, *, files=None, form=None, **kwargs):
+        self.calls += 1
+        key = f"{route.method} {route.path}"
+        self.routes[key] = self.routes.get(key, 0) + 1
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        payload = kwargs.get("json") or {}
+
+        if key == "GET /users/@me":
+            return self.user
+        elif key == "GET /oauth2/applications/@me":
+            return {
+                "id": self.user["id"],
+                "name": self.user["username"],
+                "description": "",
+                "icon": None,
+                "rpc_origins": None,
+                "bot_public": True,
+                "bot_require_code_grant": False,
+                "owner": make_user(0),
+                "summary": "",
+                "verify_key": ""
+            }
+        elif key == "POST /channels/{channel_id}/messages":
+            return self._message(snowflake(), route.channel_id, payload)
+        elif key == "PATCH /channels/{channel_id}/messages/{message_id}":
+            return self._message(int(route.url.rsplit("/", 1)[-1]), route.channel_id, payload)
+
+        return None
+
+
+class _FakeResponse:
+    status = 503
+    reason = "Service Unavailable"
+
+    async def json(self, **kwargs) -> dict:
+        return {}
+
+    async def text(self, **kwargs) -> str:
+        return ""
+
+    async def read(self) -> bytes:
+        return b""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class FakeWeb:
+    """A stand-in for the aiohttp session of a bot.
+
+    Every request is answered locally with a 503, so commands and loops
+    that call outside APIs never reach them from a benchmark or replay.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.urls = {}
+
+    def request(self, method: str, url, **kwargs) -> _FakeResponse:
+        self.calls += 1
+        key = f"{method} {str(url).split('?', 1)[0]}"
+        self.urls[key] = self.urls.get(key, 0) + 1
+        return _FakeResponse()
+
+    def get(self, url, **kwargs) -> _FakeResponse:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs) -> _FakeResponse:
+        return self.request("POST", url, **kwargs)
+
+    @property
+    def closed(self) -> bool:
+        return False
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeGateway:
+    """A stand-in for the Discord gateway.
+
+    Instead of a websocket, payloads are handed straight to the parsers
+    of the connection state of the bot, which is the same path that
+    events received from Discord take.
+
+    Arguments
+    ----------
+    bot : Photon
+        The bot to drive.
+    rest : FakeREST
+        The REST stand-in, a new one is created if it is not given.
+    shard_ids : list
+        The shards that the bot pretends to run.
+    shard_count : int
+        The total amount of shards.
+    """
+
+    def __init__(self, bot, rest: FakeREST = None, shard_ids: list = None, shard_count: int = 1):
+        self.bot = bot
+        self.rest = rest or FakeREST()
+        self.shard_ids = shard_ids or [0]
+        self.shard_count = shard_count
+        self.dispatched = 0
+
+    def dispatch(self, event: str, data: dict) -> None:
+        """Feed a single gateway dispatch event to the bot."""
+        self.dispatched += 1
+        self.bot._connection.parsers[event](data)
+
+    async def connect(self) -> None:
+        """Prepare the bot and log in, without dispatching any events."""
+
+        state = self.bot._connection
+        self.rest.install(self.bot)
+
+        # There are no members to chunk and no shards to wait for.
+        state.is_bot = True
+        state._chunk_guilds = False
+        state.guild_ready_timeout = 0.05
+        state.shard_count = self.bot.shard_count = self.shard_count
+        state.shard_ids = self.shard_ids
+        if hasattr(state, "shards_launched"):
+            state.shards_launched.set()
+
+        await self.bot.prepare()
+        await self.bot.http.static_login("fake-token", bot=True)
+
+    async def start(self, guilds: list) -> None:
+        """Log in, identify and stream the given guild payloads."""
+
+        await self.connect()
+        for shard_id in self.shard_ids:
+            shard_guilds = [
+                guild for guild in guilds
+                if (int(guild["id"]) >> 22) % self.shard_count == shard_id
+            ]
+            self.dispatch("READY", {
+                "v": 8,
+                "user": self.rest.user,
+                "guilds": [{"id": guild["id"], "unavailable": True} for guild in shard_guilds],
+                "session_id": "fake-session",
+                "shard": [shard_id, self.shard_count],
+                "private_channels": [],
+                "relationships": [],
+                "__shard_id__": shard_id
+            })
+
+            for guild in shard_guilds:
+                self.dispatch("GUILD_CREATE", guild)
+
+        await self.bot.wait_until_ready()
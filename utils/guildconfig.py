@@ -0,0 +1,182 @@
+import collections
+import os
+from typing import Union
+
+__all__ = ["GuildConfig", "GuildConfigCache"]
+
+DEFAULT_PREFIX = "&"
+
+
+class GuildConfig:
+    """The cached configuration of a single guild.
+
+    The configuration of a record is never changed in place, an update
+    replaces the record. Only the matcher, the precompiled prefix tuple,
+    is filled in lazily by the bot on first use, since it also holds the
+    mentions of the bot user. It only depends on the prefix, so records
+    shared between callers always agree on it."""
+
+    __slots__ = ("guild_id", "prefix", "welcome", "matcher")
+
+    def __init__(self, guild_id: int, prefix: str = DEFAULT_PREFIX, welcome: int = None):
+        self.guild_id = guild_id
+        self.prefix = prefix if prefix is not None else DEFAULT_PREFIX
+        self.welcome = welcome
+        self.matcher: tuple = None
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(record["guild_id"], record["prefix"], record["welcome"])
+
+    def replace(self, **fields):
+        """Returns a copy of the record with the given fields changed."""
+        values = {"prefix": self.prefix, "welcome": self.welcome}
+        values.update(fields)
+        return GuildConfig(self.guild_id, **values)
+
+
+class GuildConfigCache:
+    """A bounded LRU cache of guild configurations.
+
+    Every row is loaded in one query on warm up, updates are written
+    through to the database, and entries are invalidated through
+    Postgres LISTEN/NOTIFY so that several processes stay consistent.
+
+    With a shared table, misses are looked up in the table before the
+    database, and only the first process of the host loads every row.
+    The table is emptied when the listener reconnects, since the
+    notifications sent in the meantime are lost.
+
+    Arguments
+    ----------
+    database : DatabaseHelper
+        The database helper used to load and update the configurations.
+    max_size : int
+        The maximum amount of guild configurations kept in memory.
+    shared : SharedConfigTable
+        The table shared by the Photon processes of the host, if any.
+    """
+
+    def __init__(self, database, max_size: int = 10000, shared=None):
+        self.database = database
+        self.max_size = max_size
+        self.shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+        # Used to ignore the notifications caused by this process itself.
+        self._origin = f"{os.getpid()}-{id(self)}"
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _store(self, config: GuildConfig) -> GuildConfig:
+        self._entries[config.guild_id] = config
+        self._entries.move_to_end(config.guild_id)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return config
+
+    async def warm_up(self) -> int:
+        """Loads the configurations of every guild and returns the amount loaded."""
+
+        # Another process of the host has already loaded every row.
+        if self.shared is not None and self.shared.warmed:
+            return len(self.shared)
+
+        limit = self.max_size if self.shared is None else self.shared.slots
+        epoch = self.shared.epoch if self.shared is not None else None
+        records = await self.database.fetch_guild_configs(limit)
+        configs = [GuildConfig.from_record(record) for record in records]
+        for config in configs[:self.max_size]:
+            self._store(config)
+        if self.shared is not None:
+            self.shared.publish_many(configs, epoch)
+        return len(records)
+
+    async def listen(self) -> None:
+        """Subscribe to the invalidation notifications of other processes."""
+        await self.database.listen_guild_changes(self._on_notification, self._on_reconnect)
+
+    def _on_reconnect(self) -> None:
+        # Notifications sent while the listener was disconnected are lost.
+        self.clear()
+        if self.shared is not None:
+            self.shared.reset()
+
+    def _on_notification(self, payload: str) -> None:
+        guild_id, _, origin = payload.partition(":")
+        if origin == self._origin:
+            return
+        self.invalidate(int(guild_id))
+
+        # The writer may be on another host, so the shared copy is stale too.
+        if self.shared is not None:
+            self.shared.discard(int(guild_id))
+
+    def peek(self, guild_id: int) -> Union[GuildConfig, None]:
+        """Returns the cached configuration without touching the database."""
+        config = self._entries.get(guild_id)
+        if config is not None:
+            self._entries.move_to_end(guild_id)
+        return config
+
+    async def get(self, guild_id: int) -> GuildConfig:
+        """Returns the configuration of a guild, loading it if necessary."""
+
+        config = self.peek(guild_id)
+        if config is not None:
+            self.hits += 1
+            return config
+
+        stamp = None
+        if self.shared is not None:
+            shared = self.shared.lookup(guild_id)
+            if shared is not None:
+                self.shared_hits += 1
+                return self._store(GuildConfig(guild_id, *shared))
+
+            # A change announced while the row is read must not be overwritten with it.
+            stamp = self.shared.stamp(guild_id)
+
+        self.misses += 1
+        record = await self.database.fetch_guild_config(guild_id)
+
+        # Guilds without an entry behave as if they had the defaults.
+        if record is None:
+            config = GuildConfig(guild_id)
+        else:
+            config = GuildConfig.from_record(record)
+
+        self._publish(config, stamp)
+        return self._store(config)
+
+    def _publish(self, config: GuildConfig, stamp: tuple = None) -> None:
+        if self.shared is not None:
+            self.shared.publish(config.guild_id, config.prefix, config.welcome, stamp)
+
+    async def set_prefix(self, guild_id: int, prefix: str) -> GuildConfig:
+        """Updates the prefix of a guild in the database and in the cache."""
+
+        await self.database.update_prefix(guild_id, prefix, origin=self._origin)
+        config = (await self.get(guild_id)).replace(prefix=prefix)
+        self._publish(config)
+        return self._store(config)
+
+    async def set_welcome(self, guild_id: int, channel_id: Union[int, None]) -> GuildConfig:
+        """Updates the welcome channel of a guild in the database and in the cache."""
+
+        await self.database.update_welcome_channel(guild_id, channel_id, origin=self._origin)
+        config = (await self.get(guild_id)).replace(welcome=channel_id)
+        self._publish(config)
+        return self._store(config)
+
+    def invalidate(self, guild_id: int) -> None:
+        """Drops the cached configuration of a guild."""
+        self._entries.pop(guild_id, None)
+
+    def clear(self) -> None:
+        """Drops every cached configuration."""
+        self._entries.clear()
@@ -0,0 +1,165 @@
+import collections
+from typing import Union
+
+import discord
+from discord.ext import commands
+
+__all__ = ["HelpPages", "PhotonHelpCommand"]
+
+# Cogs left out of the help, the help is shared by everyone and
+# can not show commands that only pass the checks of a few users.
+HIDDEN_COGS = ("Admin",)
+
+# Stands in for the prefix in the prebuilt pages.
+PREFIX = "\x00"
+
+FIELD_LIMIT = 1024
+DESCRIPTION_LIMIT = 2048
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def _usage(command: commands.Command) -> str:
+    return f"{PREFIX}{command.qualified_name} {command.signature}".rstrip()
+
+
+class _Page:
+    """A help embed with a placeholder for the prefix."""
+
+    __slots__ = ("title", "description", "fields")
+
+    def __init__(self, title: str, description: str = "", fields: list = None):
+        self.title = title
+        self.description = description
+        self.fields = fields or []
+
+    def render(self, prefix: str) -> discord.Embed:
+        embed = discord.Embed(title=self.title.replace(PREFIX, prefix),
+                              description=self.description.replace(PREFIX, prefix),
+                              colour=discord.Colour.dark_teal())
+        for name, value in self.fields:
+            embed.add_field(name=name, value=value.replace(PREFIX, prefix), inline=False)
+        return embed
+
+
+class HelpPages:
+    """The help embeds of every cog and command.
+
+    The pages are built once after the extensions change and the
+    embeds are rendered once per prefix, so the help command is a dict
+    lookup. Loading, unloading and reloading an extension invalidates
+    them.
+
+    Arguments
+    ----------
+    bot : Photon
+        The bot whose commands are described.
+    max_prefixes : int
+        The amount of prefixes whose rendered embeds are kept.
+    """
+
+    def __init__(self, bot, max_prefixes: int = 256):
+        self.bot = bot
+        self.max_prefixes = max_prefixes
+        self.builds = 0
+        self._pages: dict = None
+        self._rendered = collections.OrderedDict()
+
+    def invalidate(self) -> None:
+        self._pages = None
+        self._rendered.clear()
+
+    def _visible(self, command_list) -> list:
+        return sorted((command for command in command_list if not command.hidden),
+                      key=lambda command: command.name)
+
+    def _command_page(self, command: commands.Command) -> _Page:
+        description = _truncate(command.help or "No description.", DESCRIPTION_LIMIT)
+        page = _Page(_usage(command), description)
+        if command.aliases:
+            page.fields.append(("Aliases", ", ".join(f"`{alias}`" for alias in command.aliases)))
+        if isinstance(command, commands.Group):
+            subcommands = self._visible(command.commands)
+            if subcommands:
+                lines = "\n".join(f"`{PREFIX}{sub.qualified_name}` {sub.short_doc}"
+                                  for sub in subcommands)
+                page.fields.append(("Subcommands", _truncate(lines, FIELD_LIMIT)))
+        return page
+
+    def _build(self) -> dict:
+        pages = {}
+        overview = _Page(
+            "Photon Help",
+            f"Use `{PREFIX}help <command>` for more information about a command "
+            f"and `{PREFIX}help <category>` for the commands of a category.")
+
+        categories = {}
+        for name, cog in sorted(self.bot.cogs.items()):
+            if name in HIDDEN_COGS:
+                continue
+            cog_commands = self._visible(cog.get_commands())
+            if not cog_commands:
+                continue
+
+            names = " ".join(f"`{command.name}`" for command in cog_commands)
+            categories[name] = _truncate(names, FIELD_LIMIT)
+            lines = "\n".join(f"`{_usage(command)}` {command.short_doc}"
+                              for command in cog_commands)
+            description = f"{cog.description}\n\n{lines}" if cog.description else lines
+            pages[name] = _Page(name, _truncate(description, DESCRIPTION_LIMIT))
+
+            for command in cog.walk_commands():
+                if command.hidden:
+                    continue
+                page = self._command_page(command)
+                pages[command.qualified_name] = page
+                for alias in command.aliases:
+                    parent = command.full_parent_name
+                    pages[f"{parent} {alias}".strip()] = page
+
+        # Deferred extensions are loaded by the help command when asked
+        # about, until then the overview lists the commands they stand for.
+        for name, command_names in self.bot.deferred_commands().items():
+            names = " ".join(f"`{command_name}`" for command_name in sorted(command_names))
+            categories[name] = _truncate(names, FIELD_LIMIT)
+
+        overview.fields.extend(sorted(categories.items()))
+        pages[""] = overview
+        self.builds += 1
+        return pages
+
+    def get(self, prefix: str, query: str = "") -> Union[discord.Embed, None]:
+        """Returns the help embed of a cog or command, or the overview for no query."""
+
+        rendered = self._rendered.get(prefix)
+        if rendered is None:
+            rendered = self._rendered[prefix] = {}
+            if len(self._rendered) > self.max_prefixes:
+                self._rendered.popitem(last=False)
+        else:
+            self._rendered.move_to_end(prefix)
+
+        embed = rendered.get(query)
+        if embed is None:
+            if self._pages is None:
+                self._pages = self._build()
+            page = self._pages.get(query)
+            if page is None:
+                return None
+            embed = rendered[query] = page.render(prefix)
+        return embed
+
+
+class PhotonHelpCommand(commands.HelpCommand):
+    """The help command, answered from the prebuilt HelpPages of the bot."""
+
+    async def command_callback(self, ctx, *, command: str = None):
+        query = " ".join(command.split()) if command else ""
+        if query:
+            ctx.bot.resolve_help(query)
+        embed = ctx.bot.help_pages.get(self.clean_prefix, query)
+        if embed is None:
+            return await ctx.send(f"No command or category called `{query}` found.")
+        await ctx.send(embed=embed)
@@ -0,0 +1,429 @@
+import asyncio
+import datetime
+import json
+import logging
+import time
+
+import aiohttp
+import discord
+from aiohttp import web
+from discord.ext.commands.view import StringView
+
+from utils import deadline, tracing
+from utils.context import PhotonContext
+from utils.fakegateway import snowflake
+
+# PyNaCl is installed together with the voice support of discord.py.
+try:
+    import nacl.exceptions
+    import nacl.signing
+    nacl_present = True
+except ImportError:
+    nacl_present = False
+
+__all__ = [
+    "INTERACTION_COMMANDS", "InteractionContext", "InteractionServer", "InteractionSigner",
+    "register_commands"
+]
+
+API_BASE = "https://discord.com/api/v8"
+
+# Commands that are served as slash commands. They only rely on the
+# invoking user and guild, hence they also work without a gateway
+# connection, apart from serverinfo which needs the guild in the cache.
+INTERACTION_COMMANDS = ("ping", "serverinfo", "covid", "list")
+
+# Interaction and interaction response types.
+PING = 1
+APPLICATION_COMMAND = 2
+PONG = 1
+CHANNEL_MESSAGE = 4
+DEFERRED_CHANNEL_MESSAGE = 5
+
+# Message flag of replies only the invoking user sees.
+EPHEMERAL = 64
+
+# Signed requests older than this are rejected, in seconds.
+MAX_SIGNATURE_AGE = 300
+
+log = logging.getLogger("Photon.interactions")
+
+
+class InteractionMessage:
+    """A message sent in reply to an interaction, edited through its webhook."""
+
+    def __init__(self, responder, data: dict):
+        self.id = int(data["id"])
+        self.content = data.get("content")
+        self.created_at = discord.utils.snowflake_time(self.id)
+        self._responder = responder
+
+    async def edit(self, **fields) -> None:
+        await self._responder.edit(self.id, **fields)
+
+    async def delete(self, *, delay: float = None) -> None:
+        await self._responder.delete(self.id, delay=delay)
+
+
+class InteractionResponder:
+    """Sends the replies to an interaction through its webhook.
+
+    The first reply completes the deferred response, every other
+    reply is sent as a follow up message."""
+
+    def __init__(self, session: aiohttp.ClientSession, api_base: str, application_id: int,
+                 token: str):
+        self.session = session
+        self.url = f"{api_base}/webhooks/{application_id}/{token}"
+        self._deferred = True
+
+    @property
+    def replied(self) -> bool:
+        return not self._deferred
+
+    @staticmethod
+    def _payload(content=None, embed=None) -> dict:
+        payload = {"content": str(content) if content is not None else ""}
+        if embed is not None:
+            payload["embeds"] = [embed.to_dict()]
+        return payload
+
+    async def _request(self, method: str, url: str, payload: dict = None) -> dict:
+        async with self.session.request(method, url, json=payload) as resp:
+            if resp.status == 204:
+                return {}
+            return await resp.json()
+
+    async def send(self, content=None, *, embed: discord.Embed = None,
+                   delete_after: float = None, **kwargs) -> InteractionMessage:
+        payload = self._payload(content, embed)
+        if self._deferred:
+            self._deferred = False
+            data = await self._request("PATCH", f"{self.url}/messages/@original", payload)
+        else:
+            data = await self._request("POST", f"{self.url}?wait=true", payload)
+
+        message = InteractionMessage(self, data)
+        if delete_after is not None:
+            await message.delete(delay=delete_after)
+        return message
+
+    async def edit(self, message_id: int, **fields) -> None:
+        payload = {}
+        if "content" in fields:
+            payload["content"] = fields["content"]
+        if "embed" in fields:
+            embed = fields["embed"]
+            payload["embeds"] = [embed.to_dict()] if embed is not None else []
+        await self._request("PATCH", f"{self.url}/messages/{message_id}", payload)
+
+    async def delete(self, message_id: int, *, delay: float = None) -> None:
+        async def delete():
+            if delay:
+                await asyncio.sleep(delay)
+            await self._request("DELETE", f"{self.url}/messages/{message_id}")
+
+        asyncio.get_event_loop().create_task(deadline.detached(delete()))
+
+
+class _InteractionChannel:
+    """Stands in for a channel that is not cached, for example without a gateway."""
+
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.guild = None
+        self.mention = f"<#{channel_id}>"
+
+    def is_nsfw(self) -> bool:
+        return False
+
+    def permissions_for(self, member) -> discord.Permissions:
+        return discord.Permissions.none()
+
+
+class InteractionContext(PhotonContext):
+    """The invocation context of a command invoked as a slash command.
+
+    Replies are sent through the interaction webhook, hence commands
+    work the same whether or not Photon is connected to the gateway."""
+
+    def __init__(self, **attrs):
+        self.responder: InteractionResponder = attrs.pop("responder")
+        super().__init__(**attrs)
+
+    async def send(self, content=None, **kwargs):
+        with tracing.span("discord.send"):
+            return await self.responder.send(content, **kwargs)
+
+    async def trigger_typing(self):
+        pass
+
+
+def _arguments(data: dict) -> str:
+    # Every slash command has a single optional string option with the arguments.
+    for option in data.get("options", ()):
+        if option["name"] == "arguments":
+            return str(option["value"])
+    return ""
+
+
+class InteractionServer:
+    """Serves Discord interactions from a local aiohttp webhook server.
+
+    Every request is verified with the Ed25519 public key of the
+    application. Application commands are deferred right away and then
+    invoked through the usual command machinery with InteractionContext.
+
+    Arguments
+    ----------
+    bot : Photon
+        The bot that runs the commands.
+    public_key : str
+        The hex encoded public key of the application.
+    host : str
+        The address the server binds to.
+    port : int
+        The port the server listens on.
+    api_base : str
+        The base URL of the Discord API, replies are sent there.
+    local : bool
+        Whether to also serve a stand-in for the Discord webhook API
+        under /_local, which only logs the replies. The replies are then
+        sent over a session of the server, since the bot may be offline.
+    """
+
+    def __init__(self, bot, public_key: str, host: str = "127.0.0.1", port: int = 8080,
+                 api_base: str = API_BASE, local: bool = False):
+        if not nacl_present:
+            raise RuntimeError("PyNaCl is required to verify interactions.")
+
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.api_base = api_base
+        self.local = local
+        self.handled = 0
+        self.completed = 0
+        self._verify_key = nacl.signing.VerifyKey(bytes.fromhex(public_key))
+        self._runner: web.AppRunner = None
+        self._session: aiohttp.ClientSession = None
+
+    def verify(self, signature: str, timestamp: str, body: bytes) -> bool:
+        try:
+            if abs(time.time() - int(timestamp)) > MAX_SIGNATURE_AGE:
+                return False
+            self._verify_key.verify(timestamp.encode() + body, bytes.fromhex(signature))
+        except (ValueError, TypeError, nacl.exceptions.BadSignatureError):
+            return False
+        return True
+
+    async def _handle_interaction(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        signature = request.headers.get("X-Signature-Ed25519", "")
+        timestamp = request.headers.get("X-Signature-Timestamp", "")
+        if not self.verify(signature, timestamp, body):
+            return web.Response(status=401, text="Invalid request signature.")
+
+        try:
+            interaction = json.loads(body)
+            kind = interaction["type"]
+        except (ValueError, TypeError, KeyError):
+            return web.Response(status=400, text="Malformed interaction.")
+        if kind == PING:
+            return web.json_response({"type": PONG})
+
+        name = (interaction.get("data") or {}).get("name")
+        if kind != APPLICATION_COMMAND or name not in INTERACTION_COMMANDS:
+            return web.json_response({
+                "type": CHANNEL_MESSAGE,
+                "data": {
+                    "content": "This command is not available as a slash command.",
+                    "flags": EPHEMERAL
+                }
+            })
+
+        self.handled += 1
+        self.bot.loop.create_task(self._run_command(interaction))
+        return web.json_response({"type": DEFERRED_CHANNEL_MESSAGE})
+
+    def _message(self, interaction: dict, content: str) -> discord.Message:
+        """Builds the message a command invoked through an interaction pretends to be."""
+
+        member = interaction.get("member")
+        user = member["user"] if member is not None else interaction["user"]
+        channel_id = int(interaction["channel_id"])
+        channel = self.bot.get_channel(channel_id) or _InteractionChannel(channel_id)
+
+        timestamp = discord.utils.snowflake_time(int(interaction["id"]))
+        data = {
+            "id": interaction["id"],
+            "channel_id": interaction["channel_id"],
+            "author": user,
+            "content": content,
+            "timestamp": timestamp.replace(tzinfo=datetime.timezone.utc).isoformat(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": 0
+        }
+
+        # Members can only be built for guilds in the cache.
+        if member is not None and getattr(channel, "guild", None) is not None:
+            data["guild_id"] = interaction["guild_id"]
+            data["member"] = {key: value for key, value in member.items() if key != "user"}
+
+        return discord.Message(state=self.bot._connection, channel=channel, data=data)
+
+    async def _run_command(self, interaction: dict) -> None:
+        name = interaction["data"]["name"]
+        arguments = _arguments(interaction["data"])
+        responder = InteractionResponder(self._session or self.bot.web, self.api_base,
+                                         interaction["application_id"], interaction["token"])
+
+        message = self._message(interaction, f"/{name} {arguments}".strip())
+        ctx = InteractionContext(
+            prefix="/", view=StringView(arguments), bot=self.bot, message=message,
+            responder=responder)
+        ctx.invoked_with = name
+        ctx.command = self.bot.resolve_command(name)
+
+        try:
+            if ctx.command is None:
+                await ctx.send("This command is not available right now.")
+            elif ctx.command.name == "serverinfo" and ctx.guild is None:
+                await ctx.send("This command needs Photon to be connected to the server.")
+            else:
+                await self.bot.invoke(ctx)
+        except Exception:
+            log.exception("Slash command %s failed.", name)
+        finally:
+            self.completed += 1
+
+        # The deferred response shows a loading state until it is completed.
+        if not responder.replied:
+            try:
+                await ctx.send("Something went wrong while running this command.")
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                log.warning("Could not complete the deferred response of %s.", name)
+
+    async def _handle_local_webhook(self, request: web.Request) -> web.Response:
+        payload = await request.json() if request.can_read_body else {}
+        log.info("Interaction reply: %s %s %s", request.method, request.path, payload)
+        if request.method == "DELETE":
+            return web.Response(status=204)
+
+        message_id = request.match_info.get("message_id", "@original")
+        payload["id"] = str(snowflake()) if not message_id.isdigit() else message_id
+        return web.json_response(payload)
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/interactions", self._handle_interaction)
+        if self.local:
+            base = "/_local/webhooks/{application_id}/{token}"
+            app.router.add_post(base, self._handle_local_webhook)
+            app.router.add_route("*", base + "/messages/{message_id}", self._handle_local_webhook)
+
+            self._session = aiohttp.ClientSession()
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class InteractionSigner:
+    """A local stand-in for Discord that signs and sends interactions.
+
+    It holds its own key pair, the InteractionServer under test has to
+    be created with its public key."""
+
+    def __init__(self, application_id: int = None):
+        if not nacl_present:
+            raise RuntimeError("PyNaCl is required to sign interactions.")
+
+        self.application_id = application_id or snowflake()
+        self._signing_key = nacl.signing.SigningKey.generate()
+        self.public_key = self._signing_key.verify_key.encode().hex()
+
+    def headers(self, body: bytes) -> dict:
+        timestamp = str(int(time.time()))
+        signature = self._signing_key.sign(timestamp.encode() + body).signature.hex()
+        return {
+            "Content-Type": "application/json",
+            "X-Signature-Ed25519": signature,
+            "X-Signature-Timestamp": timestamp
+        }
+
+    def interaction(self, name: str, arguments: str = "", guild_id: int = None,
+                    channel_id: int = None, user_id: int = None) -> dict:
+        """Builds an application command interaction payload."""
+
+        user_id = user_id or snowflake()
+        user = {"id": str(user_id), "username": f"User{user_id % 10000}",
+                "discriminator": f"{user_id % 10000:04}", "avatar": None}
+        data = {"id": str(snowflake()), "name": name}
+        if arguments:
+            data["options"] = [{"name": "arguments", "type": 3, "value": arguments}]
+
+        interaction = {
+            "id": str(snowflake()),
+            "application_id": str(self.application_id),
+            "type": APPLICATION_COMMAND,
+            "data": data,
+            "channel_id": str(channel_id or snowflake()),
+            "token": f"local-{snowflake()}",
+            "version": 1
+        }
+        if guild_id is not None:
+            interaction["guild_id"] = str(guild_id)
+            interaction["member"] = {"user": user, "roles": [], "deaf": False, "mute": False,
+                                     "joined_at": datetime.datetime.utcnow().isoformat(),
+                                     "nick": None, "permissions": "0"}
+        else:
+            interaction["user"] = user
+        return interaction
+
+    async def send(self, session: aiohttp.ClientSession, url: str, interaction: dict) -> dict:
+        """Signs and posts an interaction, returning the response of the server."""
+
+        body = json.dumps(interaction).encode()
+        async with session.post(url, data=body, headers=self.headers(body)) as resp:
+            return await resp.json()
+
+
+async def register_commands(bot) -> int:
+    """Registers INTERACTION_COMMANDS as global slash commands of the application."""
+
+    application = await bot.application_info()
+    payload = []
+    for name in INTERACTION_COMMANDS:
+        command = bot.get_command(name)
+        payload.append({
+            "name": name,
+            "description": (command.short_doc or name)[:100],
+            "options": [{
+                "name": "arguments",
+                "description": "The arguments of the command.",
+                "type": 3,
+                "required": False
+            }]
+        })
+
+    route = discord.http.Route("PUT", "/applications/{application_id}/commands",
+                               application_id=application.id)
+    await bot.http.request(route, json=payload)
+    return len(payload)
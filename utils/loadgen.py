@@ -0,0 +1,249 @@
+import asyncio
+import collections
+import random
+import time
+
+from utils.fakegateway import FakeGateway, make_guild, make_message, make_voice_state, snowflake
+from utils.memory import resident_memory
+
+__all__ = ["DEFAULT_MIX", "FakeWavelink", "LoadGenerator", "install_fake_wavelink", "parse_mix"]
+
+# The relative weights of the commands sent by the load generator.
+DEFAULT_MIX = {"ping": 4, "list": 2, "serverinfo": 2, "apoll": 1, "play": 1}
+
+
+def parse_mix(text: str) -> dict:
+    """Parses a command mix of the form ping=4,list=2 into a dictionary."""
+
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class FakeTrack:
+    def __init__(self, title: str):
+        self.title = title
+
+    def __str__(self):
+        return self.title
+
+
+class FakePlayer:
+    """A stand-in for wavelink.Player that plays nothing."""
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.channel_id = None
+        self.volume = 100
+        self.current = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self.channel_id is not None
+
+    async def connect(self, channel_id: int) -> None:
+        self.channel_id = channel_id
+
+    async def set_volume(self, volume: int) -> None:
+        self.volume = volume
+
+    async def play(self, track) -> None:
+        self.current = track
+
+    async def destroy(self) -> None:
+        self.channel_id = None
+
+
+class _FakeNode:
+    def set_hook(self, hook) -> None:
+        self.hook = hook
+
+
+class FakeWavelink:
+    """A stand-in for wavelink.Client that answers every search with one track."""
+
+    def __init__(self):
+        self.nodes = {}
+        self.players = {}
+
+    def get_player(self, guild_id: int) -> FakePlayer:
+        player = self.players.get(guild_id)
+        if player is None:
+            player = self.players[guild_id] = FakePlayer(guild_id)
+        return player
+
+    async def initiate_node(self, **settings) -> _FakeNode:
+        return _FakeNode()
+
+    async def get_tracks(self, query: str) -> list:
+        return [FakeTrack(query.replace("ytsearch:", ""))]
+
+
+def install_fake_wavelink(bot) -> None:
+    """Replaces the wavelink client of the music extension with FakeWavelink."""
+
+    client = getattr(bot, "wavelink", None)
+    session = getattr(client, "session", None)
+    if session is not None:
+        bot.loop.create_task(session.close())
+    bot.wavelink = FakeWavelink()
+
+
+class _SyntheticGuild:
+    __slots__ = ("guild_id", "channel_id", "owner_id", "member_ids")
+
+    def __init__(self, guild_id: int, channel_id: int, owner_id: int, member_ids: list):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.owner_id = owner_id
+        self.member_ids = member_ids
+
+
+class LoadGenerator:
+    """Drives Photon with synthetic command messages through a fake gateway.
+
+    Every guild has one text channel, one voice channel in which the
+    owner sits, and a few members with notes. Messages are dispatched at
+    a fixed rate, and the latency of every command is measured from the
+    dispatch of its message to its completion or failure. Commands that
+    have not finished once the drain timeout after the last message has
+    passed count as failed.
+
+    Arguments
+    ----------
+    bot : Photon
+        The bot to drive, with FakeWavelink installed for the play command.
+    gateway : FakeGateway
+        The fake gateway connected to the bot.
+    guilds : int
+        The amount of synthetic guilds.
+    members : int
+        The amount of members of every guild.
+    mix : dict
+        The relative weights of the commands that are sent.
+    """
+
+    def __init__(self, bot, gateway: FakeGateway, guilds: int = 100, members: int = 20,
+                 mix: dict = None):
+        self.bot = bot
+        self.gateway = gateway
+        self.guild_count = guilds
+        self.member_count = members
+        self.mix = mix or DEFAULT_MIX
+        self.guilds = []
+
+        self.sent = 0
+        self.completed = 0
+        self.failed = 0
+        self.errors = collections.Counter()
+        self.latencies = []
+        self._pending = {}
+        self._last_done: float = None
+
+    def build_guilds(self) -> list:
+        payloads = []
+        for _ in range(self.guild_count):
+            member_ids = [snowflake() for _ in range(self.member_count)]
+            guild = _SyntheticGuild(snowflake(), snowflake(), member_ids[0], member_ids)
+            voice_channel_id = snowflake()
+            payloads.append(make_guild(
+                guild.guild_id, guild.owner_id, [guild.channel_id], member_ids,
+                voice_channel_ids=[voice_channel_id],
+                voice_states=[make_voice_state(guild.owner_id, voice_channel_id)]))
+            self.guilds.append(guild)
+        return payloads
+
+    async def seed(self) -> None:
+        """Creates the guild entries and a few notes for every member."""
+
+        database = self.bot.database
+        for guild in self.guilds:
+            await self.bot.guild_config.get(guild.guild_id)
+            for member_id in guild.member_ids:
+                for number in range(3):
+                    await database.insert_note(f"Note {number}", "Synthetic note.", member_id)
+
+    async def _on_command_done(self, ctx, error=None) -> None:
+        start = self._pending.pop(ctx.message.id, None)
+        if start is None:
+            return
+        self._last_done = time.perf_counter()
+        self.latencies.append(self._last_done - start)
+        if error is None:
+            self.completed += 1
+        else:
+            self.failed += 1
+            self.errors[type(getattr(error, "original", error)).__name__] += 1
+
+    def send_one(self, command: str) -> None:
+        guild = random.choice(self.guilds)
+
+        # The owner is the only member in a voice channel and the DJ of the guild.
+        author_id = guild.owner_id if command == "play" else random.choice(guild.member_ids)
+        content = "&play synthetic track" if command == "play" else f"&{command}"
+
+        message_id = snowflake()
+        self._pending[message_id] = time.perf_counter()
+        self.sent += 1
+        self.gateway.dispatch("MESSAGE_CREATE", make_message(
+            message_id, guild.channel_id, guild.guild_id, author_id, content))
+
+    async def run(self, rate: float, duration: float, tick: float = 0.01,
+                  drain_timeout: float = 10.0) -> dict:
+        """Connects the bot, sends messages at the given rate and returns a report."""
+
+        self.bot.add_listener(self._on_command_done, "on_command_completion")
+        self.bot.add_listener(self._on_command_done, "on_command_error")
+
+        await self.gateway.start(self.build_guilds())
+        await self.seed()
+
+        commands = list(self.mix)
+        weights = [self.mix[command] for command in commands]
+
+        memory_before = resident_memory()
+        start = time.perf_counter()
+        budget = 0.0
+        while time.perf_counter() - start < duration:
+            budget += rate * tick
+            batch = int(budget)
+            budget -= batch
+            for command in random.choices(commands, weights, k=batch):
+                self.send_one(command)
+            await asyncio.sleep(tick)
+        sending_done = time.perf_counter()
+
+        # Give the commands that are still running some time to finish.
+        while self._pending and time.perf_counter() - sending_done < drain_timeout:
+            await asyncio.sleep(0.05)
+        drained = time.perf_counter()
+
+        unfinished = len(self._pending)
+        if unfinished:
+            self.errors["Unfinished"] += unfinished
+
+        # Throughput is measured up to the last completion, not over the drain wait.
+        elapsed = max(self._last_done or sending_done, sending_done) - start
+
+        latencies = sorted(self.latencies)
+
+        def percentile(quantile):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(quantile * len(latencies)))]
+
+        return {
+            "sent": self.sent,
+            "completed": self.completed,
+            "failed": self.failed + unfinished,
+            "unfinished": unfinished,
+            "errors": dict(self.errors),
+            "commands_per_second": (self.completed + self.failed) / elapsed,
+            "drain_s": drained - sending_done,
+            "p50_ms": percentile(0.5) * 1000,
+            "p99_ms": percentile(0.99) * 1000,
+            "memory_growth_mib": (resident_memory() - memory_before) / 2 ** 20,
+            "rest_calls": self.gateway.rest.calls
+        }
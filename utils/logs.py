@@ -0,0 +1,98 @@
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+__all__ = ["JsonFormatter", "SamplingFilter", "command_extra", "setup_logging"]
+
+TEXT_FORMAT = "[PHOTON] Time: %(asctime)s Message: %(message)s"
+
+# Fields that can be attached to a record through the extra argument.
+CONTEXT_FIELDS = ("event", "guild", "command", "latency")
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as JSON lines, one object per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.utcfromtimestamp(record.created).isoformat() + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Only lets through a fraction of the records of noisy events.
+
+    Arguments
+    ----------
+    rates : dict
+        The fraction of records kept for every event, records of other
+        events are always kept.
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(getattr(record, "event", None))
+        return rate is None or random.random() < rate
+
+
+def command_extra(ctx, **fields) -> dict:
+    """Returns the extra fields of a record logged while handling a command."""
+
+    fields["guild"] = ctx.guild.id if ctx.guild is not None else None
+    fields["command"] = ctx.command.qualified_name if ctx.command is not None else None
+    return fields
+
+
+def setup_logging(tuning: dict) -> logging.handlers.QueueListener:
+    """Routes the Photon loggers through a queue to a listener thread.
+
+    The loggers only put records on the queue, formatting and writing
+    them happens on the thread of the returned listener, which has to
+    be stopped on shutdown to flush the remaining records."""
+
+    if tuning.get("log_format", "json") == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT, datefmt="%d-%b-%y %H:%M:%S")
+
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if "log_file" in tuning:
+        handlers.append(logging.FileHandler(tuning["log_file"]))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.addFilter(SamplingFilter(tuning.get("log_sampling", {"command": 0.01})))
+
+    logger = logging.getLogger("Photon")
+    logger.handlers = [queue_handler]
+    logger.propagate = False
+    logger.setLevel(tuning.get("log_level", logging.INFO))
+
+    # Warnings of discord.py take the same path.
+    library_logger = logging.getLogger("discord")
+    library_logger.handlers = [queue_handler]
+    library_logger.propagate = False
+    library_logger.setLevel(logging.WARNING)
+
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,51 @@
+import datetime
+import itertools
+import os
+import sys
+
+__all__ = ["resident_memory", "session_size"]
+
+_SCALARS = (str, bytes, int, float, datetime.datetime)
+
+
+def resident_memory() -> int:
+    """Returns the resident set size of this process in bytes."""
+
+    # Linux exposes it without any imports, elsewhere psutil is used.
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import psutil
+        return psutil.Process().memory_info().rss
+
+
+def session_size(session) -> int:
+    """Returns the bytes held by a session record such as a poll controller.
+
+    Builtin containers and records with __slots__ are followed, every
+    other object, such as the bot, a task or an enum member, is shared
+    with the rest of the process and not counted."""
+
+    seen = set()
+
+    def size(obj) -> int:
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+
+        if isinstance(obj, _SCALARS):
+            return sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            children = itertools.chain.from_iterable(obj.items())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            children = obj
+        elif hasattr(type(obj), "__slots__"):
+            names = itertools.chain.from_iterable(
+                getattr(cls, "__slots__", ()) for cls in type(obj).__mro__)
+            children = [getattr(obj, name, None) for name in names]
+        else:
+            return 0
+        return sys.getsizeof(obj) + sum(size(child) for child in children)
+
+    return size(session)
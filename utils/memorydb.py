@@ -0,0 +1,130 @@
+import itertools
+from datetime import datetime, timedelta
+from typing import Union
+
+import discord
+
+from structs.hiddenpoll import PollController
+from utils.db import note_limit
+
+__all__ = ["MemoryDatabaseHelper"]
+
+
+class MemoryDatabaseHelper:
+    """An in-memory stand-in for DatabaseHelper.
+
+    It implements the same methods on plain dictionaries, so Photon can
+    be driven by benchmarks and replays without Postgres. Rows are
+    returned as dictionaries, which support the same item access as
+    asyncpg records. There is only one process, hence guild
+    configuration changes are never announced."""
+
+    def __init__(self):
+        self.pool = None
+        self.guilds = {}
+        self.notes = {}
+        self.note_counts = {}
+        self.polls = {}
+        self._note_ids = itertools.count(1)
+
+    async def listen_guild_changes(self, callback, on_reconnect=None) -> None:
+        pass
+
+    async def create_guild_entry(self, guild: discord.Guild, origin: str = "") -> None:
+        self.guilds[guild.id] = {"guild_id": guild.id, "prefix": "&", "welcome": None}
+
+    async def delete_guild_entry(self, guild: discord.Guild, origin: str = "") -> None:
+        self.guilds.pop(guild.id, None)
+
+    async def fetch_guild_configs(self, limit: int) -> list:
+        return list(itertools.islice(self.guilds.values(), limit))
+
+    async def fetch_guild_config(self, guild_id: int) -> Union[dict, None]:
+        return self.guilds.get(guild_id)
+
+    async def get_welcome_channel(self, guild: discord.Guild) -> Union[int, None]:
+        row = self.guilds.get(guild.id)
+        return row["welcome"] if row is not None else None
+
+    async def update_welcome_channel(self, guild_id: int, channel_id: int,
+                                     origin: str = "") -> None:
+        if guild_id in self.guilds:
+            self.guilds[guild_id]["welcome"] = channel_id
+
+    async def update_prefix(self, guild_id: int, prefix: str, origin: str = "") -> None:
+        if guild_id in self.guilds:
+            self.guilds[guild_id]["prefix"] = prefix
+
+    async def is_allowed_notes(self, user_id, is_premium) -> bool:
+        return self.note_counts.get(user_id, 0) < note_limit(is_premium)
+
+    async def insert_note(self, title: str, content: str, user_id: int,
+                          is_premium: bool = False) -> Union[int, None]:
+        if self.note_counts.get(user_id, 0) >= note_limit(is_premium):
+            return None
+
+        note_id = next(self._note_ids)
+        self.notes[note_id] = {
+            "note_id": note_id, "user_id": user_id, "title": title, "content": content
+        }
+        self.note_counts[user_id] = self.note_counts.get(user_id, 0) + 1
+        return note_id
+
+    async def fetch_notes(self, user_id: int) -> list:
+        return [
+            {"note_id": note["note_id"], "title": note["title"]}
+            for note in self.notes.values() if note["user_id"] == user_id
+        ]
+
+    async def fetch_notes_page(self, user_id: int, after_id: int, limit: int) -> list:
+        notes = await self.fetch_notes(user_id)
+        return sorted((note for note in notes if note["note_id"] > after_id),
+                      key=lambda note: note["note_id"])[:limit]
+
+    async def delete_note(self, note_id: int, user_id: int) -> Union[str, None]:
+        note = self.notes.get(note_id)
+        if note is None or note["user_id"] != user_id:
+            return None
+        self.note_counts[user_id] -= 1
+        return self.notes.pop(note_id)["title"]
+
+    async def fetch_note(self, user_id: int, note_id: int) -> Union[dict, None]:
+        note = self.notes.get(note_id)
+        if note is None or note["user_id"] != user_id:
+            return None
+        return {"content": note["content"], "title": note["title"]}
+
+    async def insert_poll(self, end: datetime, ctr: PollController) -> None:
+        self.polls[ctr.message_id] = {
+            "poll_id": ctr.message_id,
+            "guild_id": ctr.guild_id,
+            "question": ctr.question,
+            "start_time": ctr.start,
+            "end_time": end,
+            "votes": [ctr.votes.retrieve(emoji) for emoji, _ in ctr.options],
+            "options": [option for _, option in ctr.options]
+        }
+
+    async def fetch_polls_page(self, guild_id: int, before_id: int, limit: int) -> list:
+        polls = [
+            {"poll_id": poll["poll_id"], "question": poll["question"]}
+            for poll in self.polls.values()
+            if poll["guild_id"] == guild_id and poll["poll_id"] < before_id
+        ]
+        return sorted(polls, key=lambda poll: poll["poll_id"], reverse=True)[:limit]
+
+    async def fetch_poll(self, poll_id: int, guild_id: int) -> Union[dict, None]:
+        poll = self.polls.get(poll_id)
+        if poll is None or poll["guild_id"] != guild_id:
+            return None
+        return poll
+
+    async def maintain_polls_partitions(self, retention_months: int) -> Union[list, None]:
+        cutoff = datetime.utcnow() - timedelta(days=31 * retention_months)
+        for poll_id in [poll_id for poll_id, poll in self.polls.items()
+                        if poll["end_time"] < cutoff]:
+            del self.polls[poll_id]
+        return []
+
+    async def close_database_pool(self) -> None:
+        pass
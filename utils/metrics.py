@@ -0,0 +1,199 @@
+import bisect
+import math
+
+from aiohttp import web
+
+__all__ = ["Counter", "Gauge", "Histogram", "MetricsRegistry", "MetricsServer"]
+
+# Latency buckets in seconds, from a fast cached reply to a slow upstream.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: tuple, labelvalues: tuple, extra: str = "") -> str:
+    pairs = []
+    for name, value in zip(labelnames, labelvalues):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def samples(self):
+        """Yields the (suffix, labelvalues, extra label, value) of every sample."""
+        for key, value in self._values.items():
+            yield "", key, "", value
+
+    def render(self) -> list:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}"
+        ]
+        for suffix, key, extra, value in self.samples():
+            labels = _format_labels(self.labelnames, key, extra)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """A monotonically increasing value."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def total(self) -> float:
+        return sum(self._values.values())
+
+
+class Gauge(_Metric):
+    """A value that can go up and down.
+
+    If a callback is given it is called on every scrape. It returns
+    the value itself, or a dictionary of label value tuples to values
+    when the gauge has labels."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def samples(self):
+        if self.callback is None:
+            yield from super().samples()
+            return
+
+        result = self.callback()
+        if not isinstance(result, dict):
+            result = {(): result}
+        for key, value in result.items():
+            yield "", key, "", value
+
+
+class Histogram(_Metric):
+    """A distribution of observations counted in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            # Bucket counts, then the sum and the count of observations.
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def samples(self):
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, amount in zip(self.buckets + (math.inf,), counts):
+                cumulative += amount
+                yield "_bucket", key, f'le="{_format_value(bound)}"', cumulative
+            yield "_sum", key, "", total
+            yield "_count", key, "", count
+
+
+class MetricsRegistry:
+    """Holds every metric of a Photon process.
+
+    Registering a metric under a name that already exists returns the
+    existing metric, so extensions can be reloaded safely."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = (),
+              callback=None) -> Gauge:
+        gauge = self._register(Gauge, name, documentation, labelnames)
+        if callback is not None:
+            gauge.callback = callback
+        return gauge
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """A local aiohttp server that exposes a registry on /metrics."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9100):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: web.AppRunner = None
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(),
+                            content_type="text/plain",
+                            charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
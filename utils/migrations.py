@@ -0,0 +1,99 @@
+import os
+import re
+
+import asyncpg
+
+__all__ = ["Migration", "PendingMigrations", "load_migrations", "applied_versions", "pending",
+           "migrate"]
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+
+# Migration files are named like 0001_initial.sql and applied in the order of their number.
+FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# Held while migrating, so that only one process migrates at a time.
+LOCK_KEY = 0x50484f544f4e
+
+SCHEMA_VERSION = """
+    CREATE TABLE IF NOT EXISTS schema_version(
+        version integer PRIMARY KEY,
+        name text NOT NULL,
+        applied_at timestamp with time zone NOT NULL DEFAULT now()
+    );"""
+
+
+class PendingMigrations(Exception):
+    """Raised on startup when the database schema is not up to date."""
+
+    def __init__(self, migrations: list):
+        self.migrations = migrations
+        names = ", ".join(migration.filename for migration in migrations)
+        super().__init__(
+            f"The database has pending migrations ({names}). "
+            "Run launcher.py migrate or enable auto_migrate.")
+
+
+class Migration:
+    """A single migration file."""
+
+    __slots__ = ("version", "name", "filename", "sql")
+
+    def __init__(self, version: int, name: str, filename: str, sql: str):
+        self.version = version
+        self.name = name
+        self.filename = filename
+        self.sql = sql
+
+
+def load_migrations(path: str = MIGRATIONS_DIR) -> list:
+    """Reads the migration files of the directory, ordered by version."""
+
+    migrations = []
+    for filename in os.listdir(path):
+        match = FILENAME.match(filename)
+        if match is None:
+            continue
+        with open(os.path.join(path, filename), encoding="utf-8") as fp:
+            migrations.append(Migration(int(match[1]), match[2], filename, fp.read()))
+
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError("Two migration files have the same version.")
+    return migrations
+
+
+async def applied_versions(con: asyncpg.Connection) -> set:
+    """Returns the versions that have been applied to the database."""
+
+    exists = await con.fetchval("SELECT to_regclass('schema_version') IS NOT NULL;")
+    if not exists:
+        return set()
+    return {row["version"] for row in await con.fetch("SELECT version FROM schema_version;")}
+
+
+async def pending(con: asyncpg.Connection, path: str = MIGRATIONS_DIR) -> list:
+    """Returns the migrations that have not been applied yet."""
+
+    applied = await applied_versions(con)
+    return [migration for migration in load_migrations(path) if migration.version not in applied]
+
+
+async def migrate(con: asyncpg.Connection, path: str = MIGRATIONS_DIR) -> list:
+    """Applies every pending migration, each in its own transaction, and returns them."""
+
+    await con.execute("SELECT pg_advisory_lock($1);", LOCK_KEY)
+    try:
+        await con.execute(SCHEMA_VERSION)
+
+        # Another process may have migrated while this one waited for the lock.
+        migrations = await pending(con, path)
+        for migration in migrations:
+            async with con.transaction():
+                await con.execute(migration.sql)
+                await con.execute(
+                    "INSERT INTO schema_version (version, name) VALUES ($1, $2);",
+                    migration.version, migration.name)
+        return migrations
+    finally:
+        await con.execute("SELECT pg_advisory_unlock($1);", LOCK_KEY)
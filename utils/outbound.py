@@ -0,0 +1,204 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+import discord
+
+from utils import deadline
+
+__all__ = ["OutboundDispatcher", "HIGH", "NORMAL", "LOW"]
+
+# Priorities of queued operations, lower values are sent first.
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+# Estimated per channel limits of the Discord routes as (requests, period).
+# discord.py still handles the real rate limits, these only keep bursts
+# from reaching them in the first place.
+BUCKETS = {
+    "message": (5, 5.0),
+    "delete": (5, 1.0),
+    "reaction": (1, 0.25)
+}
+
+
+class _Bucket:
+    """A token bucket that estimates the state of a Discord rate limit bucket."""
+
+    __slots__ = ("rate", "period", "tokens", "updated")
+
+    def __init__(self, rate: int, period: float):
+        self.rate = rate
+        self.period = period
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+
+    def delay(self) -> float:
+        """Takes a token and returns how long to wait before using it."""
+
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.period)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens * self.period / self.rate
+
+
+class _Operation:
+    __slots__ = ("bucket", "func", "args", "kwargs", "future", "key")
+
+    def __init__(self, bucket: str, func, args: tuple, kwargs: dict, future: asyncio.Future,
+                 key=None):
+        self.bucket = bucket
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.key = key
+
+
+def _consume(future: asyncio.Future) -> None:
+    # Operations are often fired and forgotten, hence their errors are
+    # marked as retrieved here and logged by the dispatcher instead.
+    if not future.cancelled():
+        future.exception()
+
+
+class OutboundDispatcher:
+    """Queues the REST operations of Photon per channel.
+
+    Every channel has its own priority queue that is drained by a single
+    task, in order of priority and then of submission. Before every
+    operation the estimated rate limit bucket of its route is consulted,
+    and edits to a message that are still queued are merged into one.
+
+    Every method returns a future that resolves to the result of the
+    operation, it can be awaited or left alone.
+
+    Arguments
+    ----------
+    loop : asyncio.AbstractEventLoop
+        The loop the queues are drained on.
+    logger : logging.Logger
+        The logger failed operations are reported to.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, logger: logging.Logger):
+        self.loop = loop
+        self.logger = logger
+        self.completed = 0
+        self.failed = 0
+        self.coalesced = 0
+
+        self._sequence = itertools.count()
+        self._queues = {}
+        self._workers = {}
+        self._pending_edits = {}
+        self._buckets = {}
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _submit(self, channel_id: int, priority: int, operation: _Operation) -> asyncio.Future:
+        operation.future.add_done_callback(_consume)
+        queue = self._queues.setdefault(channel_id, [])
+        heapq.heappush(queue, (priority, next(self._sequence), operation))
+        if channel_id not in self._workers:
+            self._workers[channel_id] = self.loop.create_task(
+                deadline.detached(self._drain(channel_id)))
+        return operation.future
+
+    def _operation(self, bucket: str, func, *args, key=None, **kwargs) -> _Operation:
+        return _Operation(bucket, func, args, kwargs, self.loop.create_future(), key)
+
+    async def _drain(self, channel_id: int) -> None:
+        queue = self._queues[channel_id]
+        while queue:
+            _, _, operation = heapq.heappop(queue)
+            if operation.key is not None:
+                self._pending_edits.pop(operation.key, None)
+
+            bucket_key = (operation.bucket, channel_id)
+            bucket = self._buckets.get(bucket_key)
+            if bucket is None:
+                bucket = self._buckets[bucket_key] = _Bucket(*BUCKETS[operation.bucket])
+            delay = bucket.delay()
+            if delay:
+                await asyncio.sleep(delay)
+
+            try:
+                result = await operation.func(*operation.args, **operation.kwargs)
+            except Exception as e:
+                self.failed += 1
+                self.logger.debug("Outbound %s operation failed: %s", operation.bucket, e)
+                if not operation.future.done():
+                    operation.future.set_exception(e)
+            else:
+                self.completed += 1
+                if not operation.future.done():
+                    operation.future.set_result(result)
+
+        del self._queues[channel_id]
+        del self._workers[channel_id]
+
+        # Idle buckets refill completely, there is no need to keep them around.
+        for name in BUCKETS:
+            self._buckets.pop((name, channel_id), None)
+
+    def send(self, channel: discord.abc.Messageable, *args, priority: int = NORMAL,
+             **kwargs) -> asyncio.Future:
+        """Queues a message to be sent to the channel."""
+
+        operation = self._operation("message", channel.send, *args, **kwargs)
+        return self._submit(channel.id, priority, operation)
+
+    def edit(self, message: discord.Message, *, priority: int = NORMAL,
+             **fields) -> asyncio.Future:
+        """Queues an edit of a message.
+
+        If an edit of the same message is still queued the fields are
+        merged into it and both callers share its future."""
+
+        pending = self._pending_edits.get(message.id)
+        if pending is not None:
+            self.coalesced += 1
+            pending.kwargs.update(fields)
+            return pending.future
+
+        operation = self._operation("message", message.edit, key=message.id, **fields)
+        self._pending_edits[message.id] = operation
+        return self._submit(message.channel.id, priority, operation)
+
+    def delete(self, message: discord.Message, *, priority: int = LOW) -> asyncio.Future:
+        """Queues the deletion of a message."""
+
+        operation = self._operation("delete", message.delete)
+        return self._submit(message.channel.id, priority, operation)
+
+    def add_reaction(self, message: discord.Message, emoji, *,
+                     priority: int = NORMAL) -> asyncio.Future:
+        """Queues a reaction to be added to a message."""
+
+        operation = self._operation("reaction", message.add_reaction, emoji)
+        return self._submit(message.channel.id, priority, operation)
+
+    def remove_reaction(self, message: discord.Message, emoji, member, *,
+                        priority: int = LOW) -> asyncio.Future:
+        """Queues the removal of the reaction of a member from a message."""
+
+        operation = self._operation("reaction", message.remove_reaction, emoji, member)
+        return self._submit(message.channel.id, priority, operation)
+
+    def close(self) -> None:
+        """Cancels every queued operation."""
+
+        for task in self._workers.values():
+            task.cancel()
+        for queue in self._queues.values():
+            for _, _, operation in queue:
+                operation.future.cancel()
@@ -0,0 +1,143 @@
+import asyncio
+from typing import Union
+
+import discord
+from discord.ext import commands
+
+from utils import deadline
+
+__all__ = ["KeysetPages", "ReactionPaginator"]
+
+PREVIOUS = "◀️"
+NEXT = "▶️"
+
+
+class KeysetPages:
+    """The pages of a keyset paginated query, read and rendered on first use.
+
+    Pages are read in order from the last rendered one, every read starts
+    after the cursor of the last row of the page before it, so reading a
+    page never skips over the rows of the pages before it.
+
+    Arguments
+    ----------
+    fetch : Callable[[Any, int], Awaitable[list]]
+        Returns up to the given amount of rows after the cursor, in cursor order.
+    render : Callable[[list, int], discord.Embed]
+        Renders the rows of the page with the zero based index.
+    key : str
+        The column of the rows that is the cursor.
+    start
+        The cursor before the first row.
+    per_page : int
+        The amount of rows of a page.
+    """
+
+    __slots__ = ("fetch", "render", "key", "per_page", "embeds", "cursors")
+
+    def __init__(self, fetch, render, key: str, start, per_page: int = 10):
+        self.fetch = fetch
+        self.render = render
+        self.key = key
+        self.per_page = per_page
+        self.embeds = []
+        # The cursor before every page, known up to the page after the last embed.
+        self.cursors = [start]
+
+    async def get(self, index: int) -> Union[discord.Embed, None]:
+        """Returns the embed of the page with the index, or None if there is no such page."""
+
+        while len(self.embeds) <= index:
+            loaded = len(self.embeds)
+            if loaded == len(self.cursors):
+                return None
+
+            # One row more than a page tells whether there is a next page.
+            rows = await self.fetch(self.cursors[loaded], self.per_page + 1)
+            if not rows:
+                return None
+            if len(rows) > self.per_page:
+                rows = rows[:self.per_page]
+                self.cursors.append(rows[-1][self.key])
+            self.embeds.append(self.render(rows, loaded))
+
+        return self.embeds[index]
+
+
+class ReactionPaginator:
+    """Shows one page of embeds at a time, turned with reactions.
+
+    Pages are not built up front, the paginator asks for a page when it
+    is first shown, so only the pages the user opens and the page after
+    the first are rendered. A reply without reactions, like an
+    interaction response, only shows the first page.
+
+    Arguments
+    ----------
+    ctx : commands.Context
+        The context of the command, only its author can turn the pages.
+    get_page : Callable[[int], Awaitable[Union[discord.Embed, None]]]
+        Returns the embed of the page with the zero based index, or None
+        if there is no such page.
+    timeout : float
+        The seconds without a reaction after which paging stops.
+    """
+
+    def __init__(self, ctx: commands.Context, get_page, timeout: float = 60.0):
+        self.ctx = ctx
+        self.get_page = get_page
+        self.timeout = timeout
+
+    async def start(self, index: int = 0) -> bool:
+        """Shows the page with the index and turns the pages until the timeout.
+
+        Returns False without sending anything if the page does not exist."""
+
+        embed = await self.get_page(index)
+        if embed is None:
+            return False
+
+        ctx = self.ctx
+        message = await ctx.send(embed=embed)
+        if not isinstance(message, discord.Message):
+            return True
+
+        # A single page has nothing to turn to.
+        if index == 0 and await self.get_page(1) is None:
+            return True
+
+        outbound = ctx.bot.outbound
+        await outbound.add_reaction(message, PREVIOUS)
+        await outbound.add_reaction(message, NEXT)
+
+        def check(payload: discord.RawReactionActionEvent) -> bool:
+            return (payload.message_id == message.id and payload.user_id == ctx.author.id
+                    and str(payload.emoji) in (PREVIOUS, NEXT))
+
+        while True:
+            try:
+                payload = await ctx.bot.wait_for(
+                    "raw_reaction_add", check=check, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                break
+
+            # Turning a page starts a new time budget, like a reply does.
+            deadline.renew()
+            if message.guild is not None:
+                outbound.remove_reaction(message, payload.emoji, discord.Object(payload.user_id))
+
+            target = index - 1 if str(payload.emoji) == PREVIOUS else index + 1
+            if target < 0:
+                continue
+            embed = await self.get_page(target)
+            if embed is None:
+                continue
+            index = target
+            outbound.edit(message, embed=embed)
+
+        if message.guild is not None:
+            try:
+                await message.clear_reactions()
+            except discord.HTTPException:
+                pass
+        return True
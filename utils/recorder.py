@@ -0,0 +1,209 @@
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+__all__ = ["GatewayRecorder", "anonymize", "read_capture"]
+
+# String fields that describe the structure of an event rather than what
+# people wrote, every other string is blanked.
+KEPT_FIELDS = frozenset((
+    "type", "status", "desktop", "mobile", "web", "locale", "preferred_locale", "region",
+    "rtc_region", "features", "timestamp", "joined_at", "edited_timestamp", "premium_since",
+    "content_type"
+))
+
+# Objects whose names are kept, the emoji names drive the polls.
+PUBLIC_NAMES = frozenset(("emoji", "emojis"))
+
+# Numeric strings that are not IDs.
+BITFIELDS = frozenset(("permissions", "allow", "deny", "allow_new", "deny_new"))
+
+# Commands are kept if they follow a prefix of at most this many characters.
+MAX_PREFIX = 5
+
+MENTION = re.compile(r"^<(@!?|@&|#)(\d{15,})>$")
+
+
+def _snowflake(value: int, key: bytes) -> int:
+    # The timestamp bits are kept so that the shard of a guild and the
+    # order of the events stay the same, the rest is a keyed hash.
+    digest = hmac.new(key, value.to_bytes(8, "big"), hashlib.blake2s).digest()
+    return (value >> 22 << 22) | (int.from_bytes(digest[:4], "big") & 0x3FFFFF)
+
+
+def _blank(text: str) -> str:
+    return "x" * min(len(text), 32)
+
+
+def _is_invocation(word: str, mentioned: bool, is_command) -> bool:
+    # The word has to be a whole command after a prefix, or alone after a
+    # mention. A prefix has to end in a symbol, otherwise an ordinary word
+    # that ends in a command, like display, would be kept.
+    if is_command is None:
+        return False
+    if mentioned and is_command(word.lower()):
+        return True
+    return any(not word[i - 1].isalnum() and is_command(word[i:].lower())
+               for i in range(1, min(MAX_PREFIX, len(word) - 1) + 1))
+
+
+def _content(text: str, key: bytes, is_command) -> str:
+    # A command and the mention or prefix before it are kept so that
+    # commands are replayed as commands, every other word is blanked.
+    words = text.split(" ")
+    kept = []
+    for word in words[:2]:
+        mention = MENTION.match(word)
+        if mention is not None and not kept:
+            kept.append(f"<{mention[1]}{_snowflake(int(mention[2]), key)}>")
+            continue
+        if _is_invocation(word, bool(kept), is_command):
+            kept.append(word)
+        break
+
+    return " ".join(kept + [_blank(word) for word in words[len(kept):]])
+
+
+def anonymize(data, key: bytes, parent: str = None, is_command=None):
+    """Returns a copy of a gateway payload without private information.
+
+    IDs are replaced consistently for the same key, every free text is
+    blanked and message content only keeps a command and its prefix.
+    is_command tells whether a word is the name of a command."""
+
+    if isinstance(data, dict):
+        result = {}
+        for name, value in data.items():
+            if name in BITFIELDS:
+                result[name] = value
+            elif isinstance(value, str) and value.isdigit() and len(value) >= 15:
+                result[name] = str(_snowflake(int(value), key))
+            elif name == "content" and isinstance(value, str):
+                result[name] = _content(value, key, is_command)
+            elif isinstance(value, str):
+                kept = name in KEPT_FIELDS or (name == "name" and parent in PUBLIC_NAMES)
+                result[name] = value if kept else _blank(value)
+            else:
+                result[name] = anonymize(value, key, name, is_command)
+        return result
+    elif isinstance(data, list):
+        return [anonymize(value, key, parent, is_command) for value in data]
+    elif isinstance(data, str):
+        if data.isdigit() and len(data) >= 15:
+            return str(_snowflake(int(data), key))
+        return data if parent in KEPT_FIELDS else _blank(data)
+    return data
+
+
+def read_capture(path: str):
+    """Yields the (offset, event, data) entries of a capture file."""
+
+    with gzip.open(path, "rt", encoding="utf-8") as fp:
+        for line in fp:
+            entry = json.loads(line)
+            if "e" in entry:
+                yield entry["t"], entry["e"], entry["d"]
+
+
+def _load_key(path: str, create: bool) -> bytes:
+    """Returns the key of a capture, kept next to it so that appending keeps the IDs."""
+
+    key_path = path + ".key"
+    try:
+        with open(key_path, "rb") as fp:
+            return fp.read()
+    except FileNotFoundError:
+        if not create:
+            raise ValueError(f"The key of {path} is missing, record to a new file.") from None
+        key = os.urandom(16)
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(key)
+        return key
+
+
+def _key_id(key: bytes) -> str:
+    return hashlib.blake2s(key, digest_size=8).hexdigest()
+
+
+def _capture_key_id(path: str):
+    """Returns the key ID in the header of a capture, or None if it has no entries."""
+
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as fp:
+            line = fp.readline()
+    except FileNotFoundError:
+        return None
+    if not line:
+        return None
+    return json.loads(line).get("key_id", "")
+
+
+class GatewayRecorder:
+    """Appends anonymized gateway dispatch events to a gzip compressed file.
+
+    Every line of the file is a JSON object holding the time since the
+    start of the recording, the event name and the anonymized payload.
+    The event loop only serializes the payload, anonymizing, compressing
+    and writing happen on a writer thread.
+
+    IDs are hashed with a key kept in the .key file next to the capture,
+    so they stay the same when a later recording is appended. The first
+    line of a capture holds the ID of its key.
+
+    Arguments
+    ----------
+    path : str
+        The capture file, new recordings are appended to it.
+    is_command : Callable[[str], bool]
+        Tells whether a word is the name of a command, message content
+        keeps only commands.
+    """
+
+    def __init__(self, path: str, is_command=None):
+        self.path = path
+        self.recorded = 0
+        self.is_command = is_command
+        recorded_with = _capture_key_id(path)
+        self._key = _load_key(path, create=recorded_with is None)
+        self._key_id = _key_id(self._key)
+        if recorded_with is not None and recorded_with != self._key_id:
+            raise ValueError(f"{path} was recorded with another key, record to a new file.")
+        self._header = recorded_with is None
+        self._start = time.monotonic()
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write, name="photon-recorder", daemon=True)
+        self._thread.start()
+
+    def on_socket_response(self, payload: dict) -> None:
+        """Records a raw gateway payload if it is a dispatch event."""
+
+        if payload.get("op") != 0:
+            return
+        self.recorded += 1
+        self._queue.put((time.monotonic() - self._start, payload["t"], json.dumps(payload["d"])))
+
+    def _write(self) -> None:
+        with gzip.open(self.path, "at", encoding="utf-8") as fp:
+            if self._header:
+                fp.write(json.dumps({"key_id": self._key_id}) + "\n")
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                offset, event, data = item
+                entry = {"t": round(offset, 4), "e": event,
+                         "d": anonymize(json.loads(data), self._key, is_command=self.is_command)}
+                fp.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def close(self) -> None:
+        """Writes the remaining events and closes the file."""
+
+        self._queue.put(None)
+        self._thread.join()
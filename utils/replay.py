@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+from utils.fakegateway import FakeGateway
+from utils.recorder import read_capture
+
+__all__ = ["EventTimings", "Replayer"]
+
+
+def _summary(durations: list) -> dict:
+    ordered = sorted(durations)
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p99_ms": ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1000
+    }
+
+
+class EventTimings:
+    """Measures the time spent in every event listener and every command."""
+
+    def __init__(self):
+        self.listeners = {}
+        self.commands = {}
+        self._started = {}
+
+    def install(self, bot) -> None:
+        run_event = bot._run_event
+
+        # Every listener of every event is run through Client._run_event.
+        async def timed_run_event(coro, event_name, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                await run_event(coro, event_name, *args, **kwargs)
+            finally:
+                name = getattr(coro, "__qualname__", event_name)
+                self.listeners.setdefault(name, []).append(time.perf_counter() - start)
+
+        bot._run_event = timed_run_event
+        bot.add_listener(self._on_command, "on_command")
+        bot.add_listener(self._on_command_done, "on_command_completion")
+        bot.add_listener(self._on_command_done, "on_command_error")
+
+    async def _on_command(self, ctx) -> None:
+        self._started[ctx.message.id] = time.perf_counter()
+
+    async def _on_command_done(self, ctx, error=None) -> None:
+        start = self._started.pop(ctx.message.id, None)
+        if start is None or ctx.command is None:
+            return
+        name = ctx.command.qualified_name
+        self.commands.setdefault(name, []).append(time.perf_counter() - start)
+
+    def report(self) -> dict:
+        return {
+            "listeners": {name: _summary(values) for name, values in self.listeners.items()},
+            "commands": {name: _summary(values) for name, values in self.commands.items()}
+        }
+
+
+class Replayer:
+    """Feeds a capture of GatewayRecorder to a bot through a fake gateway.
+
+    The capture has to start with the READY events of the recorded
+    process, which is the case when recording is enabled from startup.
+
+    Arguments
+    ----------
+    bot : Photon
+        The bot to drive.
+    path : str
+        The capture file.
+    speed : float
+        The replay speed, 2.0 replays the capture twice as fast as it was recorded.
+    rest : FakeREST
+        The REST stand-in used by the fake gateway.
+    """
+
+    def __init__(self, bot, path: str, speed: float = 1.0, rest=None):
+        self.bot = bot
+        self.path = path
+        self.speed = speed
+        self.timings = EventTimings()
+
+        # The shards of the capture are those that received a READY event.
+        shards = {}
+        for _, event, data in read_capture(path):
+            if event == "READY":
+                shard_id, shard_count = data.get("shard") or (0, 1)
+                shards[shard_id] = shard_count
+        shard_count = max(shards.values(), default=1)
+        self.gateway = FakeGateway(bot, rest, sorted(shards) or [0], shard_count)
+
+    async def run(self) -> dict:
+        """Replays the capture and returns the timings."""
+
+        self.timings.install(self.bot)
+        await self.gateway.connect()
+        parsers = self.bot._connection.parsers
+
+        skipped = 0
+        start = time.perf_counter()
+        for offset, event, data in read_capture(self.path):
+            delay = offset / self.speed - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if event not in parsers:
+                skipped += 1
+                continue
+            if event == "READY":
+                # The bot user of the capture is also the author of the fake REST replies.
+                data.setdefault("__shard_id__", (data.get("shard") or (0, 1))[0])
+                self.gateway.rest.user = data["user"]
+            self.gateway.dispatch(event, data)
+
+            # Let the listeners of the event run before the next one is due.
+            await asyncio.sleep(0)
+
+        # Give the commands that are still running some time to finish.
+        await asyncio.sleep(1.0)
+
+        report = self.timings.report()
+        report["events"] = self.gateway.dispatched
+        report["skipped"] = skipped
+        report["elapsed"] = time.perf_counter() - start
+        return report
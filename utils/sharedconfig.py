@@ -0,0 +1,250 @@
+import contextlib
+import mmap
+import os
+import struct
+from typing import Tuple, Union
+
+try:
+    import fcntl
+    fcntl_present = True
+except ImportError:
+    fcntl_present = False
+
+__all__ = ["SharedConfigTable"]
+
+MAGIC = b"PHGC"
+LAYOUT = 2
+
+# Magic, layout, slot count, warmed flag, entry count and epoch.
+HEADER = struct.Struct("<4sIIIIQ")
+
+# Sequence, guild ID, welcome channel ID, version, flags, prefix length and
+# prefix. Prefixes are at most five characters long, hence at most 20 bytes.
+SLOT = struct.Struct("<QQQQBB22s")
+SEQUENCE = struct.Struct("<Q")
+
+PRESENT = 1
+HAS_WELCOME = 2
+
+# How far a guild may be from its home slot, and how often a reader
+# retries a slot that is being written before treating it as a miss.
+MAX_PROBES = 32
+MAX_RETRIES = 100
+
+
+class SharedConfigTable:
+    """A table of guild prefixes and welcome channels shared by the processes of a host.
+
+    The table is an open addressing hash table in a memory mapped file.
+    Every slot is guarded by a sequence counter, which writers make odd
+    while they update the slot, so readers never lock and only retry
+    when they raced with a writer. Writers serialise on a file lock.
+
+    Every process that has the table open holds a shared lock on it. A
+    process that opens the table while no other process holds it starts
+    from an empty table, since changes made while every process was down
+    were never announced to it.
+
+    Every guild has a version, which discard and unconditional writes
+    bump, and reset bumps the epoch of the whole table. A configuration
+    read from the database is only published if the stamp taken before
+    the read still matches, so a row read before a change can not
+    overwrite the change.
+
+    Arguments
+    ----------
+    path : str
+        The file backing the table, created if it does not exist.
+    slots : int
+        The amount of slots of a new table, an existing table keeps its own.
+    """
+
+    def __init__(self, path: str, slots: int = 65536):
+        if not fcntl_present:
+            raise RuntimeError("The shared guild configuration table needs a Unix host.")
+
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            # Record locks are independent of the file lock, every user holds a shared one.
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, 0)
+                alone = True
+            except OSError:
+                alone = False
+            fcntl.lockf(self._fd, fcntl.LOCK_SH, 1, 0)
+
+            if alone or os.fstat(self._fd).st_size < HEADER.size:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, HEADER.size + slots * SLOT.size)
+                os.pwrite(self._fd, HEADER.pack(MAGIC, LAYOUT, slots, 0, 0, 0), 0)
+
+            magic, layout, self.slots, _, _, _ = HEADER.unpack(
+                os.pread(self._fd, HEADER.size, 0))
+            if magic != MAGIC or layout != LAYOUT:
+                os.close(self._fd)
+                raise ValueError(f"{path} is not a guild configuration table of this version.")
+
+        self._map = mmap.mmap(self._fd, HEADER.size + self.slots * SLOT.size)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _header(self) -> list:
+        return list(HEADER.unpack_from(self._map, 0))
+
+    def _offset(self, guild_id: int, probe: int) -> int:
+        home = ((guild_id * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> 32
+        return HEADER.size + (home + probe) % self.slots * SLOT.size
+
+    def _read(self, offset: int) -> Union[tuple, None]:
+        for _ in range(MAX_RETRIES):
+            slot = SLOT.unpack_from(self._map, offset)
+            if not slot[0] & 1 and SEQUENCE.unpack_from(self._map, offset)[0] == slot[0]:
+                return slot
+        return None
+
+    def _write(self, offset: int, guild_id: int, version: int, flags: int, welcome: int,
+               prefix: bytes):
+        sequence = SEQUENCE.unpack_from(self._map, offset)[0]
+        SLOT.pack_into(self._map, offset, sequence + 1, guild_id, welcome, version, flags,
+                       len(prefix), prefix)
+        SEQUENCE.pack_into(self._map, offset, sequence + 2)
+
+    def _find(self, guild_id: int, claim: bool) -> Union[int, None]:
+        """Returns the offset of the slot of a guild, claiming a free one if asked to."""
+
+        for probe in range(MAX_PROBES):
+            offset = self._offset(guild_id, probe)
+            slot_guild = SLOT.unpack_from(self._map, offset)[1]
+            if slot_guild == guild_id:
+                return offset
+            if slot_guild != 0:
+                continue
+            if not claim:
+                return None
+
+            # Guilds are never removed from their slot, so probe chains stay intact.
+            header = self._header()
+            header[4] += 1
+            HEADER.pack_into(self._map, 0, *header)
+            self._write(offset, guild_id, 0, 0, 0, b"")
+            return offset
+        return None
+
+    @property
+    def warmed(self) -> bool:
+        return bool(self._header()[3])
+
+    @property
+    def epoch(self) -> int:
+        return self._header()[5]
+
+    def __len__(self):
+        return self._header()[4]
+
+    def lookup(self, guild_id: int) -> Union[Tuple[str, Union[int, None]], None]:
+        """Returns the prefix and welcome channel of a guild, or None if it is not in the table."""
+
+        for probe in range(MAX_PROBES):
+            slot = self._read(self._offset(guild_id, probe))
+            if slot is None or slot[1] == 0:
+                return None
+            if slot[1] != guild_id:
+                continue
+            if not slot[4] & PRESENT:
+                return None
+            welcome = slot[2] if slot[4] & HAS_WELCOME else None
+            return slot[6][:slot[5]].decode(), welcome
+        return None
+
+    def stamp(self, guild_id: int) -> Tuple[int, int]:
+        """Returns the epoch of the table and the version of a guild, taken before a read."""
+
+        epoch = self.epoch
+        for probe in range(MAX_PROBES):
+            slot = self._read(self._offset(guild_id, probe))
+            if slot is None or slot[1] == 0:
+                break
+            if slot[1] == guild_id:
+                return epoch, slot[3]
+        return epoch, 0
+
+    def _publish(self, offset: int, guild_id: int, version: int, prefix: str,
+                 welcome: Union[int, None]) -> None:
+        flags = PRESENT | (HAS_WELCOME if welcome is not None else 0)
+        self._write(offset, guild_id, version, flags, welcome or 0, prefix.encode())
+
+    def publish(self, guild_id: int, prefix: str, welcome: Union[int, None],
+                stamp: Tuple[int, int] = None) -> bool:
+        """Writes the configuration of a guild.
+
+        A configuration read from the database is written only if the
+        guild still has the stamp taken before the read. Without a stamp
+        the configuration is a change, which is always written and bumps
+        the version. Returns False if nothing was written."""
+
+        with self._locked():
+            if stamp is not None and stamp[0] != self.epoch:
+                return False
+            offset = self._find(guild_id, claim=True)
+            if offset is None:
+                return False
+
+            version = SLOT.unpack_from(self._map, offset)[3]
+            if stamp is None:
+                version += 1
+            elif stamp[1] != version:
+                return False
+            self._publish(offset, guild_id, version, prefix, welcome)
+            return True
+
+    def publish_many(self, configs, epoch: int) -> int:
+        """Writes the configuration of many guilds and marks the table as warmed up.
+
+        The configurations are read at the given epoch, guilds that were
+        changed or discarded since the table was reset keep their slot."""
+
+        published = 0
+        with self._locked():
+            if epoch != self.epoch:
+                return 0
+
+            for config in configs:
+                offset = self._find(config.guild_id, claim=True)
+                if offset is None or SLOT.unpack_from(self._map, offset)[3] != 0:
+                    continue
+                self._publish(offset, config.guild_id, 0, config.prefix, config.welcome)
+                published += 1
+
+            header = self._header()
+            header[3] = 1
+            HEADER.pack_into(self._map, 0, *header)
+        return published
+
+    def discard(self, guild_id: int) -> None:
+        """Marks the configuration of a guild as stale, readers then fall back to the database."""
+
+        with self._locked():
+            offset = self._find(guild_id, claim=True)
+            if offset is not None:
+                version = SLOT.unpack_from(self._map, offset)[3]
+                self._write(offset, guild_id, version + 1, 0, 0, b"")
+
+    def reset(self) -> None:
+        """Empties the table, when changes may have been missed."""
+
+        with self._locked():
+            header = self._header()
+            self._map[HEADER.size:] = bytes(self.slots * SLOT.size)
+            header[3], header[4], header[5] = 0, 0, header[5] + 1
+            HEADER.pack_into(self._map, 0, *header)
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
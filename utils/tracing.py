@@ -0,0 +1,124 @@
+import collections
+import contextlib
+import contextvars
+import functools
+import random
+import time
+
+import aiohttp
+
+__all__ = ["Trace", "Tracer", "clear", "span", "traced", "http_trace_config"]
+
+_current_trace = contextvars.ContextVar("photon_trace", default=None)
+
+
+class Trace:
+    """The spans recorded during a single command invocation.
+
+    Every span is a (name, offset, duration) tuple, where the offset is
+    the time from the start of the invocation to the start of the span."""
+
+    __slots__ = ("command", "guild_id", "start", "duration", "spans")
+
+    def __init__(self, command: str, guild_id: int = None):
+        self.command = command
+        self.guild_id = guild_id
+        self.start = time.perf_counter()
+        self.duration: float = None
+        self.spans = []
+
+
+class Tracer:
+    """Keeps a sample of recent command traces in a fixed size ring buffer.
+
+    Arguments
+    ----------
+    size : int
+        The amount of traces kept.
+    sample_rate : float
+        The fraction of command invocations that are traced.
+    """
+
+    def __init__(self, size: int = 256, sample_rate: float = 0.1):
+        self.sample_rate = sample_rate
+        self.traces = collections.deque(maxlen=size)
+
+    def begin(self, command: str, guild_id: int = None):
+        """Starts tracing an invocation in the current context if it is sampled."""
+
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return None
+        trace = Trace(command, guild_id)
+        return trace, _current_trace.set(trace)
+
+    def finish(self, handle) -> None:
+        """Finishes the trace started by begin and stores it."""
+
+        if handle is None:
+            return
+        trace, token = handle
+        trace.duration = time.perf_counter() - trace.start
+        _current_trace.reset(token)
+        self.traces.append(trace)
+
+    def slowest(self, count: int) -> list:
+        """Returns the slowest traces in the buffer."""
+        return sorted(self.traces, key=lambda trace: trace.duration, reverse=True)[:count]
+
+
+def clear() -> None:
+    """Stops recording spans of the current context on the trace of its command."""
+    _current_trace.set(None)
+
+
+@contextlib.contextmanager
+def span(name: str):
+    """Records the time spent in the block on the current trace, if any."""
+
+    trace = _current_trace.get()
+    if trace is None or trace.duration is not None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        trace.spans.append((name, start - trace.start, end - start))
+
+
+def traced(name: str):
+    """Decorator that records every call of a coroutine function as a span."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+async def _on_request_start(session, context, params):
+    context.start = time.perf_counter()
+
+
+async def _on_request_end(session, context, params):
+    trace = _current_trace.get()
+    if trace is None or trace.duration is not None:
+        return
+    end = time.perf_counter()
+    name = f"http.{params.method} {params.url.host}"
+    trace.spans.append((name, context.start - trace.start, end - context.start))
+
+
+def http_trace_config() -> aiohttp.TraceConfig:
+    """Returns an aiohttp trace config that records every request as a span."""
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(_on_request_start)
+    config.on_request_end.append(_on_request_end)
+    config.on_request_exception.append(_on_request_end)
+    return config
@@ -0,0 +1,107 @@
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+
+__all__ = ["LagWatchdog"]
+
+
+class LagWatchdog:
+    """Measures the scheduling lag of an event loop.
+
+    A task on the loop sleeps for a fixed interval and records how late
+    it wakes up. A helper thread watches the heartbeat of that task, and
+    if the loop is blocked for longer than the threshold it logs the stack
+    of the code that is blocking it while it is still running.
+
+    Arguments
+    ----------
+    loop : asyncio.AbstractEventLoop
+        The loop to watch.
+    logger : logging.Logger
+        The logger the stalls are reported to.
+    interval : float
+        The time between two measurements in seconds.
+    threshold : float
+        The lag in seconds from which a stall is reported.
+    history : int
+        The amount of recent measurements kept for the percentiles.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, logger: logging.Logger,
+                 interval: float = 0.25, threshold: float = 0.25, history: int = 1200):
+        self.loop = loop
+        self.logger = logger
+        self.interval = interval
+        self.threshold = threshold
+        self.samples = collections.deque(maxlen=history)
+        self.stalls = 0
+
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: int = None
+        self._task: asyncio.Task = None
+        self._thread: threading.Thread = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Starts watching, must be called from the thread running the loop."""
+
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = self.loop.create_task(self._measure())
+        self._thread = threading.Thread(target=self._watch, name="photon-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _measure(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.samples.append(max(0.0, now - expected))
+            self._heartbeat = now
+
+    def _watch(self) -> None:
+        reported = False
+        while not self._stopped.wait(self.interval):
+            blocked = time.monotonic() - self._heartbeat - self.interval
+            if blocked < self.threshold:
+                reported = False
+                continue
+
+            # Report every stall once, while the offending code is still running.
+            if reported:
+                continue
+            reported = True
+            self.stalls += 1
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            self.logger.warning(
+                "Event loop blocked for at least %.3fs. Stack of the loop thread:\n%s",
+                blocked, stack)
+
+    def current_lag(self) -> float:
+        """Returns the highest lag of the last few measurements."""
+
+        recent = list(self.samples)[-4:]
+        blocked = max(0.0, time.monotonic() - self._heartbeat - self.interval)
+        return max(recent + [blocked])
+
+    def percentiles(self, quantiles: tuple = (0.5, 0.9, 0.99)) -> dict:
+        """Returns the lag at the given quantiles of the recent measurements."""
+
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {quantile: 0.0 for quantile in quantiles}
+        return {
+            quantile: ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+            for quantile in quantiles
+        }
@@ -0,0 +1,164 @@
+import json
+import logging
+import threading
+
+__all__ = [
+    "GATEWAY_EXTENSIONS", "MESSAGE_EVENTS", "DROPPED_EVENTS", "worker_for", "EventRouter",
+    "WorkerFeed"
+]
+
+# The gateway process only runs the extensions that need the voice connections of its shards.
+GATEWAY_EXTENSIONS = ("cogs.music",)
+
+# Events of a single message, they go to the worker that owns the guild, or
+# the channel outside of guilds, and only to it. All the state of a guild,
+# like interactive commands and anonymous polls published in another
+# channel than the command, then lives in one worker.
+MESSAGE_EVENTS = frozenset({
+    "MESSAGE_CREATE", "MESSAGE_UPDATE", "MESSAGE_DELETE", "MESSAGE_DELETE_BULK",
+    "MESSAGE_REACTION_ADD", "MESSAGE_REACTION_REMOVE", "MESSAGE_REACTION_REMOVE_ALL",
+    "MESSAGE_REACTION_REMOVE_EMOJI"
+})
+
+# Events that no worker needs. Every other event changes the cache and is
+# sent to every worker, with the listeners run by the worker of the guild.
+DROPPED_EVENTS = frozenset({"TYPING_START", "VOICE_SERVER_UPDATE", "INTERACTION_CREATE"})
+
+log = logging.getLogger("Photon.workers")
+
+
+def worker_for(snowflake_id, workers: int) -> int:
+    """Returns the worker that owns a channel or guild."""
+    return (int(snowflake_id) >> 22) % workers
+
+
+class EventRouter:
+    """Forwards the events received by the gateway process to the command workers.
+
+    Every event is serialised once and put on the queues of its workers,
+    which is all the gateway process does for the events of other cogs.
+
+    Arguments
+    ----------
+    queues : list
+        The multiprocessing queues of the workers.
+    """
+
+    def __init__(self, queues: list):
+        self.queues = queues
+        self.forwarded = 0
+        self.dropped = 0
+
+    def on_socket_response(self, payload: dict) -> None:
+        if payload.get("op") != 0:
+            return
+
+        event, data = payload["t"], payload["d"]
+        if event in DROPPED_EVENTS:
+            self.dropped += 1
+            return
+        if event == "READY":
+            data = dict(data, __shard_id__=(data.get("shard") or (0, 1))[0])
+
+        self.forwarded += 1
+        body = json.dumps(data)
+        if event in MESSAGE_EVENTS:
+            target = worker_for(data.get("guild_id") or data["channel_id"], len(self.queues))
+            self.queues[target].put((event, body, True))
+            return
+
+        guild_id = data.get("guild_id")
+        if guild_id is None and event.startswith("GUILD_"):
+            guild_id = data.get("id")
+        owner = worker_for(guild_id, len(self.queues)) if guild_id else 0
+        for index, queue in enumerate(self.queues):
+            queue.put((event, body, index == owner))
+
+    def close(self) -> None:
+        for queue in self.queues:
+            queue.put(None)
+
+
+class WorkerFeed:
+    """Feeds the events forwarded by the gateway process to a command worker.
+
+    The worker has no gateway connection of its own. Events are handed
+    to the parsers of its connection state, like FakeGateway does, and
+    every reply goes through the REST API.
+
+    Arguments
+    ----------
+    bot : Photon
+        The bot of the worker.
+    queue : multiprocessing.Queue
+        The queue the gateway process forwards the events to.
+    shard_count : int
+        The total amount of shards of the gateway process.
+    """
+
+    def __init__(self, bot, queue, shard_count: int):
+        self.bot = bot
+        self.queue = queue
+        self.shard_count = shard_count
+        self.received = 0
+        self._muted = False
+        self._stopped = None
+        self._thread = threading.Thread(target=self._receive, name="photon-feed", daemon=True)
+
+    def _install(self) -> None:
+        state = self.bot._connection
+
+        # Members are chunked by the gateway process and forwarded.
+        state.is_bot = True
+        state._chunk_guilds = False
+        state.shard_count = self.bot.shard_count = self.shard_count
+        state.shard_ids = list(range(self.shard_count))
+        if hasattr(state, "shards_launched"):
+            state.shards_launched.set()
+
+        # The listeners of events owned by another worker are not run.
+        dispatch = state.dispatch
+
+        def dispatch_unless_muted(event, *args, **kwargs):
+            if not self._muted:
+                dispatch(event, *args, **kwargs)
+
+        state.dispatch = dispatch_unless_muted
+
+    def _receive(self) -> None:
+        while True:
+            item = self.queue.get()
+            self.bot.loop.call_soon_threadsafe(self._feed, item)
+            if item is None:
+                return
+
+    def _feed(self, item) -> None:
+        if item is None:
+            if not self._stopped.done():
+                self._stopped.set_result(None)
+            return
+
+        event, body, listen = item
+        parser = self.bot._connection.parsers.get(event)
+        if parser is None:
+            return
+
+        self.received += 1
+        self._muted = not listen
+        try:
+            parser(json.loads(body))
+        except Exception:
+            log.exception("Failed to parse a forwarded %s event.", event)
+        finally:
+            self._muted = False
+
+    async def run(self, token: str) -> None:
+        """Logs in to the REST API and processes events until the gateway stops."""
+
+        self._install()
+        await self.bot.prepare()
+        await self.bot.http.static_login(token, bot=True)
+
+        self._stopped = self.bot.loop.create_future()
+        self._thread.start()
+        await self._stopped